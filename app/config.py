@@ -24,5 +24,135 @@ class Settings:
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
     DEBUG: bool = os.getenv("DEBUG", "True").lower() == "true"
+    
+    # Логирование: уровень, уровни по модулям ("app.services=DEBUG,httpx=WARNING"),
+    # формат json|text и доля DEBUG-записей, попадающих в лог
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVELS: str = os.getenv("LOG_LEVELS", "")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+    LOG_DEBUG_SAMPLE_RATE: float = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+    
+    # Enrichment (дедлайны стадий обработки жалобы, секунды)
+    SPAM_STAGE_TIMEOUT: float = float(os.getenv("SPAM_STAGE_TIMEOUT", "5.0"))
+    SENTIMENT_STAGE_TIMEOUT: float = float(os.getenv("SENTIMENT_STAGE_TIMEOUT", "5.0"))
+    CATEGORY_STAGE_TIMEOUT: float = float(os.getenv("CATEGORY_STAGE_TIMEOUT", "8.0"))
+    GEOLOCATION_STAGE_TIMEOUT: float = float(os.getenv("GEOLOCATION_STAGE_TIMEOUT", "3.0"))
+    # Общий бюджет на обогащение жалобы в запросе к API (0 — без бюджета).
+    # Обычный ответ OpenAI (1-2 с) в него укладывается; вызов, оборванный
+    # бюджетом позже CIRCUIT_SLOW_CALL_THRESHOLD, считается ошибкой провайдера
+    ENRICHMENT_DEADLINE: float = float(os.getenv("ENRICHMENT_DEADLINE", "3.0"))
+    
+    # Общий HTTP клиент для внешних сервисов
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30.0"))
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", "10.0"))
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "False").lower() == "true"
+    
+    # OpenAI
+    OPENAI_TIMEOUT: float = float(os.getenv("OPENAI_TIMEOUT", "10.0"))
+    OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", "1"))
+    OPENAI_MAX_CONCURRENCY: int = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+    
+    # Пакетная загрузка жалоб
+    BATCH_CHUNK_SIZE: int = int(os.getenv("BATCH_CHUNK_SIZE", "500"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "16"))
+    
+    # Постраничная выдача GET /complaints/: размер страницы по умолчанию и предел
+    COMPLAINTS_PAGE_SIZE: int = int(os.getenv("COMPLAINTS_PAGE_SIZE", "100"))
+    COMPLAINTS_MAX_PAGE_SIZE: int = int(os.getenv("COMPLAINTS_MAX_PAGE_SIZE", "500"))
+    # Строк за одно чтение курсора при потоковой выгрузке /complaints/export/
+    EXPORT_CHUNK_SIZE: int = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+    
+    # Отложенное обогащение (202 Accepted + воркеры)
+    DEFERRED_ENRICHMENT: bool = os.getenv("DEFERRED_ENRICHMENT", "False").lower() == "true"
+    WORKER_BATCH_SIZE: int = int(os.getenv("WORKER_BATCH_SIZE", "20"))
+    WORKER_CONCURRENCY: int = int(os.getenv("WORKER_CONCURRENCY", "10"))
+    WORKER_POLL_INTERVAL: float = float(os.getenv("WORKER_POLL_INTERVAL", "1.0"))
+    WORKER_LEASE_SECONDS: int = int(os.getenv("WORKER_LEASE_SECONDS", "120"))
+    WORKER_MAX_ATTEMPTS: int = int(os.getenv("WORKER_MAX_ATTEMPTS", "5"))
+    
+    # Outbox уведомлений (Telegram, Google Sheets)
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+    OUTBOX_POLL_INTERVAL: float = float(os.getenv("OUTBOX_POLL_INTERVAL", "1.0"))
+    OUTBOX_LEASE_SECONDS: int = int(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+    
+    # Буфер записи в Google Sheets
+    SHEETS_BATCH_SIZE: int = int(os.getenv("SHEETS_BATCH_SIZE", "50"))
+    SHEETS_FLUSH_INTERVAL: float = float(os.getenv("SHEETS_FLUSH_INTERVAL", "2.0"))
+    SHEETS_EXPORT_CHUNK_SIZE: int = int(os.getenv("SHEETS_EXPORT_CHUNK_SIZE", "500"))
+    
+    # Темп отправки в Telegram: ~1 сообщение/с в личный чат, 20 в минуту в группу
+    TELEGRAM_MESSAGES_PER_MINUTE: float = float(os.getenv("TELEGRAM_MESSAGES_PER_MINUTE", "0"))
+    TELEGRAM_BURST: int = int(os.getenv("TELEGRAM_BURST", "3"))
+    TELEGRAM_DIGEST_THRESHOLD: int = int(os.getenv("TELEGRAM_DIGEST_THRESHOLD", "5"))
+    TELEGRAM_DIGEST_MAX_ITEMS: int = int(os.getenv("TELEGRAM_DIGEST_MAX_ITEMS", "50"))
+    TELEGRAM_MAX_RETRIES: int = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+    
+    # Геолокация: кэш по IP и офлайн-таблица диапазонов
+    GEO_CACHE_SIZE: int = int(os.getenv("GEO_CACHE_SIZE", "10000"))
+    GEO_CACHE_TTL: float = float(os.getenv("GEO_CACHE_TTL", "86400"))
+    GEO_FAILURE_TTL: float = float(os.getenv("GEO_FAILURE_TTL", "300"))
+    GEOIP_TABLE_PATH: str = os.getenv("GEOIP_TABLE_PATH", "")
+    
+    # Предохранители внешних провайдеров: ошибок подряд до открытия,
+    # секунд до пробного запроса, число пробных запросов
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RECOVERY_TIMEOUT: float = float(os.getenv("CIRCUIT_RECOVERY_TIMEOUT", "30"))
+    CIRCUIT_HALF_OPEN_MAX_CALLS: int = int(os.getenv("CIRCUIT_HALF_OPEN_MAX_CALLS", "1"))
+    # Вызов, оборванный бюджетом запроса после стольких секунд, — ошибка провайдера
+    CIRCUIT_SLOW_CALL_THRESHOLD: float = float(os.getenv("CIRCUIT_SLOW_CALL_THRESHOLD", "2.0"))
+    # На сколько открывать предохранитель OpenAI при исчерпанной квоте
+    OPENAI_QUOTA_COOLDOWN: float = float(os.getenv("OPENAI_QUOTA_COOLDOWN", "300"))
+    
+    # Кэш результатов обогащения по тексту (пустой путь — кэш выключен)
+    ENRICHMENT_CACHE_PATH: str = os.getenv("ENRICHMENT_CACHE_PATH", "./enrichment_cache.db")
+    ENRICHMENT_CACHE_TTL: float = float(os.getenv("ENRICHMENT_CACHE_TTL", "604800"))
+    ENRICHMENT_CACHE_SPAM_TTL: float = float(os.getenv("ENRICHMENT_CACHE_SPAM_TTL", "86400"))
+    ENRICHMENT_CACHE_MAX_ENTRIES: int = int(os.getenv("ENRICHMENT_CACHE_MAX_ENTRIES", "100000"))
+    
+    # Локальный спам-префильтр: выше первого порога — спам, ниже второго —
+    # не спам, между ними решает API Ninjas
+    SPAM_PREFILTER_SPAM_THRESHOLD: float = float(os.getenv("SPAM_PREFILTER_SPAM_THRESHOLD", "0.8"))
+    SPAM_PREFILTER_HAM_THRESHOLD: float = float(os.getenv("SPAM_PREFILTER_HAM_THRESHOLD", "0.3"))
+    SPAM_PREFILTER_MAX_FINGERPRINTS: int = int(os.getenv("SPAM_PREFILTER_MAX_FINGERPRINTS", "10000"))
+    SPAM_PREFILTER_REFRESH_INTERVAL: float = float(os.getenv("SPAM_PREFILTER_REFRESH_INTERVAL", "60"))
+    # Жалоб с одного IP за окно (секунды), при котором IP считается спамером
+    SPAM_VELOCITY_LIMIT: int = int(os.getenv("SPAM_VELOCITY_LIMIT", "20"))
+    SPAM_VELOCITY_WINDOW: float = float(os.getenv("SPAM_VELOCITY_WINDOW", "60"))
+    # Репутация IP: спам-вердикты затухают с периодом полураспада (секунды)
+    SPAM_REPUTATION_HALF_LIFE: float = float(os.getenv("SPAM_REPUTATION_HALF_LIFE", "3600"))
+    SPAM_REPUTATION_THRESHOLD: float = float(os.getenv("SPAM_REPUTATION_THRESHOLD", "3"))
+    
+    # Почти дословные копии жалоб (MinHash LSH): порог сходства Жаккара,
+    # длина сигнатуры и число полос, сколько последних жалоб держать в индексе
+    DUPLICATE_DETECTION: bool = os.getenv("DUPLICATE_DETECTION", "True").lower() == "true"
+    DUPLICATE_THRESHOLD: float = float(os.getenv("DUPLICATE_THRESHOLD", "0.7"))
+    DUPLICATE_NUM_PERM: int = int(os.getenv("DUPLICATE_NUM_PERM", "64"))
+    DUPLICATE_BANDS: int = int(os.getenv("DUPLICATE_BANDS", "16"))
+    DUPLICATE_INDEX_SIZE: int = int(os.getenv("DUPLICATE_INDEX_SIZE", "50000"))
+    DUPLICATE_REFRESH_INTERVAL: float = float(os.getenv("DUPLICATE_REFRESH_INTERVAL", "60"))
+    
+    # Лимит приема жалоб на клиента (IP или X-API-Key): корзина токенов
+    # в общем для всех процессов файле SQLite (пустой путь — лимит выключен)
+    RATE_LIMIT_PATH: str = os.getenv("RATE_LIMIT_PATH", "./rate_limits.db")
+    RATE_LIMIT_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_PER_MINUTE", "30"))
+    RATE_LIMIT_BURST: float = float(os.getenv("RATE_LIMIT_BURST", "10"))
+    # Выданные клиентам API-ключи (через запятую); прочие X-API-Key игнорируются
+    RATE_LIMIT_API_KEYS: list = [
+        key.strip() for key in os.getenv("RATE_LIMIT_API_KEYS", "").split(",") if key.strip()
+    ]
+    # Пакетная загрузка дополнительно оплачивает каждую жалобу; емкость
+    # не меньше BATCH_CHUNK_SIZE, иначе полный чанк не пройдет никогда
+    RATE_LIMIT_BATCH_ITEMS_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_BATCH_ITEMS_PER_MINUTE", "1000"))
+    RATE_LIMIT_BATCH_ITEMS_BURST: float = float(os.getenv("RATE_LIMIT_BATCH_ITEMS_BURST", "2000"))
+    
+    # Кэш GET /complaints/{id}/ в памяти процесса; изменения из других
+    # процессов видны по файлу версии (пустой путь — кэш выключен)
+    COMPLAINT_CACHE_VERSION_PATH: str = os.getenv("COMPLAINT_CACHE_VERSION_PATH", "./complaint_cache.version")
+    COMPLAINT_CACHE_SIZE: int = int(os.getenv("COMPLAINT_CACHE_SIZE", "10000"))
+    COMPLAINT_CACHE_TTL: float = float(os.getenv("COMPLAINT_CACHE_TTL", "300"))
 
 settings = Settings() 
\ No newline at end of file
@@ -0,0 +1,11 @@
+"""
+Middleware для системы обработки жалоб
+"""
+
+from .request_id import RequestIdMiddleware
+from .rate_limit import RateLimitMiddleware
+
+__all__ = [
+    'RequestIdMiddleware',
+    'RateLimitMiddleware'
+]
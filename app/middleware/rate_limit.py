@@ -0,0 +1,79 @@
+import hashlib
+import json
+import math
+from typing import Iterable, Optional, Sequence
+
+from ..services.rate_limiter import RateLimiter
+
+API_KEY_HEADER = b"x-api-key"
+
+
+def client_key(scope, api_keys: Iterable[bytes] = ()) -> str:
+    """Ключ лимита: известный API-ключ (в виде хэша), иначе IP клиента.
+
+    Произвольный X-API-Key не учитывается: иначе клиент получал бы новую
+    корзину на каждый запрос, меняя заголовок.
+    """
+    for name, value in scope["headers"]:
+        if name == API_KEY_HEADER and value in api_keys:
+            return "key:" + hashlib.sha256(value).hexdigest()[:32]
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class RateLimitMiddleware:
+    """ASGI middleware: лимит приема жалоб на клиента по корзине токенов.
+
+    Ограничиваются только POST-запросы к paths; отказ — 429 с Retry-After
+    до чтения тела и до обращений к внешним сервисам. Без limiter
+    запросы пропускаются. Пакетная загрузка, кроме того, оплачивает каждую
+    жалобу из отдельного лимита batch_limiter: его вместе с ключом клиента
+    маршрут находит в request.state.batch_rate_limit.
+    """
+
+    def __init__(
+        self,
+        app,
+        limiter: Optional[RateLimiter] = None,
+        paths: Sequence[str] = ("/complaints/",),
+        api_keys: Iterable[str] = (),
+        batch_limiter: Optional[RateLimiter] = None,
+        batch_paths: Sequence[str] = ("/complaints/batch/",),
+    ):
+        self.app = app
+        self.limiter = limiter
+        self.paths = tuple(paths)
+        self.api_keys = frozenset(key.encode() for key in api_keys)
+        self.batch_limiter = batch_limiter
+        self.batch_paths = tuple(batch_paths)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            self.limiter is None
+            or scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].startswith(self.paths)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        key = client_key(scope, self.api_keys)
+        if self.batch_limiter is not None and scope["path"].startswith(self.batch_paths):
+            # Свой префикс: корзины обоих лимитов могут лежать в одном файле
+            scope.setdefault("state", {})["batch_rate_limit"] = (self.batch_limiter, "batch:" + key)
+        allowed, retry_after = await self.limiter.acquire(key)
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+
+        body = json.dumps({"detail": "Too many requests"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
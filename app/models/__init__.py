@@ -2,13 +2,25 @@
 Модели данных для системы обработки жалоб
 """
 
-from .database import Base, Complaint
-from .schemas import ComplaintCreate, ComplaintUpdate, ComplaintResponse
+from .database import Base, Complaint, EnrichmentJob, OutboxMessage, ExportState, ComplaintDuplicate, ComplaintRevision, SheetRow
+from .schemas import (
+    ComplaintCreate, ComplaintUpdate, ComplaintResponse, ComplaintPage,
+    ComplaintBatchItem, ComplaintBatchResponse
+)
 
 __all__ = [
     'Base',
     'Complaint', 
+    'EnrichmentJob',
+    'OutboxMessage',
+    'ExportState',
+    'ComplaintDuplicate',
+    'ComplaintRevision',
+    'SheetRow',
     'ComplaintCreate',
     'ComplaintUpdate',
-    'ComplaintResponse'
+    'ComplaintResponse',
+    'ComplaintPage',
+    'ComplaintBatchItem',
+    'ComplaintBatchResponse'
 ] 
\ No newline at end of file
@@ -1,7 +1,8 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Mapped, mapped_column
+from sqlalchemy import Integer, Float, String, DateTime, Text, ForeignKey, Index, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import declarative_base, Mapped, mapped_column
 from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
 import os
 from dotenv import load_dotenv
 
@@ -9,27 +10,135 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./complaints.db")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _to_async_url(url: str) -> str:
+    """Подстановка асинхронного драйвера aiosqlite для SQLite URL"""
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    return url
+
+
+ASYNC_DATABASE_URL = _to_async_url(DATABASE_URL)
+
+engine = create_async_engine(ASYNC_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL и busy_timeout, чтобы читатели не блокировались писателями"""
+    if engine.dialect.name != "sqlite":
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
 
 Base = declarative_base()
 
 class Complaint(Base):
     __tablename__ = "complaints"
+    __table_args__ = (
+        Index("ix_complaints_status_timestamp", "status", "timestamp"),
+        Index("ix_complaints_category_timestamp", "category", "timestamp"),
+        Index("ix_complaints_timestamp", "timestamp"),
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     text: Mapped[str] = mapped_column(Text, nullable=False)
     status: Mapped[str] = mapped_column(String, default="open")
     timestamp: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
     sentiment: Mapped[str] = mapped_column(String, default="unknown")
     category: Mapped[str] = mapped_column(String, default="другое")
 
-# Создание таблиц
-Base.metadata.create_all(bind=engine)
+class EnrichmentJob(Base):
+    """Задание на отложенное обогащение жалобы (очередь для воркеров)"""
+    __tablename__ = "enrichment_jobs"
+    __table_args__ = (
+        Index("ix_enrichment_jobs_status_available_at", "status", "available_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    complaint_id: Mapped[int] = mapped_column(Integer, ForeignKey("complaints.id"), nullable=False)
+    ip_address: Mapped[str] = mapped_column(String, default="unknown")
+    status: Mapped[str] = mapped_column(String, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    available_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+    locked_by: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    locked_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+class OutboxMessage(Base):
+    """Исходящее уведомление, записанное в одной транзакции с жалобой"""
+    __tablename__ = "outbox_messages"
+    __table_args__ = (
+        Index("ix_outbox_messages_status_available_at", "status", "available_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    topic: Mapped[str] = mapped_column(String, nullable=False)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    available_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+    locked_by: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    locked_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+class ExportState(Base):
+    """Отметка последнего выгруженного id для инкрементального экспорта"""
+    __tablename__ = "export_state"
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    last_id: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc)
+    )
+
+class ComplaintDuplicate(Base):
+    """Связь жалобы-дубликата с канонической жалобой, чьи результаты она использует"""
+    __tablename__ = "complaint_duplicates"
+
+    complaint_id: Mapped[int] = mapped_column(Integer, ForeignKey("complaints.id"), primary_key=True)
+    canonical_id: Mapped[int] = mapped_column(Integer, ForeignKey("complaints.id"), index=True)
+    similarity: Mapped[float] = mapped_column(Float, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+class ComplaintRevision(Base):
+    """Номер последнего изменения жалобы для инкрементальной дозагрузки.
+
+    Номер растет при вставке жалобы и смене ее статуса, тональности или
+    категории; присваивают его триггеры SQLite (миграция 4) под блокировкой
+    записи, поэтому номера идут в порядке коммитов.
+    """
+    __tablename__ = "complaint_revisions"
+
+    complaint_id: Mapped[int] = mapped_column(Integer, ForeignKey("complaints.id"), primary_key=True)
+    revision: Mapped[int] = mapped_column(Integer, index=True)
+
+class SheetRow(Base):
+    """Жалоба, уже записанная в Google Sheets (outbox или экспортом)"""
+    __tablename__ = "sheet_rows"
+
+    complaint_id: Mapped[int] = mapped_column(Integer, ForeignKey("complaints.id"), primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+async def init_db() -> None:
+    """Применение миграций схемы (вызывается при старте приложения и воркеров)"""
+    from .migrations import migrate
+
+    await migrate(engine)
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
@@ -0,0 +1,209 @@
+"""
+Версионные миграции схемы базы данных.
+
+Каждая миграция — номер, имя и список SQL-инструкций для SQLite. Примененные
+номера хранятся в таблице schema_migrations. Инструкции идемпотентны
+(IF [NOT] EXISTS), поэтому процессы uvicorn и воркеры, стартующие
+одновременно, могут применять миграции параллельно, а база, созданная
+прежним create_all, принимается первой миграцией как есть.
+
+Новая миграция добавляется в конец MIGRATIONS; примененные не меняются.
+Модели в database.py описывают итоговую схему и должны ей соответствовать.
+
+Запуск: python -m app.models.migrations [--status]
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Tuple
+
+from sqlalchemy import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    statements: Tuple[str, ...]
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "initial_schema", (
+        """CREATE TABLE IF NOT EXISTS complaints (
+            id INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            status VARCHAR NOT NULL,
+            timestamp DATETIME NOT NULL,
+            sentiment VARCHAR NOT NULL,
+            category VARCHAR NOT NULL,
+            PRIMARY KEY (id)
+        )""",
+        """CREATE TABLE IF NOT EXISTS enrichment_jobs (
+            id INTEGER NOT NULL,
+            complaint_id INTEGER NOT NULL,
+            ip_address VARCHAR NOT NULL,
+            status VARCHAR NOT NULL,
+            attempts INTEGER NOT NULL,
+            available_at DATETIME NOT NULL,
+            locked_by VARCHAR,
+            locked_at DATETIME,
+            last_error TEXT,
+            created_at DATETIME NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY (complaint_id) REFERENCES complaints (id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_enrichment_jobs_status_available_at"
+        " ON enrichment_jobs (status, available_at)",
+        """CREATE TABLE IF NOT EXISTS outbox_messages (
+            id INTEGER NOT NULL,
+            topic VARCHAR NOT NULL,
+            payload TEXT NOT NULL,
+            status VARCHAR NOT NULL,
+            attempts INTEGER NOT NULL,
+            available_at DATETIME NOT NULL,
+            locked_by VARCHAR,
+            locked_at DATETIME,
+            last_error TEXT,
+            created_at DATETIME NOT NULL,
+            PRIMARY KEY (id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_outbox_messages_status_available_at"
+        " ON outbox_messages (status, available_at)",
+        """CREATE TABLE IF NOT EXISTS export_state (
+            name VARCHAR NOT NULL,
+            last_id INTEGER NOT NULL,
+            updated_at DATETIME NOT NULL,
+            PRIMARY KEY (name)
+        )""",
+        """CREATE TABLE IF NOT EXISTS complaint_duplicates (
+            complaint_id INTEGER NOT NULL,
+            canonical_id INTEGER NOT NULL,
+            similarity FLOAT NOT NULL,
+            created_at DATETIME NOT NULL,
+            PRIMARY KEY (complaint_id),
+            FOREIGN KEY (complaint_id) REFERENCES complaints (id),
+            FOREIGN KEY (canonical_id) REFERENCES complaints (id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_complaint_duplicates_canonical_id"
+        " ON complaint_duplicates (canonical_id)",
+    )),
+    # Индексы под горячие запросы: /complaints/recent/ и открытые жалобы
+    # в отчете (status = ? AND timestamp >= ?), фильтр по категории,
+    # общий счетчик за сутки (timestamp >= ?). Индекс по id дублировал
+    # первичный ключ (rowid) и только замедлял вставки.
+    Migration(2, "complaint_query_indexes", (
+        "CREATE INDEX IF NOT EXISTS ix_complaints_status_timestamp"
+        " ON complaints (status, timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_complaints_category_timestamp"
+        " ON complaints (category, timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_complaints_timestamp"
+        " ON complaints (timestamp)",
+        "DROP INDEX IF EXISTS ix_complaints_id",
+    )),
+    # Выполненные задания обогащения больше не хранятся — удаляются вместе
+    # с записью результата; накопленные ранее удаляются один раз
+    Migration(3, "prune_done_enrichment_jobs", (
+        "DELETE FROM enrichment_jobs WHERE status = 'done'",
+    )),
+    # Номер изменения жалобы: индексы в памяти процессов (дубликаты, спам)
+    # дочитывают жалобы, обогащенные или помеченные спамом после их загрузки.
+    # Отдельная таблица вместо столбца: ALTER TABLE ADD COLUMN не идемпотентен
+    Migration(4, "complaint_revisions", (
+        """CREATE TABLE IF NOT EXISTS complaint_revisions (
+            complaint_id INTEGER NOT NULL,
+            revision INTEGER NOT NULL,
+            PRIMARY KEY (complaint_id),
+            FOREIGN KEY (complaint_id) REFERENCES complaints (id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_complaint_revisions_revision"
+        " ON complaint_revisions (revision)",
+        "INSERT OR IGNORE INTO complaint_revisions (complaint_id, revision)"
+        " SELECT id, id FROM complaints",
+        """CREATE TRIGGER IF NOT EXISTS complaints_revision_insert
+        AFTER INSERT ON complaints
+        BEGIN
+            INSERT INTO complaint_revisions (complaint_id, revision)
+            VALUES (NEW.id, (SELECT COALESCE(MAX(revision), 0) + 1 FROM complaint_revisions))
+            ON CONFLICT (complaint_id) DO UPDATE SET revision = excluded.revision;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS complaints_revision_update
+        AFTER UPDATE OF status, sentiment, category ON complaints
+        BEGIN
+            INSERT INTO complaint_revisions (complaint_id, revision)
+            VALUES (NEW.id, (SELECT COALESCE(MAX(revision), 0) + 1 FROM complaint_revisions))
+            ON CONFLICT (complaint_id) DO UPDATE SET revision = excluded.revision;
+        END""",
+    )),
+    # Жалобы, уже записанные в Google Sheets: экспорт пропускает строки,
+    # которые дописал outbox. Выгруженное прежними экспортами (id не больше
+    # отметки) отмечается сразу
+    Migration(5, "sheet_rows", (
+        """CREATE TABLE IF NOT EXISTS sheet_rows (
+            complaint_id INTEGER NOT NULL,
+            created_at DATETIME NOT NULL,
+            PRIMARY KEY (complaint_id),
+            FOREIGN KEY (complaint_id) REFERENCES complaints (id)
+        )""",
+        "INSERT OR IGNORE INTO sheet_rows (complaint_id, created_at)"
+        " SELECT id, CURRENT_TIMESTAMP FROM complaints"
+        " WHERE id <= (SELECT last_id FROM export_state WHERE name = 'sheets')",
+    )),
+]
+
+
+def applied_versions(conn: Connection) -> List[int]:
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, applied_at DATETIME NOT NULL)"
+    )
+    return [row[0] for row in conn.exec_driver_sql(
+        "SELECT version FROM schema_migrations ORDER BY version"
+    )]
+
+
+def apply_migrations(conn: Connection) -> List[int]:
+    """Применить недостающие миграции; возвращает номера примененных сейчас"""
+    done = set(applied_versions(conn))
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version in done:
+            continue
+        for statement in migration.statements:
+            conn.exec_driver_sql(statement)
+        # OR IGNORE: ту же миграцию мог одновременно применить другой процесс
+        conn.exec_driver_sql(
+            "INSERT OR IGNORE INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+            (migration.version, migration.name, datetime.now(timezone.utc).isoformat(" "))
+        )
+        applied.append(migration.version)
+    return applied
+
+
+async def migrate(engine: AsyncEngine) -> List[int]:
+    async with engine.begin() as conn:
+        return await conn.run_sync(apply_migrations)
+
+
+async def _main(status_only: bool) -> None:
+    from .database import engine
+
+    try:
+        if status_only:
+            async with engine.connect() as conn:
+                done = set(await conn.run_sync(applied_versions))
+                await conn.commit()
+            for migration in MIGRATIONS:
+                mark = "x" if migration.version in done else " "
+                print(f"[{mark}] {migration.version:04d} {migration.name}")
+        else:
+            applied = await migrate(engine)
+            print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Миграции схемы базы данных")
+    parser.add_argument("--status", action="store_true", help="Показать примененные миграции")
+    asyncio.run(_main(parser.parse_args().status))
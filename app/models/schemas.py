@@ -10,10 +10,29 @@ class ComplaintResponse(BaseModel):
     status: str
     sentiment: str
     category: Optional[str] = None
+    # id канонической жалобы, если эта — ее почти дословная копия
+    duplicate_of: Optional[int] = None
 
     class Config:
         from_attributes = True
 
+class ComplaintPage(BaseModel):
+    items: list[ComplaintResponse]
+    # Курсор следующей страницы; None — страниц больше нет
+    next_cursor: Optional[str] = None
+
+class ComplaintBatchItem(BaseModel):
+    index: int
+    id: Optional[int] = None
+    duplicate_of: Optional[int] = None
+    error: Optional[str] = None
+
+class ComplaintBatchResponse(BaseModel):
+    total: int
+    created: int
+    failed: int
+    items: list[ComplaintBatchItem]
+
 class ComplaintUpdate(BaseModel):
     status: Optional[str] = None
     sentiment: Optional[str] = None
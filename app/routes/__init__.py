@@ -5,9 +5,11 @@ API маршруты для системы обработки жалоб
 from .complaints import router as complaints_router
 from .telegram import router as telegram_router
 from .sheets import router as sheets_router
+from .diagnostics import router as diagnostics_router
 
 __all__ = [
     'complaints_router',
     'telegram_router',
-    'sheets_router'
+    'sheets_router',
+    'diagnostics_router'
 ] 
\ No newline at end of file
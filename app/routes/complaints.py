@@ -1,12 +1,30 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, insert, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta, timezone
 import asyncio
-from typing import Optional
+import logging
+import math
+from typing import Literal, Optional, Union
+from pydantic import ValidationError
 
-from ..models.database import get_db, Complaint
-from ..models.schemas import ComplaintCreate, ComplaintResponse, ComplaintUpdate
-from ..services import SentimentService, AICategoryService, SpamService, GeolocationService, TelegramService, GoogleSheetsService
+from ..models.database import get_db, AsyncSessionLocal, Complaint, ComplaintDuplicate, EnrichmentJob, OutboxMessage
+from ..models.schemas import (
+    ComplaintCreate, ComplaintResponse, ComplaintUpdate, ComplaintPage,
+    ComplaintBatchItem, ComplaintBatchResponse
+)
+from ..config import settings
+from ..utils import (
+    iter_json_items, complaint_notification_data, deadline_scope, encode_cursor, decode_cursor,
+    EXPORT_COLUMNS, ndjson_chunk, csv_chunk, csv_header
+)
+from ..services import SentimentService, AICategoryService, SpamService, GeolocationService, TelegramService, GoogleSheetsService, EnrichmentService, OutboxDispatcher, DuplicateIndex, ComplaintCache
+from ..services.outbox import DUPLICATE_TOPICS, enqueue_complaint_notifications, outbox_rows
+from ..services.complaint_cache import etag_matches
+from ..services.spam_prefilter import SPAM_STATUS
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/complaints", tags=["complaints"])
 
@@ -17,29 +35,92 @@ spam_service = SpamService()
 geolocation_service = GeolocationService()
 telegram_service = TelegramService()
 sheets_service = GoogleSheetsService()
+enrichment_service = EnrichmentService(
+    sentiment_service=sentiment_service,
+    ai_category_service=ai_category_service,
+    spam_service=spam_service,
+    geolocation_service=geolocation_service
+)
+outbox_dispatcher = OutboxDispatcher(
+    telegram_service=telegram_service,
+    sheets_service=sheets_service
+)
+duplicate_index = DuplicateIndex()
+complaint_cache = ComplaintCache()
 
 @router.post("/", response_model=ComplaintResponse)
 async def create_complaint(
     complaint: ComplaintCreate,
     request: Request,
-    db: Session = Depends(get_db)
+    response: Response,
+    defer: Optional[bool] = None,
+    db: AsyncSession = Depends(get_db)
 ):
     """Создание новой жалобы с анализом тональности и категоризацией"""
     try:
-        # Проверка на спам (опционально)
-        spam_result = await spam_service.check_spam(complaint.text)
+        # Получение IP клиента для геолокации (опционально)
+        client_ip = request.client.host if request.client else "unknown"
         
-        # Анализ тональности
-        print(f"DEBUG: [MAIN] About to analyze sentiment for: {complaint.text[:50]}...")
-        sentiment = await sentiment_service.analyze_sentiment(complaint.text)
-        print(f"DEBUG: [MAIN] Sentiment result: {sentiment}")
+        # Отложенный режим: сохраняем жалобу и задание, обогащают воркеры
+        if defer if defer is not None else settings.DEFERRED_ENRICHMENT:
+            db_complaint = Complaint(
+                text=complaint.text,
+                sentiment="pending",
+                category="pending"
+            )
+            db.add(db_complaint)
+            await db.flush()
+            db.add(EnrichmentJob(complaint_id=db_complaint.id, ip_address=client_ip))
+            await db.commit()
+            
+            response.status_code = 202
+            return ComplaintResponse(
+                id=db_complaint.id,
+                status=db_complaint.status,
+                sentiment=db_complaint.sentiment,
+                category=db_complaint.category
+            )
         
-        # Определение категории с помощью ИИ
-        category = await ai_category_service.categorize_complaint(complaint.text)
+        # Почти дословная копия недавней жалобы: результаты берутся у оригинала,
+        # в Google Sheets она записывается, а в Telegram не отправляется
+        signature, duplicate = duplicate_index.lookup(complaint.text)
+        if duplicate is not None:
+            db_complaint = Complaint(
+                text=complaint.text,
+                sentiment=duplicate.sentiment,
+                category=duplicate.category
+            )
+            db.add(db_complaint)
+            await db.flush()
+            db.add(ComplaintDuplicate(
+                complaint_id=db_complaint.id,
+                canonical_id=duplicate.canonical_id,
+                similarity=duplicate.similarity
+            ))
+            enqueue_complaint_notifications(
+                db,
+                complaint_notification_data(db_complaint, client_ip, duplicate.is_spam),
+                DUPLICATE_TOPICS
+            )
+            await db.commit()
+            outbox_dispatcher.notify()
+            
+            return ComplaintResponse(
+                id=db_complaint.id,
+                status=db_complaint.status,
+                sentiment=db_complaint.sentiment,
+                category=db_complaint.category,
+                duplicate_of=duplicate.canonical_id
+            )
         
-        # Получение IP клиента для геолокации (опционально)
-        client_ip = request.client.host if request.client else "unknown"
-        location = await geolocation_service.get_location(client_ip)
+        # Спам, тональность, категория и геолокация независимы — запускаем их
+        # одновременно; каждая стадия ограничена своим дедлайном и общим
+        # бюджетом запроса, по истечении — значение по умолчанию
+        with deadline_scope(settings.ENRICHMENT_DEADLINE):
+            enrichment = await enrichment_service.enrich(complaint.text, client_ip)
+        spam_result = enrichment.spam
+        sentiment = enrichment.sentiment
+        category = enrichment.category
         
         # Создание записи в базе данных
         db_complaint = Complaint(
@@ -49,29 +130,20 @@ async def create_complaint(
         )
         
         db.add(db_complaint)
-        db.commit()
-        db.refresh(db_complaint)
+        await db.flush()
         
-        # Отправка уведомления в Telegram (асинхронно)
-        try:
-            complaint_data = {
-                "id": db_complaint.id,
-                "text": db_complaint.text,
-                "category": db_complaint.category,
-                "sentiment": db_complaint.sentiment,
-                "status": db_complaint.status,
-                "ip_address": client_ip,
-                "created_at": db_complaint.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                "is_spam": spam_result.get("is_spam", False)
-            }
-            
-            # Отправляем уведомление в фоне (не блокируем ответ)
-            asyncio.create_task(telegram_service.send_complaint_notification(complaint_data))
-            
-            # Добавляем в Google Sheets (асинхронно)
-            asyncio.create_task(sheets_service.add_complaint_to_sheet(complaint_data))
-        except Exception as e:
-            print(f"Error sending notifications: {e}")
+        # Уведомления в Telegram и Google Sheets пишутся в outbox в той же
+        # транзакции, что и жалоба; доставляет их OutboxDispatcher
+        enqueue_complaint_notifications(
+            db,
+            complaint_notification_data(db_complaint, client_ip, spam_result.get("is_spam", False))
+        )
+        await db.commit()
+        outbox_dispatcher.notify()
+        duplicate_index.add(
+            db_complaint.id, complaint.text, sentiment, category,
+            spam_result.get("is_spam", False), signature
+        )
         
         return ComplaintResponse(
             id=db_complaint.id,
@@ -81,53 +153,301 @@ async def create_complaint(
         )
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-@router.get("/", response_model=list[ComplaintResponse])
+@router.post("/batch/", response_model=ComplaintBatchResponse)
+async def create_complaints_batch(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
+    """Пакетная загрузка жалоб: тело в формате NDJSON или JSON-массива.
+
+    Каждая жалоба оплачивается из лимита пакетной загрузки. Когда он
+    исчерпан, жалобы текущего и следующих чанков возвращаются с ошибкой,
+    а ответ получает Retry-After.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+    items: list[ComplaintBatchItem] = []
+    chunk: list[tuple[int, Union[ComplaintCreate, str]]] = []
+    # (лимитер, ключ клиента) от RateLimitMiddleware; None — лимит выключен
+    batch_rate_limit = getattr(request.state, "batch_rate_limit", None)
+    retry_after: Optional[float] = None
+
+    async def enrich(complaint: ComplaintCreate):
+        # Бюджет отсчитывается с момента, когда жалоба дождалась своей очереди
+        async with semaphore:
+            with deadline_scope(settings.ENRICHMENT_DEADLINE):
+                return await enrichment_service.enrich(complaint.text, client_ip, check_sender=False)
+
+    async def flush_chunk():
+        valid = [(index, c) for index, c in chunk if isinstance(c, ComplaintCreate)]
+        for index, c in chunk:
+            if isinstance(c, str):
+                items.append(ComplaintBatchItem(index=index, error=c))
+        if not valid:
+            return
+
+        nonlocal retry_after
+        if batch_rate_limit is not None and retry_after is None:
+            limiter, key = batch_rate_limit
+            allowed, wait = await limiter.acquire(key, cost=len(valid))
+            if not allowed:
+                retry_after = wait
+        if retry_after is not None:
+            items.extend(
+                ComplaintBatchItem(index=index, error="Too many requests")
+                for index, _ in valid
+            )
+            return
+
+        # Копии недавних жалоб не обогащаются и не отправляются в Telegram.
+        # Жалобы чанка проверяются по порядку: копия более ранней жалобы того же
+        # чанка берет ее результаты, хотя та еще не попала в общий индекс
+        chunk_index = duplicate_index.chunk_index()
+        lookups = []
+        for position, (_, c) in enumerate(valid):
+            signature, duplicate = duplicate_index.lookup(c.text)
+            leader = None
+            if duplicate is None and signature is not None:
+                leader = chunk_index.query(c.text, signature)
+                if leader is None:
+                    chunk_index.add(position, c.text, "", "", signature=signature)
+            lookups.append((signature, duplicate, leader))
+        fresh = iter(await asyncio.gather(*(
+            enrich(c) for (_, c), (_, duplicate, leader) in zip(valid, lookups)
+            if duplicate is None and leader is None
+        )))
+        enrichments = [
+            next(fresh) if duplicate is None and leader is None else None
+            for _, duplicate, leader in lookups
+        ]
+        for position, (_, _, leader) in enumerate(lookups):
+            if leader is not None:
+                enrichments[position] = enrichments[leader.canonical_id]
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "text": c.text,
+                "sentiment": e.sentiment if e is not None else duplicate.sentiment,
+                "category": e.category if e is not None else duplicate.category,
+                "status": "open",
+                "timestamp": now
+            }
+            for (_, c), e, (_, duplicate, _) in zip(valid, enrichments, lookups)
+        ]
+        try:
+            # Одна executemany-вставка на чанк, id возвращаются в порядке строк
+            result = await db.execute(
+                insert(Complaint).returning(Complaint.id, sort_by_parameter_order=True),
+                rows
+            )
+            ids = result.scalars().all()
+            
+            # Уведомления и связи с оригиналами — той же транзакцией, одной вставкой каждые
+            notifications = []
+            duplicates = []
+            canonical_ids = []
+            for complaint_id, row, e, (_, duplicate, leader) in zip(ids, rows, enrichments, lookups):
+                is_spam = e.spam.get("is_spam", False) if e is not None else duplicate.is_spam
+                data = complaint_notification_data(Complaint(id=complaint_id, **row), client_ip, is_spam)
+                match = duplicate or leader
+                if match is None:
+                    canonical_ids.append(None)
+                    notifications.extend(outbox_rows(data))
+                    continue
+                canonical_id = duplicate.canonical_id if duplicate is not None else ids[leader.canonical_id]
+                canonical_ids.append(canonical_id)
+                duplicates.append({
+                    "complaint_id": complaint_id,
+                    "canonical_id": canonical_id,
+                    "similarity": match.similarity
+                })
+                notifications.extend(outbox_rows(data, DUPLICATE_TOPICS))
+            await db.execute(insert(OutboxMessage), notifications)
+            if duplicates:
+                await db.execute(insert(ComplaintDuplicate), duplicates)
+            await db.commit()
+            outbox_dispatcher.notify()
+        except Exception as e:
+            await db.rollback()
+            logger.exception("Error inserting complaints batch: %s", e)
+            items.extend(
+                ComplaintBatchItem(index=index, error=f"Database error: {e}")
+                for index, _ in valid
+            )
+            return
+        for (index, c), complaint_id, row, e, (signature, _, _), canonical_id in zip(
+            valid, ids, rows, enrichments, lookups, canonical_ids
+        ):
+            if canonical_id is None:
+                duplicate_index.add(
+                    complaint_id, c.text, row["sentiment"], row["category"],
+                    e.spam.get("is_spam", False), signature
+                )
+            items.append(ComplaintBatchItem(
+                index=index,
+                id=complaint_id,
+                duplicate_of=canonical_id
+            ))
+
+    try:
+        async for index, value in iter_json_items(request.stream()):
+            if isinstance(value, ValueError):
+                chunk.append((index, str(value)))
+            else:
+                try:
+                    chunk.append((index, ComplaintCreate.model_validate(value)))
+                except ValidationError as e:
+                    chunk.append((index, f"Validation error: {e.errors()[0]['msg']}"))
+
+            if len(chunk) >= settings.BATCH_CHUNK_SIZE:
+                await flush_chunk()
+                chunk = []
+
+        if chunk:
+            await flush_chunk()
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+    if retry_after is not None:
+        response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    items.sort(key=lambda item: item.index)
+    created = sum(1 for item in items if item.id is not None)
+    return ComplaintBatchResponse(
+        total=len(items),
+        created=created,
+        failed=len(items) - created,
+        items=items
+    )
+
+@router.get("/", response_model=ComplaintPage)
 async def get_complaints(
     status: Optional[str] = None,
     category: Optional[str] = None,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    limit: int = Query(settings.COMPLAINTS_PAGE_SIZE, ge=1, le=settings.COMPLAINTS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
-    """Получение списка жалоб с фильтрацией"""
+    """Список жалоб с фильтрацией, от новых к старым, постранично по курсору.
+
+    Страница продолжается с позиции (timestamp, id) из курсора, поэтому
+    стоимость любой страницы одинакова и определяется индексами
+    (status, timestamp), (category, timestamp) или (timestamp).
+    """
     try:
-        query = db.query(Complaint)
+        query = select(
+            Complaint.id, Complaint.status, Complaint.sentiment,
+            Complaint.category, Complaint.timestamp
+        )
         
         if status:
-            query = query.filter(Complaint.status == status)
+            query = query.where(Complaint.status == status)
         if category:
-            query = query.filter(Complaint.category == category)
-            
-        complaints = query.limit(limit).all()
+            query = query.where(Complaint.category == category)
+        if cursor:
+            try:
+                after_timestamp, after_id = decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            query = query.where(
+                tuple_(Complaint.timestamp, Complaint.id) < tuple_(after_timestamp, after_id)
+            )
         
-        return [
-            ComplaintResponse(
-                id=c.id,
-                status=c.status,
-                sentiment=c.sentiment,
-                category=c.category
-            ) for c in complaints
-        ]
+        # Лишняя строка показывает, есть ли следующая страница
+        result = await db.execute(
+            query.order_by(Complaint.timestamp.desc(), Complaint.id.desc()).limit(limit + 1)
+        )
+        rows = result.all()
+        page = rows[:limit]
         
+        return ComplaintPage(
+            items=[
+                ComplaintResponse(
+                    id=row.id,
+                    status=row.status,
+                    sentiment=row.sentiment,
+                    category=row.category
+                ) for row in page
+            ],
+            next_cursor=encode_cursor(page[-1].timestamp, page[-1].id) if len(rows) > limit else None
+        )
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+@router.get("/export/")
+async def export_complaints(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    status: Optional[str] = None,
+    category: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Потоковая выгрузка жалоб в NDJSON или CSV, от старых к новым.
+
+    Строки читаются серверным курсором по EXPORT_CHUNK_SIZE и сразу
+    отправляются клиенту, поэтому память не зависит от размера выгрузки.
+    Порядок (timestamp, id) совпадает с индексами, и сортировки нет.
+    """
+    query = select(*(getattr(Complaint, column) for column in EXPORT_COLUMNS))
+    if status:
+        query = query.where(Complaint.status == status)
+    if category:
+        query = query.where(Complaint.category == category)
+    # В базе время хранится в UTC без зоны
+    if since:
+        query = query.where(Complaint.timestamp >= _as_utc(since))
+    if until:
+        query = query.where(Complaint.timestamp < _as_utc(until))
+    query = query.order_by(Complaint.timestamp, Complaint.id).execution_options(
+        yield_per=settings.EXPORT_CHUNK_SIZE
+    )
+    render = csv_chunk if format == "csv" else ndjson_chunk
+
+    async def stream():
+        if format == "csv":
+            yield csv_header()
+        # Своя сессия: ответ читается дольше, чем живет обработчик запроса
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(query)
+            async for rows in result.partitions():
+                yield render(rows)
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="complaints.{format}"'}
+    )
+
 @router.get("/recent/", response_model=list[ComplaintResponse])
 async def get_recent_complaints(
     hours: int = 1,
     status: str = "open",
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Получение жалоб за последние N часов (для n8n)"""
     try:
         time_threshold = datetime.now(timezone.utc) - timedelta(hours=hours)
         
-        complaints = db.query(Complaint).filter(
-            Complaint.status == status,
-            Complaint.timestamp >= time_threshold
-        ).all()
+        result = await db.execute(
+            select(Complaint).where(
+                Complaint.status == status,
+                Complaint.timestamp >= time_threshold
+            )
+        )
+        complaints = result.scalars().all()
         
         return [
             ComplaintResponse(
@@ -145,15 +465,17 @@ async def get_recent_complaints(
 async def update_complaint(
     complaint_id: int,
     complaint_update: ComplaintUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Обновление статуса жалобы (для n8n)"""
     try:
-        db_complaint = db.query(Complaint).filter(Complaint.id == complaint_id).first()
+        db_complaint = await db.get(Complaint, complaint_id)
         
         if not db_complaint:
             raise HTTPException(status_code=404, detail="Complaint not found")
         
+        marked_spam = complaint_update.status == SPAM_STATUS and db_complaint.status != SPAM_STATUS
+        
         # Обновление полей
         if complaint_update.status is not None:
             db_complaint.status = complaint_update.status
@@ -162,8 +484,19 @@ async def update_complaint(
         if complaint_update.category is not None:
             db_complaint.category = complaint_update.category
         
-        db.commit()
-        db.refresh(db_complaint)
+        await db.commit()
+        complaint_cache.invalidate(complaint_id)
+        await db.refresh(db_complaint)
+        # Жалоба, только что помеченная спамом, сразу пополняет отпечатки префильтра
+        if marked_spam:
+            spam_service.prefilter.learn(db_complaint.text)
+        # Копии этой жалобы получат исправленные значения
+        duplicate_index.update(
+            complaint_id,
+            sentiment=complaint_update.sentiment,
+            category=complaint_update.category,
+            is_spam=True if complaint_update.status == SPAM_STATUS else None
+        )
         
         return ComplaintResponse(
             id=db_complaint.id,
@@ -175,29 +508,49 @@ async def update_complaint(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.get("/{complaint_id}/", response_model=ComplaintResponse)
 async def get_complaint(
     complaint_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
 ):
-    """Получение конкретной жалобы по ID"""
-    try:
-        db_complaint = db.query(Complaint).filter(Complaint.id == complaint_id).first()
-        
-        if not db_complaint:
-            raise HTTPException(status_code=404, detail="Complaint not found")
-        
-        return ComplaintResponse(
-            id=db_complaint.id,
-            status=db_complaint.status,
-            sentiment=db_complaint.sentiment,
-            category=db_complaint.category
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}") 
\ No newline at end of file
+    """Получение конкретной жалобы по ID.
+
+    Ответ кэшируется в процессе и несет ETag; при совпадении If-None-Match
+    с закэшированной версией возвращается 304 без обращения к базе.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    cached = complaint_cache.get(complaint_id)
+    if cached is not None:
+        complaint_response, etag = cached
+    else:
+        try:
+            version = complaint_cache.version()
+            db_complaint = await db.get(Complaint, complaint_id)
+            
+            if not db_complaint:
+                raise HTTPException(status_code=404, detail="Complaint not found")
+            
+            complaint_response = ComplaintResponse(
+                id=db_complaint.id,
+                status=db_complaint.status,
+                sentiment=db_complaint.sentiment,
+                category=db_complaint.category
+            )
+            etag = complaint_cache.set(complaint_id, complaint_response, version)
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    # Клиент обязан перепроверять ответ, но без изменений получает пустой 304
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return complaint_response
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, HTTPException
+
+from ..services.circuit_breaker import breaker_states
+from .complaints import enrichment_service, duplicate_index, complaint_cache
+
+router = APIRouter(prefix="/diagnostics", tags=["diagnostics"])
+
+@router.get("/cache/")
+async def enrichment_cache_stats():
+    """Счетчики попаданий и промахов кэша результатов обогащения"""
+    if enrichment_service.result_cache is None:
+        return {"enabled": False}
+    try:
+        return {"enabled": True, **await enrichment_service.result_cache.stats()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Cache error: {str(e)}")
+
+@router.get("/circuits/")
+async def circuit_breaker_states():
+    """Состояние предохранителей внешних провайдеров в этом процессе"""
+    return breaker_states()
+
+@router.get("/spam-prefilter/")
+async def spam_prefilter_stats():
+    """Размер индекса отпечатков спама и число отслеживаемых IP в этом процессе"""
+    return enrichment_service.spam_service.prefilter.stats()
+
+@router.get("/duplicates/")
+async def duplicate_index_stats():
+    """Размер индекса почти дословных копий в этом процессе"""
+    return {"enabled": duplicate_index.enabled, **duplicate_index.stats()}
+
+@router.get("/complaint-cache/")
+async def complaint_cache_stats():
+    """Размер и попадания кэша чтения жалоб в этом процессе"""
+    return complaint_cache.stats()
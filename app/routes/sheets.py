@@ -1,14 +1,24 @@
+import logging
+from typing import Any, Dict
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..models.database import get_db, Complaint
-from ..services import GoogleSheetsService
+from ..config import settings
+from ..models.database import get_db, Complaint, ExportState, OutboxMessage, SheetRow
+from ..services import GoogleSheetsService, job_queue
+from ..services.outbox import SHEETS_TOPIC, record_sheet_rows
+from ..utils import complaint_notification_data
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/sheets", tags=["sheets"])
 
 # Инициализация сервиса
 sheets_service = GoogleSheetsService()
 
+SHEETS_EXPORT_NAME = "sheets"
+
 @router.post("/setup/")
 async def setup_google_sheets():
     """Настройка Google Sheets (создание заголовков)"""
@@ -23,54 +33,179 @@ async def setup_google_sheets():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sheets setup error: {str(e)}")
 
+async def _summary_from_db(db: AsyncSession) -> Dict[str, Any]:
+    """Сводка по жалобам одним агрегирующим запросом к базе"""
+    result = await db.execute(
+        select(Complaint.category, Complaint.sentiment, Complaint.status, func.count())
+        .group_by(Complaint.category, Complaint.sentiment, Complaint.status)
+    )
+    summary = {
+        "total_complaints": 0,
+        "categories": {},
+        "sentiments": {},
+        "statuses": {}
+    }
+    for category, sentiment, status, count in result.all():
+        category = category or "Неизвестно"
+        sentiment = sentiment or "Неизвестно"
+        status = status or "Неизвестно"
+        summary["total_complaints"] += count
+        summary["categories"][category] = summary["categories"].get(category, 0) + count
+        summary["sentiments"][sentiment] = summary["sentiments"].get(sentiment, 0) + count
+        summary["statuses"][status] = summary["statuses"].get(status, 0) + count
+    return summary
+
 @router.get("/summary/")
-async def get_sheets_summary():
-    """Получение сводки из Google Sheets"""
+async def get_sheets_summary(reconcile: bool = False, db: AsyncSession = Depends(get_db)):
+    """Сводка по жалобам.
+    
+    Считается агрегатами по базе, без загрузки всего листа. reconcile=true
+    дополнительно читает лист и сравнивает его сводку с базой.
+    """
     try:
-        summary = await sheets_service.get_complaints_summary()
+        summary = await _summary_from_db(db)
+        response = {
+            "status": "success",
+            "data": summary
+        }
         
-        if summary:
-            return {
-                "status": "success",
-                "data": summary
-            }
-        else:
-            return {"status": "error", "message": "Failed to get summary from Google Sheets"}
+        if reconcile:
+            sheet_summary = await sheets_service.get_complaints_summary()
+            if sheet_summary is None:
+                response["reconciliation"] = {
+                    "status": "error",
+                    "message": "Failed to get summary from Google Sheets"
+                }
+            else:
+                response["reconciliation"] = {
+                    "status": "success",
+                    "in_sync": sheet_summary == summary,
+                    "sheet": sheet_summary
+                }
+        
+        return response
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sheets summary error: {str(e)}")
 
+async def _move_watermark(db: AsyncSession, expected: int, value: int) -> bool:
+    """Условный сдвиг отметки экспорта; False — ее уже сдвинул другой экспорт"""
+    result = await db.execute(
+        update(ExportState)
+        .where(ExportState.name == SHEETS_EXPORT_NAME, ExportState.last_id == expected)
+        .values(last_id=value)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
 @router.post("/export/")
-async def export_complaints_to_sheets(db: Session = Depends(get_db)):
-    """Экспорт всех жалоб в Google Sheets"""
+async def export_complaints_to_sheets(full: bool = False, db: AsyncSession = Depends(get_db)):
+    """Инкрементальный экспорт жалоб в Google Sheets.
+    
+    Выгружаются только жалобы с id больше сохраненной отметки, чанками по
+    SHEETS_EXPORT_CHUNK_SIZE строк (один append_rows на чанк). Диапазон id
+    чанка захватывается условным сдвигом отметки в базе, поэтому экспорты
+    в разных процессах не выгружают одни и те же жалобы; если запись в лист
+    не удалась, отметка возвращается и следующий запуск продолжит с места
+    остановки. Жалобы, которые уже записал outbox или ждут его доставки,
+    пропускаются. full=true начинает с начала и дописывает только
+    недостающие в листе жалобы.
+    """
+    if not sheets_service.is_configured:
+        return {"status": "error", "message": "Google Sheets not configured"}
+    
     try:
-        # Получаем все жалобы
-        complaints = db.query(Complaint).all()
+        await db.execute(
+            insert(ExportState).prefix_with("OR IGNORE").values(name=SHEETS_EXPORT_NAME, last_id=0)
+        )
+        if full:
+            await db.execute(
+                update(ExportState).where(ExportState.name == SHEETS_EXPORT_NAME).values(last_id=0)
+            )
+        await db.commit()
+        
+        total_complaints = await db.scalar(select(func.count()).select_from(Complaint)) or 0
         
         exported_count = 0
-        for complaint in complaints:
-            complaint_data = {
-                "id": complaint.id,
-                "text": complaint.text,
-                "category": complaint.category,
-                "sentiment": complaint.sentiment,
-                "status": complaint.status,
-                "created_at": complaint.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                "ip_address": "N/A",
-                "is_spam": False
-            }
+        skipped_count = 0
+        while True:
+            last_id = await db.scalar(
+                select(ExportState.last_id).where(ExportState.name == SHEETS_EXPORT_NAME)
+            )
+            chunk_ids = (await db.execute(
+                select(Complaint.id)
+                .where(Complaint.id > last_id)
+                .order_by(Complaint.id)
+                .limit(settings.SHEETS_EXPORT_CHUNK_SIZE)
+            )).scalars().all()
+            if not chunk_ids:
+                break
+            chunk_end = chunk_ids[-1]
+            if not await _move_watermark(db, last_id, chunk_end):
+                # Этот диапазон забрал параллельный экспорт — берем следующий
+                continue
+            
+            # Строки жалоб, записанных outbox или ожидающих его доставки, не дублируются
+            result = await db.execute(
+                select(Complaint)
+                .where(
+                    Complaint.id > last_id,
+                    Complaint.id <= chunk_end,
+                    Complaint.id.not_in(select(SheetRow.complaint_id)),
+                    Complaint.id.not_in(
+                        select(func.json_extract(OutboxMessage.payload, "$.id"))
+                        .where(
+                            OutboxMessage.topic == SHEETS_TOPIC,
+                            OutboxMessage.status != job_queue.FAILED
+                        )
+                    ),
+                )
+                .order_by(Complaint.id)
+            )
+            complaints = result.scalars().all()
+            skipped_count += len(chunk_ids) - len(complaints)
+            
+            complaints_data = [
+                complaint_notification_data(complaint, "N/A", False)
+                for complaint in complaints
+            ]
+            if complaints_data and not await sheets_service.add_complaints_to_sheet(complaints_data):
+                if not await _move_watermark(db, chunk_end, last_id):
+                    logger.warning(
+                        "Export watermark moved by another export, range needs full=true",
+                        extra={"first_id": last_id + 1, "last_id": chunk_end}
+                    )
+                return {
+                    "status": "error",
+                    "message": f"Export stopped after {exported_count} complaints, "
+                               f"next run resumes after id {last_id}",
+                    "data": {
+                        "total_complaints": total_complaints,
+                        "exported_count": exported_count,
+                        "skipped_count": skipped_count,
+                        "last_exported_id": last_id
+                    }
+                }
             
-            if await sheets_service.add_complaint_to_sheet(complaint_data):
-                exported_count += 1
+            await record_sheet_rows(db, [complaint.id for complaint in complaints])
+            await db.commit()
+            exported_count += len(complaints)
+            # Чанк выгружен — освобождаем объекты сессии
+            for complaint in complaints:
+                db.expunge(complaint)
         
         return {
             "status": "success",
             "message": f"Exported {exported_count} complaints to Google Sheets",
             "data": {
-                "total_complaints": len(complaints),
-                "exported_count": exported_count
+                "total_complaints": total_complaints,
+                "exported_count": exported_count,
+                "skipped_count": skipped_count,
+                "last_exported_id": last_id
             }
         }
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Export error: {str(e)}") 
\ No newline at end of file
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Export error: {str(e)}")
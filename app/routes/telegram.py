@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta, timezone
 
 from ..models.database import get_db, Complaint
@@ -27,19 +28,23 @@ async def test_telegram():
         raise HTTPException(status_code=500, detail=f"Telegram error: {str(e)}")
 
 @router.post("/daily-report/")
-async def send_daily_report(db: Session = Depends(get_db)):
+async def send_daily_report(db: AsyncSession = Depends(get_db)):
     """Отправка ежедневного отчета в Telegram"""
     try:
         # Подсчет жалоб за последние 24 часа
         yesterday = datetime.now(timezone.utc) - timedelta(days=1)
-        total_complaints = db.query(Complaint).filter(
-            Complaint.timestamp >= yesterday
-        ).count()
+        total_complaints = await db.scalar(
+            select(func.count()).select_from(Complaint).where(
+                Complaint.timestamp >= yesterday
+            )
+        ) or 0
         
-        open_complaints = db.query(Complaint).filter(
-            Complaint.status == "open",
-            Complaint.timestamp >= yesterday
-        ).count()
+        open_complaints = await db.scalar(
+            select(func.count()).select_from(Complaint).where(
+                Complaint.status == "open",
+                Complaint.timestamp >= yesterday
+            )
+        ) or 0
         
         success = await telegram_service.send_daily_report(total_complaints, open_complaints)
         
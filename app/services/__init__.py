@@ -8,6 +8,11 @@ from .geolocation_service import GeolocationService
 from .ai_category_service import AICategoryService
 from .telegram_service import TelegramService
 from .sheets_service import GoogleSheetsService
+from .enrichment_service import EnrichmentService, EnrichmentResult
+from .telegram_dispatcher import TelegramDispatcher
+from .outbox import OutboxDispatcher
+from .duplicate_index import DuplicateIndex, DuplicateMatch
+from .complaint_cache import ComplaintCache
 
 __all__ = [
     'SentimentService',
@@ -15,5 +20,12 @@ __all__ = [
     'GeolocationService',
     'AICategoryService',
     'TelegramService',
-    'GoogleSheetsService'
+    'GoogleSheetsService',
+    'EnrichmentService',
+    'EnrichmentResult',
+    'TelegramDispatcher',
+    'OutboxDispatcher',
+    'DuplicateIndex',
+    'DuplicateMatch',
+    'ComplaintCache'
 ] 
\ No newline at end of file
@@ -1,67 +1,130 @@
 import os
-from openai import OpenAI
+import asyncio
+import logging
+import time
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import openai
+from openai import AsyncOpenAI
+
+from ..config import settings
+from ..utils.deadline import remaining
+from .circuit_breaker import get_breaker, retry_after_seconds
+from .keyword_matcher import fallback_matcher
+
+logger = logging.getLogger(__name__)
 
 class AICategoryService:
     def __init__(self):
         self.api_key = os.getenv("OPENAI_API_KEY")
         if self.api_key:
-            self.client = OpenAI(api_key=self.api_key)
+            self.client = AsyncOpenAI(
+                api_key=self.api_key,
+                timeout=settings.OPENAI_TIMEOUT,
+                max_retries=settings.OPENAI_MAX_RETRIES
+            )
         else:
             self.client = None
+        # Ограничение числа одновременных запросов к OpenAI
+        self._semaphore = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY)
+        self.breaker = get_breaker("openai")
     
     async def categorize_complaint(self, text: str) -> str:
         """Определение категории жалобы с помощью OpenAI или простых правил"""
-        print(f"DEBUG: API key exists: {bool(self.api_key)}, Client exists: {bool(self.client)}")
+        category, _ = await self.categorize_complaint_result(text)
+        return category
+    
+    async def categorize_complaint_result(self, text: str) -> Tuple[str, bool]:
+        """Категория и признак degraded: True, если ответа OpenAI нет
+        и категория получена простыми правилами"""
         if not self.api_key or not self.client:
-            print(f"DEBUG: Using simple categorization for: {text}")
-            return self._simple_categorization(text)
+            return self._simple_categorization(text), True
+        
+        # Бюджет запроса исчерпан, OpenAI недоступен или квота исчерпана —
+        # сразу простые правила
+        if remaining(settings.OPENAI_TIMEOUT) <= 0 or not self.breaker.allow_request():
+            return self._simple_categorization(text), True
         
         try:
             prompt = f'Определи категорию жалобы: "{text}". Варианты: техническая, оплата, другое. Ответ только одним словом.'
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Ты помощник для категоризации жалоб клиентов."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=10,
-                temperature=0.1
-            )
+            async with self._semaphore:
+                # Остаток бюджета считается после ожидания семафора
+                timeout = remaining(settings.OPENAI_TIMEOUT)
+                started = time.monotonic()
+                try:
+                    response = await self.client.chat.completions.create(
+                        model="gpt-3.5-turbo",
+                        messages=[
+                            {"role": "system", "content": "Ты помощник для категоризации жалоб клиентов."},
+                            {"role": "user", "content": prompt}
+                        ],
+                        max_tokens=10,
+                        temperature=0.1,
+                        timeout=timeout
+                    )
+                except asyncio.CancelledError:
+                    # Стадию оборвал бюджет запроса: ошибка OpenAI, только если
+                    # ответа не было дольше порога медленного вызова
+                    self.breaker.record_cancelled(started)
+                    raise
+            self.breaker.record_success()
             
             category = response.choices[0].message.content.strip().lower() if response.choices[0].message.content else "другое"
             
             # Валидация категории
             valid_categories = ["техническая", "оплата", "другое"]
             if category in valid_categories:
-                return category
+                return category, False
             else:
-                return "другое"
+                return "другое", False
                 
-        except Exception as e:
-            error_msg = str(e)
-            if "insufficient_quota" in error_msg or "429" in error_msg:
-                print(f"OpenAI API quota exceeded, using fallback categorization for: {text[:50]}...")
+        except openai.RateLimitError as e:
+            if e.code == "insufficient_quota":
+                # Квота сама не восстановится — не повторяем запросы долгое время
+                logger.warning("OpenAI API quota exceeded, using fallback categorization")
+                self.breaker.record_failure(open_for=settings.OPENAI_QUOTA_COOLDOWN)
             else:
-                print(f"Error categorizing complaint: {e}")
+                logger.warning("OpenAI API rate limit hit, using fallback categorization")
+                self.breaker.record_status(
+                    e.status_code, retry_after_seconds(e.response.headers.get("retry-after"))
+                )
+            return self._simple_categorization(text), True
+        except openai.APITimeoutError as e:
+            logger.warning("OpenAI request timed out, using fallback categorization: %s", e)
+            self.breaker.record_timeout(timeout, settings.OPENAI_TIMEOUT, started)
+            return self._simple_categorization(text), True
+        except openai.APIStatusError as e:
+            logger.warning("Error categorizing complaint: %s", e)
+            self.breaker.record_status(e.status_code)
+            return self._simple_categorization(text), True
+        except Exception as e:
+            # Таймауты и ошибки соединения
+            logger.warning("Error categorizing complaint: %s", e)
+            self.breaker.record_failure()
             # Fallback на простую категоризацию
-            return self._simple_categorization(text)
+            return self._simple_categorization(text), True
     
     def _simple_categorization(self, text: str) -> str:
         """Простая категоризация на основе ключевых слов"""
-        text_lower = text.lower()
+        counts = fallback_matcher.count(text)
         
-        # Технические проблемы
-        tech_keywords = ['сайт', 'приложение', 'ошибка', 'не работает', 'зависает', 'вылетает', 
-                        'не загружается', 'медленно', 'баг', 'глюк', 'техническая', 'программа']
-        if any(keyword in text_lower for keyword in tech_keywords):
+        # Технические проблемы проверяются первыми
+        if counts["technical"]:
             return "техническая"
-        
-        # Проблемы с оплатой
-        payment_keywords = ['деньги', 'оплата', 'платеж', 'счет', 'списали', 'дважды', 
-                           'возврат', 'штраф', 'комиссия', 'цена', 'стоимость']
-        if any(keyword in text_lower for keyword in payment_keywords):
+        if counts["payment"]:
             return "оплата"
         
         # По умолчанию
-        return "другое" 
\ No newline at end of file
+        return "другое"
+    
+    def categorize_batch(self, texts: Sequence[str]) -> List[str]:
+        """Пакетная категоризация по ключевым словам (метки как у _simple_categorization)"""
+        counts = fallback_matcher.count_batch(texts)
+        labels = np.select(
+            [counts["technical"] > 0, counts["payment"] > 0],
+            ["техническая", "оплата"],
+            default="другое"
+        )
+        return labels.tolist()
@@ -0,0 +1,170 @@
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Предохранитель для внешнего провайдера.
+
+    closed — запросы идут к провайдеру, подряд идущие ошибки считаются;
+    open — после failure_threshold ошибок запросы сразу уходят в локальный
+    fallback на recovery_timeout секунд; half_open — пропускается
+    half_open_max_calls пробных запросов: успех закрывает предохранитель,
+    ошибка снова открывает его. Вызов, оборванный бюджетом запроса после
+    slow_call_threshold секунд ожидания, тоже считается ошибкой. Состояние
+    хранится в памяти процесса.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = settings.CIRCUIT_FAILURE_THRESHOLD,
+        recovery_timeout: float = settings.CIRCUIT_RECOVERY_TIMEOUT,
+        half_open_max_calls: int = settings.CIRCUIT_HALF_OPEN_MAX_CALLS,
+        slow_call_threshold: float = settings.CIRCUIT_SLOW_CALL_THRESHOLD,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.slow_call_threshold = slow_call_threshold
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.open_for = recovery_timeout
+        self._half_open_calls = 0
+        self._probe_started = 0.0
+        # Счетчики для диагностики
+        self.rejected = 0
+        self.opened_count = 0
+
+    def allow_request(self) -> bool:
+        """Можно ли обращаться к провайдеру; False — сразу использовать fallback"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_for:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            self._half_open_calls = 0
+            logger.info("Circuit half-open", extra={"circuit": self.name})
+        # Пробный запрос, оборванный без результата, не блокирует новые пробы
+        probe_stale = time.monotonic() - self._probe_started >= self.recovery_timeout
+        if self._half_open_calls < self.half_open_max_calls or probe_stale:
+            if probe_stale:
+                self._half_open_calls = 0
+            self._half_open_calls += 1
+            self._probe_started = time.monotonic()
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            logger.info("Circuit closed", extra={"circuit": self.name})
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self, open_for: Optional[float] = None) -> None:
+        """Ошибка вызова; open_for — открыть сразу на указанное время (квота, Retry-After)"""
+        self.failures += 1
+        if open_for is not None or self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self._open(open_for if open_for is not None else self.recovery_timeout)
+
+    def record_cancelled(self, started: Optional[float] = None) -> None:
+        """Вызов оборван бюджетом запроса; started — time.monotonic() его начала.
+
+        Если провайдер молчал дольше slow_call_threshold, это ошибка: иначе
+        зависший провайдер держал бы каждый запрос до конца бюджета, не
+        открывая предохранитель. Более короткий обрыв (бюджет почти
+        исчерпан до вызова) не считается ни успехом, ни ошибкой; пробный
+        запрос в half_open освобождает место для следующей пробы.
+        """
+        if started is not None and time.monotonic() - started >= self.slow_call_threshold:
+            self.record_failure()
+            return
+        if self.state == HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def record_timeout(
+        self, timeout: float, provider_timeout: float, started: Optional[float] = None
+    ) -> None:
+        """Таймаут вызова: ошибка, если провайдер не уложился в свой полный
+        таймаут; таймаут, укороченный бюджетом запроса, учитывается как отмена"""
+        if timeout < provider_timeout:
+            self.record_cancelled(started)
+        else:
+            self.record_failure()
+
+    def record_status(self, status_code: int, retry_after: Optional[float] = None) -> bool:
+        """Учет HTTP-ответа провайдера; возвращает True для успешного ответа.
+
+        429 открывает предохранитель сразу (на Retry-After, если он указан),
+        5xx и ошибки ключа 401/403 считаются ошибками провайдера, прочие
+        4xx относятся к конкретному запросу и провайдер считается живым.
+        """
+        if status_code < 400:
+            self.record_success()
+            return True
+        if status_code == 429:
+            self.record_failure(open_for=retry_after or self.recovery_timeout)
+        elif status_code >= 500 or status_code in (401, 403):
+            self.record_failure()
+        else:
+            self.record_success()
+        return False
+
+    def _open(self, duration: float) -> None:
+        if self.state != OPEN:
+            self.opened_count += 1
+            logger.warning(
+                "Circuit opened",
+                extra={"circuit": self.name, "failures": self.failures, "open_for": duration}
+            )
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.open_for = duration
+
+    def snapshot(self) -> Dict[str, Any]:
+        retry_in = 0.0
+        if self.state == OPEN:
+            retry_in = max(0.0, self.open_for - (time.monotonic() - self.opened_at))
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "retry_in": round(retry_in, 3),
+            "opened_count": self.opened_count,
+            "rejected": self.rejected,
+        }
+
+
+# Один предохранитель на провайдера на процесс
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name)
+    return _breakers[name]
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.snapshot() for name, breaker in sorted(_breakers.items())}
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Значение заголовка Retry-After в секундах (форма с датой не поддерживается)"""
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import settings
+from ..models.schemas import ComplaintResponse
+from ..utils.cache import TTLCache
+
+# Версия — (inode, mtime) файла: os.stat дешевле любого запроса к базе
+Version = Optional[Tuple[int, int]]
+
+
+def complaint_etag(response: ComplaintResponse) -> str:
+    """Сильный ETag: хэш сериализованного представления жалобы"""
+    digest = hashlib.sha256(response.model_dump_json().encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверка If-None-Match (для GET сравнение слабое: префикс W/ не важен)"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or any(
+        candidate.removeprefix("W/") == etag for candidate in candidates
+    )
+
+
+def bump_version(path: str) -> None:
+    """Отметить изменение жалоб для кэшей всех процессов.
+
+    Файл подменяется через os.replace, поэтому у новой версии другой inode
+    даже на файловых системах с грубым mtime.
+    """
+    if not path:
+        return
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as file:
+        file.write(str(time.time_ns()))
+    os.replace(temporary, path)
+
+
+class ComplaintCache:
+    """LRU-кэш ответов GET /complaints/{id}/ в памяти процесса.
+
+    Изменение жалобы в любом процессе меняет файл версии, и при следующем
+    чтении кэши остальных процессов очищаются целиком. Жалобы со статусом
+    обогащения «pending» не кэшируются: их дописывают воркеры, которые
+    версию не меняют. Пустой путь к файлу версии выключает кэш.
+    """
+
+    def __init__(
+        self,
+        version_path: str = settings.COMPLAINT_CACHE_VERSION_PATH,
+        maxsize: int = settings.COMPLAINT_CACHE_SIZE,
+        ttl: float = settings.COMPLAINT_CACHE_TTL,
+    ):
+        self.version_path = version_path
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._version: Version = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.version_path)
+
+    def version(self) -> Version:
+        """Текущая версия; если она сменилась, кэш процесса очищается"""
+        try:
+            stat = os.stat(self.version_path)
+            version = (stat.st_ino, stat.st_mtime_ns)
+        except OSError:
+            version = None
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+        return version
+
+    def get(self, complaint_id: int) -> Optional[Tuple[ComplaintResponse, str]]:
+        """(ответ, ETag) из кэша или None"""
+        if not self.enabled:
+            return None
+        self.version()
+        hit, value = self._entries.get(complaint_id)
+        if hit:
+            self.hits += 1
+            return value
+        self.misses += 1
+        return None
+
+    def set(self, complaint_id: int, response: ComplaintResponse, version: Version) -> str:
+        """Сохранить ответ, прочитанный из базы при версии version; возвращает ETag.
+
+        Если версия успела смениться, пока шел запрос к базе, ответ может быть
+        устаревшим и не сохраняется.
+        """
+        etag = complaint_etag(response)
+        if self.enabled and response.sentiment != "pending" and self.version() == version:
+            self._entries.set(complaint_id, (response, etag))
+        return etag
+
+    def invalidate(self, complaint_id: int) -> None:
+        """Жалоба изменилась: сбросить ее здесь и кэши других процессов"""
+        self._entries.pop(complaint_id)
+        bump_version(self.version_path)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import re
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from ..config import settings
+from ..models.database import AsyncSessionLocal, Complaint, ComplaintDuplicate, ComplaintRevision
+
+logger = logging.getLogger(__name__)
+
+# Длина символьного шингла: устойчива к замене отдельных слов
+SHINGLE_SIZE = 5
+# Короткие тексты («не работает») совпадают у разных клиентов — их не склеиваем
+MIN_TEXT_LENGTH = 20
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORDS = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> str:
+    """Нижний регистр, без пунктуации, слова через один пробел"""
+    return " ".join(_WORDS.findall(text.lower()))
+
+
+@dataclass
+class DuplicateMatch:
+    """Каноническая жалоба, найденная для почти дословной копии"""
+    canonical_id: int
+    similarity: float
+    sentiment: str
+    category: str
+    is_spam: bool
+
+
+@dataclass
+class _Entry:
+    signature: np.ndarray
+    sentiment: str
+    category: str
+    is_spam: bool
+
+
+class DuplicateIndex:
+    """MinHash LSH-индекс недавних канонических жалоб в памяти процесса.
+
+    Сигнатура — num_perm минимальных хэшей символьных шинглов; она делится
+    на bands полос, и жалобы с совпавшей полосой становятся кандидатами.
+    Кандидаты проверяются оценкой сходства Жаккара по сигнатурам, поэтому
+    поиск не зависит от числа хранимых жалоб. Индекс ограничен capacity
+    последними жалобами и дочитывает новые из базы раз в refresh_interval.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = settings.DUPLICATE_DETECTION,
+        threshold: float = settings.DUPLICATE_THRESHOLD,
+        num_perm: int = settings.DUPLICATE_NUM_PERM,
+        bands: int = settings.DUPLICATE_BANDS,
+        capacity: int = settings.DUPLICATE_INDEX_SIZE,
+        refresh_interval: float = settings.DUPLICATE_REFRESH_INTERVAL,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.enabled = enabled
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.capacity = capacity
+        self.refresh_interval = refresh_interval
+
+        # Фиксированное зерно и crc32 шинглов: сигнатуры одинаковы во всех процессах.
+        # Множитель меньше 2^32: произведение с 32-битным crc32 помещается в uint64
+        generator = np.random.RandomState(1)
+        self._a = generator.randint(1, _MAX_HASH, size=num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._buckets: List[Dict[bytes, Set[int]]] = [{} for _ in range(bands)]
+
+        self._last_revision = 0
+        self._last_refresh = time.monotonic()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash-сигнатура текста или None для слишком короткого текста"""
+        normalized = normalize_text(text)
+        if len(normalized) < MIN_TEXT_LENGTH:
+            return None
+        shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+        values = np.fromiter(
+            (zlib.crc32(shingle.encode()) for shingle in shingles),
+            dtype=np.uint64, count=len(shingles)
+        )
+        products = np.outer(self._a, values) % _MERSENNE_PRIME
+        hashed = (products + self._b[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+        return hashed.min(axis=1)
+
+    def lookup(self, text: str) -> Tuple[Optional[np.ndarray], Optional[DuplicateMatch]]:
+        """Сигнатура текста и найденная каноническая жалоба (None, None — поиск выключен)"""
+        if not self.enabled:
+            return None, None
+        signature = self.signature(text)
+        return signature, self.query(text, signature)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def query(self, text: str, signature: Optional[np.ndarray] = None) -> Optional[DuplicateMatch]:
+        """Наиболее похожая каноническая жалоба со сходством не ниже порога"""
+        self.schedule_refresh()
+        if signature is None:
+            signature = self.signature(text)
+        if signature is None:
+            return None
+
+        candidates: Set[int] = set()
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(buckets.get(key, ()))
+
+        if not candidates:
+            return None
+        ids = list(candidates)
+        similarities = (
+            np.stack([self._entries[complaint_id].signature for complaint_id in ids]) == signature
+        ).mean(axis=1)
+        best = int(similarities.argmax())
+        best_id, best_similarity = ids[best], float(similarities[best])
+        if best_similarity < self.threshold:
+            return None
+
+        entry = self._entries[best_id]
+        return DuplicateMatch(
+            canonical_id=best_id,
+            similarity=round(best_similarity, 3),
+            sentiment=entry.sentiment,
+            category=entry.category,
+            is_spam=entry.is_spam,
+        )
+
+    def add(
+        self,
+        complaint_id: int,
+        text: str,
+        sentiment: str,
+        category: str,
+        is_spam: bool = False,
+        signature: Optional[np.ndarray] = None,
+    ) -> None:
+        """Добавить каноническую жалобу; самые старые вытесняются"""
+        if not self.enabled:
+            return
+        if signature is None:
+            signature = self.signature(text)
+        if signature is None or complaint_id in self._entries:
+            return
+        self._entries[complaint_id] = _Entry(signature, sentiment, category, is_spam)
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            buckets.setdefault(key, set()).add(complaint_id)
+        while len(self._entries) > self.capacity:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, complaint_id: int) -> None:
+        entry = self._entries.pop(complaint_id)
+        for buckets, key in zip(self._buckets, self._band_keys(entry.signature)):
+            ids = buckets.get(key)
+            if ids is not None:
+                ids.discard(complaint_id)
+                if not ids:
+                    del buckets[key]
+
+    def update(
+        self,
+        complaint_id: int,
+        sentiment: Optional[str] = None,
+        category: Optional[str] = None,
+        is_spam: Optional[bool] = None,
+    ) -> None:
+        """Ручная правка канонической жалобы переходит на ее будущие копии"""
+        entry = self._entries.get(complaint_id)
+        if entry is None:
+            return
+        if sentiment is not None:
+            entry.sentiment = sentiment
+        if category is not None:
+            entry.category = category
+        if is_spam is not None:
+            entry.is_spam = is_spam
+
+    def schedule_refresh(self) -> None:
+        """Фоновая дозагрузка жалоб других процессов (0 — выключена)"""
+        if not self.enabled or self.refresh_interval <= 0:
+            return
+        if time.monotonic() - self._last_refresh < self.refresh_interval:
+            return
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def refresh(self) -> None:
+        """Загрузить из базы жалобы, обогащенные или измененные после прошлой загрузки.
+
+        Отметка — номер изменения жалобы, а не id: жалоба отложенного режима
+        попадает в индекс, когда воркер ее обогатит, даже если более новые
+        жалобы уже загружены. Правки уже загруженных жалоб переносятся в индекс.
+        """
+        if not self.enabled:
+            return
+        self._last_refresh = time.monotonic()
+        try:
+            async with AsyncSessionLocal() as db:
+                rows = (await db.execute(
+                    select(ComplaintRevision.revision, Complaint.id, Complaint.text,
+                           Complaint.sentiment, Complaint.category, Complaint.status)
+                    .join(Complaint, Complaint.id == ComplaintRevision.complaint_id)
+                    .outerjoin(ComplaintDuplicate, ComplaintDuplicate.complaint_id == Complaint.id)
+                    .where(
+                        ComplaintRevision.revision > self._last_revision,
+                        Complaint.sentiment != "pending",
+                        ComplaintDuplicate.complaint_id.is_(None),
+                    )
+                    .order_by(ComplaintRevision.revision.desc())
+                    .limit(self.capacity)
+                )).all()
+        except Exception as e:
+            logger.warning("Duplicate index refresh failed: %s", e)
+            return
+
+        for _, complaint_id, text, sentiment, category, status in reversed(rows):
+            if complaint_id in self._entries:
+                self.update(complaint_id, sentiment, category, status == "spam")
+            else:
+                self.add(complaint_id, text, sentiment, category, status == "spam")
+        if rows:
+            self._last_revision = max(self._last_revision, rows[0][0])
+
+    def chunk_index(self) -> "DuplicateIndex":
+        """Пустой индекс с теми же параметрами для копий внутри одного пакета"""
+        return DuplicateIndex(
+            enabled=True, threshold=self.threshold, num_perm=self.num_perm,
+            bands=self.bands, capacity=self.capacity, refresh_interval=0,
+        )
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "complaints": len(self._entries),
+            "buckets": sum(len(buckets) for buckets in self._buckets),
+            "last_revision": self._last_revision,
+        }
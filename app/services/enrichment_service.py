@@ -0,0 +1,196 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from ..config import settings
+from ..utils.deadline import remaining
+from .sentiment_service import SentimentService
+from .spam_service import SpamService
+from .geolocation_service import GeolocationService
+from .ai_category_service import AICategoryService
+from .result_cache import ResultCache, text_cache_key
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class EnrichmentResult:
+    """Результат обогащения жалобы"""
+    spam: Dict[str, Any]
+    sentiment: str
+    category: str
+    location: Dict[str, Any]
+    # Стадии, которые не уложились в дедлайн и вернули значение по умолчанию
+    timed_out: List[str] = field(default_factory=list)
+
+
+class EnrichmentService:
+    """Параллельный запуск стадий обработки жалобы с дедлайном на каждую стадию"""
+
+    def __init__(
+        self,
+        sentiment_service: Optional[SentimentService] = None,
+        ai_category_service: Optional[AICategoryService] = None,
+        spam_service: Optional[SpamService] = None,
+        geolocation_service: Optional[GeolocationService] = None,
+        result_cache: Optional[ResultCache] = None,
+    ):
+        self.sentiment_service = sentiment_service or SentimentService()
+        self.ai_category_service = ai_category_service or AICategoryService()
+        self.spam_service = spam_service or SpamService()
+        self.geolocation_service = geolocation_service or GeolocationService()
+        # Кэш результатов по тексту жалобы, общий для всех процессов
+        if result_cache is None and settings.ENRICHMENT_CACHE_PATH:
+            result_cache = ResultCache(
+                settings.ENRICHMENT_CACHE_PATH,
+                ttl={
+                    "sentiment": settings.ENRICHMENT_CACHE_TTL,
+                    "category": settings.ENRICHMENT_CACHE_TTL,
+                    "spam": settings.ENRICHMENT_CACHE_SPAM_TTL,
+                },
+                max_entries=settings.ENRICHMENT_CACHE_MAX_ENTRIES,
+            )
+        self.result_cache = result_cache
+
+    async def enrich(self, text: str, client_ip: str, check_sender: bool = True) -> EnrichmentResult:
+        """Проверка на спам, тональность, категория и геолокация — одновременно.
+
+        check_sender=False отключает сигналы спам-префильтра по IP (частота и
+        репутация) — для пакетной загрузки, где все жалобы приходят с одного адреса.
+        """
+        timed_out: List[str] = []
+        key = text_cache_key(text)
+
+        spam, sentiment, category, location = await asyncio.gather(
+            # Кэшируется только ответ API Ninjas по тексту: сигналы по IP
+            # отправителя префильтр считает на каждый запрос
+            self._run_stage(
+                "spam",
+                lambda: self.spam_service.check_spam(
+                    text, client_ip if check_sender else None, self._cached_remote_spam(key)
+                ),
+                settings.SPAM_STAGE_TIMEOUT,
+                lambda: {"is_spam": False, "score": 0},
+                timed_out,
+            ),
+            self._cached_stage(
+                "sentiment",
+                key,
+                lambda: self.sentiment_service.analyze_sentiment_result(text),
+                settings.SENTIMENT_STAGE_TIMEOUT,
+                lambda: self.sentiment_service._simple_sentiment_analysis(text),
+                timed_out,
+            ),
+            self._cached_stage(
+                "category",
+                key,
+                lambda: self.ai_category_service.categorize_complaint_result(text),
+                settings.CATEGORY_STAGE_TIMEOUT,
+                lambda: self.ai_category_service._simple_categorization(text),
+                timed_out,
+            ),
+            self._run_stage(
+                "geolocation",
+                lambda: self.geolocation_service.get_location(client_ip),
+                settings.GEOLOCATION_STAGE_TIMEOUT,
+                dict,
+                timed_out,
+            ),
+        )
+
+        return EnrichmentResult(
+            spam=spam,
+            sentiment=sentiment,
+            category=category,
+            location=location,
+            timed_out=timed_out,
+        )
+
+    def _cached_remote_spam(
+        self, key: str
+    ) -> Optional[Callable[[str], Awaitable[Optional[Dict[str, Any]]]]]:
+        """Проверка API Ninjas через кэш; пустой ответ (сбой, нет ключа) не кэшируется"""
+        if self.result_cache is None:
+            return None
+
+        async def check_remote(text: str) -> Optional[Dict[str, Any]]:
+            hit, value = await self.result_cache.get(key, "spam")
+            if hit:
+                return value
+            value = await self.spam_service.check_remote(text)
+            if value is not None:
+                await self.result_cache.set(key, "spam", value)
+            return value
+
+        return check_remote
+
+    async def _cached_stage(
+        self,
+        name: str,
+        key: str,
+        stage: Callable[[], Awaitable[Tuple[T, bool]]],
+        timeout: float,
+        fallback: Callable[[], T],
+        timed_out: List[str],
+    ) -> T:
+        """Стадия через кэш.
+
+        stage возвращает (значение, degraded): сервисы сами уходят в простые
+        правила при ошибке провайдера, открытом предохранителе или без ключа.
+        Такие значения, как и fallback по дедлайну, не кэшируются — иначе
+        временный сбой провайдера закрепился бы на весь TTL.
+        """
+        degraded: List[str] = []
+
+        async def checked() -> T:
+            value, stage_degraded = await stage()
+            if stage_degraded:
+                degraded.append(name)
+            return value
+
+        if self.result_cache is None:
+            return await self._run_stage(name, checked, timeout, fallback, timed_out)
+
+        hit, value = await self.result_cache.get(key, name)
+        if hit:
+            return value
+
+        value = await self._run_stage(name, checked, timeout, fallback, timed_out, degraded)
+        if not degraded:
+            await self.result_cache.set(key, name, value)
+        return value
+
+    async def _run_stage(
+        self,
+        name: str,
+        stage: Callable[[], Awaitable[T]],
+        timeout: float,
+        fallback: Callable[[], T],
+        timed_out: List[str],
+        degraded: Optional[List[str]] = None,
+    ) -> T:
+        """Выполнение одной стадии: по истечении дедлайна или при ошибке — fallback.
+
+        Дедлайн стадии — меньшее из ее таймаута и остатка бюджета запроса;
+        если бюджет уже исчерпан, стадия не запускается.
+        """
+        timeout = remaining(timeout)
+        try:
+            if timeout <= 0:
+                raise asyncio.TimeoutError
+            return await asyncio.wait_for(stage(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Enrichment stage timed out, using fallback", extra={"stage": name, "timeout": timeout})
+            timed_out.append(name)
+        except Exception as e:
+            logger.warning("Enrichment stage failed, using fallback: %s", e, extra={"stage": name})
+        if degraded is not None:
+            degraded.append(name)
+        return fallback()
+
+    async def close(self) -> None:
+        if self.result_cache is not None:
+            await self.result_cache.close()
@@ -0,0 +1,150 @@
+"""
+Офлайн-таблица диапазонов IPv4 для геолокации.
+
+Файл таблицы — отсортированные по началу диапазона записи фиксированной
+длины и блок JSON-меток. Файл отображается в память (mmap), поиск —
+бинарный, без загрузки таблицы в память процесса целиком.
+
+Записи таблицы не пересекаются — на этом держится бинарный поиск. Вложенные
+и пересекающиеся диапазоны исходных данных разворачиваются при сборке:
+каждому адресу достается самый узкий содержащий его диапазон.
+
+Сборка из CSV (network,country,countryCode,regionName,city; network —
+CIDR или диапазон "start-end"):
+
+    python -m app.services.geoip_table build ranges.csv geoip.bin
+"""
+
+import csv
+import heapq
+import ipaddress
+import json
+import mmap
+import struct
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+MAGIC = b"GEOIPv4\x00"
+HEADER = struct.Struct("<8sII")   # magic, число записей, смещение блока меток
+RECORD = struct.Struct("<IIII")   # начало, конец, смещение метки, длина метки
+
+LABEL_FIELDS = ("country", "countryCode", "regionName", "city")
+
+
+class GeoIPTable:
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, self._labels_offset = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Not a GeoIP table: {path}")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+    def lookup(self, ip: str) -> Optional[Dict[str, Any]]:
+        """Поиск диапазона, содержащего IPv4 адрес; None, если не найден.
+
+        Диапазоны таблицы не пересекаются (см. flatten_ranges), поэтому
+        достаточно последней записи с началом не больше адреса.
+        """
+        try:
+            address = int(ipaddress.IPv4Address(ip))
+        except ValueError:
+            return None
+
+        # Последняя запись с началом диапазона <= address
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            start = struct.unpack_from("<I", self._mmap, HEADER.size + middle * RECORD.size)[0]
+            if start <= address:
+                low = middle + 1
+            else:
+                high = middle
+        if low == 0:
+            return None
+
+        start, end, label_offset, label_length = RECORD.unpack_from(
+            self._mmap, HEADER.size + (low - 1) * RECORD.size
+        )
+        if address > end:
+            return None
+
+        offset = self._labels_offset + label_offset
+        label = json.loads(self._mmap[offset:offset + label_length])
+        return {"status": "success", "query": ip, "source": "offline", **label}
+
+
+def _parse_network(network: str) -> Tuple[int, int]:
+    if "-" in network:
+        start, end = network.split("-", 1)
+        return int(ipaddress.IPv4Address(start.strip())), int(ipaddress.IPv4Address(end.strip()))
+    net = ipaddress.IPv4Network(network.strip(), strict=False)
+    return int(net.network_address), int(net.broadcast_address)
+
+
+def flatten_ranges(ranges: List[Tuple[int, int, bytes]]) -> List[Tuple[int, int, bytes]]:
+    """Непересекающиеся диапазоны по возрастанию начала: на пересечении побеждает
+    самый узкий диапазон, при равной ширине — более поздний в исходных данных"""
+    boundaries = sorted({start for start, _, _ in ranges} | {end + 1 for _, end, _ in ranges})
+    by_start = sorted(range(len(ranges)), key=lambda i: ranges[i][0])
+    active: List[Tuple[int, int]] = []
+    flat: List[Tuple[int, int, bytes]] = []
+    next_range = 0
+    for segment_start, segment_next in zip(boundaries, boundaries[1:]):
+        while next_range < len(by_start) and ranges[by_start[next_range]][0] == segment_start:
+            i = by_start[next_range]
+            heapq.heappush(active, (ranges[i][1] - ranges[i][0], -i))
+            next_range += 1
+        # Закончившиеся диапазоны удаляются лениво, когда оказываются сверху
+        while active and ranges[-active[0][1]][1] < segment_start:
+            heapq.heappop(active)
+        if not active:
+            continue
+        label = ranges[-active[0][1]][2]
+        if flat and flat[-1][1] == segment_start - 1 and flat[-1][2] == label:
+            flat[-1] = (flat[-1][0], segment_next - 1, label)
+        else:
+            flat.append((segment_start, segment_next - 1, label))
+    return flat
+
+
+def build_table(csv_path: str, output_path: str) -> int:
+    """Сборка бинарной таблицы из CSV; возвращает число диапазонов"""
+    ranges: List[Tuple[int, int, bytes]] = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            start, end = _parse_network(row["network"])
+            label = {field: row.get(field, "") for field in LABEL_FIELDS}
+            ranges.append((start, end, json.dumps(label, ensure_ascii=False).encode("utf-8")))
+    ranges = flatten_ranges(ranges)
+
+    labels: Dict[bytes, int] = {}
+    label_blob = bytearray()
+    records = bytearray()
+    for start, end, label in ranges:
+        if label not in labels:
+            labels[label] = len(label_blob)
+            label_blob += label
+        records += RECORD.pack(start, end, labels[label], len(label))
+
+    labels_offset = HEADER.size + len(records)
+    with open(output_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(ranges), labels_offset))
+        f.write(records)
+        f.write(label_blob)
+    return len(ranges)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "build":
+        print("Usage: python -m app.services.geoip_table build <ranges.csv> <output.bin>")
+        sys.exit(1)
+    count = build_table(sys.argv[2], sys.argv[3])
+    print(f"GeoIP table written: {count} ranges")
@@ -1,27 +1,102 @@
+import asyncio
+import logging
 import httpx
-from typing import Dict, Any
+import ipaddress
+import time
+from typing import Dict, Any, Optional
 
-class GeolocationService:
-    def __init__(self):
+from ..config import settings
+from ..utils.cache import TTLCache
+from ..utils.deadline import remaining
+from .circuit_breaker import get_breaker, retry_after_seconds
+from .geoip_table import GeoIPTable
+from .http_client import HTTPClientMixin
+
+logger = logging.getLogger(__name__)
+
+class GeolocationService(HTTPClientMixin):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        self._http_client = http_client
         self.base_url = "http://ip-api.com/json"
+        self.breaker = get_breaker("ip_api")
+        
+        # Кэш по IP: успешные ответы живут дольше, неудачные — недолго
+        self.cache = TTLCache(maxsize=settings.GEO_CACHE_SIZE, ttl=settings.GEO_CACHE_TTL)
+        self.failure_ttl = settings.GEO_FAILURE_TTL
+        
+        # Необязательная офлайн-таблица диапазонов IP
+        self.offline_table: Optional[GeoIPTable] = None
+        if settings.GEOIP_TABLE_PATH:
+            try:
+                self.offline_table = GeoIPTable(settings.GEOIP_TABLE_PATH)
+            except Exception as e:
+                logger.error("Error loading GeoIP table %s: %s", settings.GEOIP_TABLE_PATH, e)
     
     async def get_location(self, ip: str) -> Dict[str, Any]:
-        """Получение геолокации по IP через IP API"""
+        """Получение геолокации по IP: кэш, офлайн-таблица, затем IP API"""
         if not ip or ip == "unknown":
             return {}
+        
+        hit, location = self.cache.get(ip)
+        if hit:
+            return location
+        
+        # Невалидные, локальные и служебные адреса не геолоцируются
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            self.cache.set(ip, {}, ttl=self.failure_ttl)
+            return {}
+        if not address.is_global:
+            self.cache.set(ip, {})
+            return {}
+        
+        if self.offline_table is not None:
+            location = self.offline_table.lookup(ip)
+            if location is not None:
+                self.cache.set(ip, location)
+                return location
             
+        # Бюджет запроса исчерпан или провайдер недоступен — без геолокации
+        # и без записи в кэш
+        budget = remaining(settings.HTTP_TIMEOUT)
+        if budget <= 0 or not self.breaker.allow_request():
+            return {}
+            
+        location = await self._fetch_location(ip, budget)
+        if location and location.get("status") != "fail":
+            self.cache.set(ip, location)
+        else:
+            self.cache.set(ip, location, ttl=self.failure_ttl)
+        return location
+    
+    async def _fetch_location(self, ip: str, timeout: float) -> Dict[str, Any]:
+        started = time.monotonic()
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/{ip}",
-                    timeout=10.0
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    print(f"IP API error: {response.status_code} for IP {ip}")
-                    return {}
+            response = await self.http_client.get(
+                f"{self.base_url}/{ip}",
+                timeout=timeout
+            )
+            # При превышении лимита ip-api сообщает время до сброса в X-Ttl
+            self.breaker.record_status(
+                response.status_code, retry_after_seconds(response.headers.get("x-ttl"))
+            )
+            
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.warning("IP API error", extra={"status_code": response.status_code})
+                return {}
+        except asyncio.CancelledError:
+            # Стадию оборвал бюджет запроса: ошибка провайдера, только если
+            # ответа не было дольше порога медленного вызова
+            self.breaker.record_cancelled(started)
+            raise
+        except httpx.TimeoutException as e:
+            self.breaker.record_timeout(timeout, settings.HTTP_TIMEOUT, started)
+            logger.warning("IP API timed out: %s", e)
+            return {}
         except Exception as e:
-            print(f"Error getting location for IP {ip}: {e}")
-            return {} 
\ No newline at end of file
+            self.breaker.record_failure()
+            logger.warning("Error getting location: %s", e)
+            return {}
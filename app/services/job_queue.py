@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Type
+
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Статусы записей очереди
+PENDING = "pending"
+PROCESSING = "processing"
+FAILED = "failed"
+
+
+async def claim_batch(
+    db: AsyncSession,
+    model: Type[Any],
+    worker_id: str,
+    limit: int,
+    lease_seconds: int,
+) -> List[Any]:
+    """Атомарный захват пачки записей очереди одним UPDATE ... RETURNING.
+
+    Берутся готовые к обработке записи и записи, чья аренда истекла
+    (воркер упал, не завершив обработку). Модель должна иметь поля
+    status, available_at, attempts, locked_by и locked_at.
+    """
+    now = datetime.now(timezone.utc)
+    lease_expired = now - timedelta(seconds=lease_seconds)
+
+    candidates = (
+        select(model.id)
+        .where(
+            or_(
+                and_(model.status == PENDING, model.available_at <= now),
+                and_(model.status == PROCESSING, model.locked_at < lease_expired),
+            )
+        )
+        .order_by(model.id)
+        .limit(limit)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        update(model)
+        .where(model.id.in_(candidates))
+        .values(
+            status=PROCESSING,
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=model.attempts + 1,
+        )
+        .returning(model)
+        .execution_options(synchronize_session=False)
+    )
+    claimed = list(result.scalars().all())
+    await db.commit()
+    return claimed
+
+
+async def finish(db: AsyncSession, model: Type[Any], record_id: int) -> None:
+    """Удаление обработанной записи в текущей транзакции.
+
+    Фиксирует вызывающий — вместе с результатом обработки, чтобы сбой между
+    ними не приводил к повторной обработке уже сохраненного результата.
+    """
+    await db.execute(
+        delete(model)
+        .where(model.id == record_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def remove(db: AsyncSession, model: Type[Any], record_ids: List[int]) -> None:
+    """Удаление обработанных записей одним запросом"""
+    if not record_ids:
+        return
+    await db.execute(
+        delete(model)
+        .where(model.id.in_(record_ids))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
+async def mark_failed(
+    db: AsyncSession,
+    model: Type[Any],
+    record: Any,
+    error: str,
+    max_attempts: int,
+    base_delay: float = 2.0,
+) -> None:
+    """Ошибка обработки: повтор с экспоненциальной задержкой или статус failed"""
+    if record.attempts >= max_attempts:
+        values = {"status": FAILED}
+    else:
+        delay = base_delay * (2 ** (record.attempts - 1))
+        values = {
+            "status": PENDING,
+            "available_at": datetime.now(timezone.utc) + timedelta(seconds=delay),
+        }
+    await db.execute(
+        update(model)
+        .where(model.id == record.id)
+        .values(locked_by=None, locked_at=None, last_error=error[:1000], **values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
@@ -0,0 +1,249 @@
+import re
+from bisect import bisect_right
+from itertools import accumulate, repeat
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Sequence
+
+import numpy as np
+from scipy import sparse
+
+# Словари резервных классификаторов (повторы внутри списка сохранены:
+# каждое вхождение в список добавляет единицу к счету, как и раньше)
+LEXICONS: Dict[str, List[str]] = {
+    "negative": [
+        'плохо', 'ужасно', 'отвратительно', 'не работает', 'ошибка',
+        'проблема', 'неудобно', 'медленно', 'зависает', 'вылетает',
+        'не загружается', 'баг', 'глюк', 'сломано', 'неправильно',
+        'неудовлетворительно', 'разочарован', 'злой', 'раздражен',
+        'грубят', 'хамство', 'некомпетентно', 'обман', 'разочарование',
+        'негатив', 'ненавижу', 'ненависть', 'кошмар', 'катастрофа',
+        'отстой', 'бесполезно', 'бесполезный', 'бесполезная', 'бесполезное',
+        'бесполезные', 'бесполезен', 'бесполезна', 'бесполезно', 'бесполезны',
+        'не', 'нет', 'нельзя', 'невозможно', 'неправильно', 'неверно',
+        'неудобно', 'неприятно', 'негативно', 'плохой', 'плохая', 'плохое',
+        'ужасный', 'ужасная', 'ужасное', 'отвратительный', 'отвратительная',
+        'сломан', 'сломана', 'сломано', 'неисправен', 'неисправна',
+        'недоступен', 'недоступна', 'недоступно', 'недоступны'
+    ],
+    "positive": [
+        'хорошо', 'отлично', 'прекрасно', 'удобно', 'быстро',
+        'работает', 'нравится', 'доволен', 'спасибо', 'благодарен',
+        'рекомендую', 'супер', 'класс', 'замечательно'
+    ],
+    "neutral": [
+        'информация', 'вопрос', 'уточнение', 'просьба', 'запрос',
+        'сообщение', 'уведомление', 'статус', 'проверить'
+    ],
+    "technical": [
+        'сайт', 'приложение', 'ошибка', 'не работает', 'зависает', 'вылетает',
+        'не загружается', 'медленно', 'баг', 'глюк', 'техническая', 'программа'
+    ],
+    "payment": [
+        'деньги', 'оплата', 'платеж', 'счет', 'списали', 'дважды',
+        'возврат', 'штраф', 'комиссия', 'цена', 'стоимость'
+    ],
+}
+
+
+_NOTHING: FrozenSet[str] = frozenset()
+# Разделитель текстов при пакетном разборе (некодируемый символ Unicode)
+_TEXT_SEPARATOR = "\ufdd0"
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Регулярное выражение из префиксного дерева слов.
+
+    Альтернативы упорядочены так, что в каждой позиции совпадает самое
+    длинное слово; более короткие слова с той же позицией — его префиксы.
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Подсчет вхождений ключевых слов нескольких словарей за один проход.
+
+    Семантика совпадает с `word in text.lower()` для каждого слова списка.
+    Слово без пробелов входит в текст тогда и только тогда, когда оно
+    входит в один из его фрагментов между пробельными символами, поэтому
+    текст делится на фрагменты, повторы отбрасываются, а найденные в
+    фрагменте слова кэшируются. Новые фрагменты проверяются одним проходом
+    скомпилированного префиксного дерева. Фразы с пробелами (их несколько)
+    ищутся в тексте целиком.
+    """
+
+    # Предел кэша фрагментов; при переполнении кэш очищается
+    TOKEN_CACHE_SIZE = 50000
+
+    def __init__(self, lexicons: Mapping[str, Iterable[str]]):
+        self.groups = list(lexicons)
+        # Вес слова в каждой группе: сколько раз оно встречается в списке
+        weights: Dict[str, Dict[str, int]] = {}
+        for group, words in lexicons.items():
+            for word in words:
+                counts = weights.setdefault(word, {})
+                counts[group] = counts.get(group, 0) + 1
+        self._weights = weights
+        # Матрица весов «слово × группа» для пакетного подсчета
+        self._columns = {word: index for index, word in enumerate(weights)}
+        rows, cols, data = [], [], []
+        for word, counts in weights.items():
+            for group, weight in counts.items():
+                rows.append(self._columns[word])
+                cols.append(self.groups.index(group))
+                data.append(weight)
+        self._group_weights = sparse.csr_matrix(
+            (data, (rows, cols)), shape=(len(weights), len(self.groups)), dtype=np.int32
+        )
+
+        words = [word for word in weights if not any(c.isspace() for c in word)]
+        self._phrases = [word for word in weights if any(c.isspace() for c in word)]
+        self._pattern = re.compile("(?=(" + _trie_pattern(words) + "))")
+        # Все слова, начинающиеся в позиции совпадения: префиксы самого длинного
+        self._prefixes: Dict[str, FrozenSet[str]] = {
+            word: frozenset(w for w in words if word.startswith(w)) for word in words
+        }
+        self._token_cache: Dict[str, FrozenSet[str]] = {}
+
+    def _scan_tokens(self, tokens: List[str]) -> None:
+        """Поиск слов в новых фрагментах одним проходом по их склейке"""
+        # Перевод строки не встречается ни в фрагментах, ни в словах,
+        # поэтому совпадение не может пересечь границу фрагментов
+        joined = "\n".join(tokens)
+        starts = [0]
+        starts.extend(accumulate(len(token) + 1 for token in tokens[:-1]))
+
+        found: Dict[int, set] = {}
+        for match in self._pattern.finditer(joined):
+            index = bisect_right(starts, match.start()) - 1
+            found.setdefault(index, set()).update(self._prefixes[match.group(1)])
+
+        if len(self._token_cache) + len(tokens) > self.TOKEN_CACHE_SIZE:
+            self._token_cache.clear()
+        self._token_cache.update(dict.fromkeys(tokens, _NOTHING))
+        for index, words in found.items():
+            self._token_cache[tokens[index]] = frozenset(words)
+
+    def find(self, text: str) -> FrozenSet[str]:
+        """Множество слов словарей, входящих в текст (без учета регистра)"""
+        text_lower = text.lower()
+        tokens = set(text_lower.split())
+        cache = self._token_cache
+        new_tokens = [token for token in tokens if token not in cache]
+        if new_tokens:
+            self._scan_tokens(new_tokens)
+
+        found = set()
+        for token in tokens:
+            words = cache.get(token)
+            if words is None:
+                # Кэш очищен при переполнении — досчитываем фрагмент заново
+                self._scan_tokens([token])
+                words = cache[token]
+            found.update(words)
+        found.update(phrase for phrase in self._phrases if phrase in text_lower)
+        return frozenset(found)
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Число слов каждого словаря, входящих в текст"""
+        counts = dict.fromkeys(self.groups, 0)
+        for word in self.find(text):
+            for group, weight in self._weights[word].items():
+                counts[group] += weight
+        return counts
+
+
+    def document_term_matrix(self, texts: Sequence[str]) -> sparse.csr_matrix:
+        """Разреженная матрица «текст × слово словаря» из нулей и единиц.
+
+        Фрагменты всех текстов сводятся в общий словарь пакета, и матрица
+        получается произведением матрицы «текст × фрагмент» на матрицу
+        «фрагмент × слово», так что каждый фрагмент разбирается один раз.
+        Тексты склеиваются через фрагмент-разделитель и делятся одним
+        вызовом split, без байткода Python на каждый текст или фрагмент.
+        """
+        columns = self._columns
+        lowered = list(map(str.lower, texts))
+        if any(map(str.__contains__, lowered, repeat(_TEXT_SEPARATOR))):
+            # Разделитель встретился в самом тексте — делим тексты по отдельности;
+            # фрагмент, равный разделителю, не содержит слов словаря и отбрасывается
+            flat = [_TEXT_SEPARATOR]
+            for text_lower in lowered:
+                flat.extend(token for token in text_lower.split() if token != _TEXT_SEPARATOR)
+                flat.append(_TEXT_SEPARATOR)
+        else:
+            flat = f" {_TEXT_SEPARATOR} ".join([""] + lowered + [""]).split()
+
+        # Разделитель получает номер 0, строка текста — число разделителей до фрагмента
+        token_ids = dict.fromkeys(flat)
+        tokens = list(token_ids)
+        token_ids = dict(zip(tokens, range(len(tokens))))
+        ids = np.fromiter(map(token_ids.__getitem__, flat), dtype=np.int64, count=len(flat))
+        is_separator = ids == 0
+        rows = np.cumsum(is_separator) - 1
+        text_tokens = sparse.csr_matrix(
+            (np.ones(len(flat) - len(texts) - 1, dtype=np.int32),
+             (rows[~is_separator], ids[~is_separator])),
+            shape=(len(texts), len(tokens))
+        )
+
+        cache = self._token_cache
+        new_tokens = [token for token in tokens[1:] if token not in cache]
+        if new_tokens:
+            self._scan_tokens(new_tokens)
+        token_rows: List[int] = []
+        token_cols: List[int] = []
+        for token_index, token in enumerate(tokens[1:], start=1):
+            words = cache.get(token)
+            if words is None:
+                # Кэш очищен при переполнении — досчитываем фрагмент заново
+                self._scan_tokens([token])
+                words = cache[token]
+            for word in words:
+                token_rows.append(token_index)
+                token_cols.append(columns[word])
+        token_words = sparse.csr_matrix(
+            (np.ones(len(token_rows), dtype=np.int32), (token_rows, token_cols)),
+            shape=(len(tokens), len(columns))
+        )
+
+        phrase_rows = []
+        phrase_cols = []
+        for phrase in self._phrases:
+            found = np.flatnonzero(np.fromiter(
+                map(str.__contains__, lowered, repeat(phrase)), dtype=bool, count=len(texts)
+            ))
+            phrase_rows.append(found)
+            phrase_cols.append(np.full(len(found), columns[phrase]))
+        phrase_rows = np.concatenate(phrase_rows) if phrase_rows else np.empty(0, dtype=np.int64)
+        phrase_cols = np.concatenate(phrase_cols) if phrase_cols else np.empty(0, dtype=np.int64)
+        phrases = sparse.csr_matrix(
+            (np.ones(len(phrase_rows), dtype=np.int32), (phrase_rows, phrase_cols)),
+            shape=(len(texts), len(columns))
+        )
+
+        matrix = (text_tokens @ token_words + phrases).tocsr()
+        # Слово учитывается один раз, сколько бы фрагментов его ни содержали
+        matrix.data[:] = 1
+        return matrix
+
+    def count_batch(self, texts: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Пакетный аналог count: массив счетов по каждой группе"""
+        counts = (self.document_term_matrix(texts) @ self._group_weights).toarray()
+        return {group: counts[:, index] for index, group in enumerate(self.groups)}
+
+
+# Общий экземпляр для резервных классификаторов тональности и категорий
+fallback_matcher = KeywordMatcher(LEXICONS)
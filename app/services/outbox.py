@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models.database import AsyncSessionLocal, OutboxMessage, SheetRow
+from . import job_queue
+from .telegram_service import TelegramService
+from .telegram_dispatcher import TelegramDispatcher
+from .sheets_service import GoogleSheetsService
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_TOPIC = "telegram"
+SHEETS_TOPIC = "sheets"
+NOTIFICATION_TOPICS = (TELEGRAM_TOPIC, SHEETS_TOPIC)
+# Копия недавней жалобы записывается в таблицу, но не дублирует сообщение в чат
+DUPLICATE_TOPICS = (SHEETS_TOPIC,)
+
+
+def outbox_rows(
+    complaint_data: Dict[str, Any], topics: Sequence[str] = NOTIFICATION_TOPICS
+) -> List[Dict[str, Any]]:
+    """Строки outbox для уведомлений о жалобе (для executemany-вставки)"""
+    payload = json.dumps(complaint_data, ensure_ascii=False, default=str)
+    return [{"topic": topic, "payload": payload} for topic in topics]
+
+
+def enqueue_complaint_notifications(
+    db: AsyncSession, complaint_data: Dict[str, Any], topics: Sequence[str] = NOTIFICATION_TOPICS
+) -> None:
+    """Добавление уведомлений в outbox в текущей транзакции (коммитит вызывающий)"""
+    db.add_all(OutboxMessage(**row) for row in outbox_rows(complaint_data, topics))
+
+
+async def record_sheet_rows(db: AsyncSession, complaint_ids: Sequence[int]) -> None:
+    """Отметить жалобы, записанные в Google Sheets (коммитит вызывающий)"""
+    if complaint_ids:
+        await db.execute(
+            insert(SheetRow).prefix_with("OR IGNORE"),
+            [{"complaint_id": complaint_id} for complaint_id in complaint_ids]
+        )
+
+
+class OutboxDispatcher:
+    """Доставка уведомлений из outbox пачками с повторами.
+
+    Сообщения захватываются с арендой, поэтому диспетчеры нескольких
+    процессов uvicorn не отправляют одно сообщение дважды, а сообщения
+    упавшего процесса будут доставлены после истечения аренды.
+    """
+
+    def __init__(
+        self,
+        telegram_service: Optional[TelegramService] = None,
+        sheets_service: Optional[GoogleSheetsService] = None,
+        telegram_dispatcher: Optional[TelegramDispatcher] = None,
+        batch_size: int = settings.OUTBOX_BATCH_SIZE,
+        poll_interval: float = settings.OUTBOX_POLL_INTERVAL,
+    ):
+        self.telegram_service = telegram_service or TelegramService()
+        self.sheets_service = sheets_service or GoogleSheetsService()
+        self.telegram_dispatcher = telegram_dispatcher or TelegramDispatcher(self.telegram_service)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.dispatcher_id = f"{socket.gethostname()}:{os.getpid()}:outbox"
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def _handler(self, topic: str) -> Optional[Callable[[Dict[str, Any]], Awaitable[bool]]]:
+        """Обработчик топика или None, если интеграция не настроена"""
+        if topic == TELEGRAM_TOPIC and self.telegram_service.is_configured:
+            return self.telegram_dispatcher.submit
+        if topic == SHEETS_TOPIC and self.sheets_service.is_configured:
+            return self.sheets_service.add_complaint_to_sheet
+        return None
+
+    def notify(self) -> None:
+        """Разбудить диспетчер сразу после коммита новых сообщений"""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self) -> None:
+        while True:
+            try:
+                processed = await self.dispatch_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Outbox dispatcher error: %s", e)
+                processed = 0
+
+            # Полная пачка — сразу берем следующую, иначе ждем новых сообщений
+            if processed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def dispatch_batch(self) -> int:
+        """Захват и доставка одной пачки сообщений; возвращает их число"""
+        async with AsyncSessionLocal() as db:
+            messages = await job_queue.claim_batch(
+                db, OutboxMessage, self.dispatcher_id,
+                self.batch_size, settings.OUTBOX_LEASE_SECONDS
+            )
+            if not messages:
+                return 0
+
+            results = await asyncio.gather(
+                *(self._deliver(message) for message in messages),
+                return_exceptions=True
+            )
+
+            delivered = [m.id for m, ok in zip(messages, results) if ok is True]
+            # Экспорт /sheets/export/ не должен повторить строки, записанные здесь
+            if self.sheets_service.is_configured:
+                await record_sheet_rows(db, [
+                    complaint_id for complaint_id in (
+                        json.loads(m.payload).get("id")
+                        for m, ok in zip(messages, results)
+                        if ok is True and m.topic == SHEETS_TOPIC
+                    ) if complaint_id is not None
+                ])
+            await job_queue.remove(db, OutboxMessage, delivered)
+            for message, ok in zip(messages, results):
+                if ok is not True:
+                    error = str(ok) if isinstance(ok, BaseException) else "delivery failed"
+                    await job_queue.mark_failed(
+                        db, OutboxMessage, message, error, settings.OUTBOX_MAX_ATTEMPTS
+                    )
+            return len(messages)
+
+    async def _deliver(self, message: OutboxMessage) -> bool:
+        handler = self._handler(message.topic)
+        if handler is None:
+            # Интеграция не настроена — доставлять некуда, сообщение снимается
+            return True
+        return await handler(json.loads(message.payload))
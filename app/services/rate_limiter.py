@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+from typing import Optional, Tuple
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+# Пополнение корзины и списание токенов — один UPSERT: SQLite сериализует
+# запись, поэтому лимит соблюдается для всех процессов, открывших файл.
+# В DO UPDATE все выражения видят старые значения строки.
+_ACQUIRE = """
+INSERT INTO rate_limit_buckets (key, tokens, updated_at, allowed)
+VALUES (:key, CASE WHEN :burst >= :cost THEN :burst - :cost ELSE :burst END, :now, :burst >= :cost)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = CASE
+        WHEN min(:burst, tokens + max(0, :now - updated_at) * :rate) >= :cost
+        THEN min(:burst, tokens + max(0, :now - updated_at) * :rate) - :cost
+        ELSE min(:burst, tokens + max(0, :now - updated_at) * :rate)
+    END,
+    allowed = min(:burst, tokens + max(0, :now - updated_at) * :rate) >= :cost,
+    updated_at = :now
+RETURNING tokens, allowed
+"""
+
+
+class RateLimiter:
+    """Корзина токенов на клиента в отдельном файле SQLite.
+
+    rate — токенов в секунду, burst — емкость корзины. Файл общий для всех
+    процессов uvicorn. Ошибки хранилища не блокируют прием жалоб — запрос
+    пропускается.
+    """
+
+    # Как часто (в обращениях) удалять корзины, которые давно заполнились
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str, rate: float, burst: float):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self._db: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+        self._calls = 0
+
+    async def _connection(self) -> aiosqlite.Connection:
+        if self._db is None:
+            async with self._lock:
+                if self._db is None:
+                    db = await aiosqlite.connect(self.path)
+                    await db.execute("PRAGMA journal_mode=WAL")
+                    await db.execute("PRAGMA busy_timeout=5000")
+                    # Потеря последних списаний при сбое питания некритична
+                    await db.execute("PRAGMA synchronous=NORMAL")
+                    await db.execute(
+                        "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+                        " key TEXT PRIMARY KEY, tokens REAL NOT NULL,"
+                        " updated_at REAL NOT NULL, allowed INTEGER NOT NULL"
+                        ") WITHOUT ROWID"
+                    )
+                    await db.commit()
+                    self._db = db
+        return self._db
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    async def acquire(self, key: str, cost: float = 1.0) -> Tuple[bool, float]:
+        """Списать cost токенов; возвращает (разрешено, секунд до повтора)"""
+        if cost > self.burst:
+            # Больше емкости корзины не пройдет никогда — корзину не трогаем,
+            # повтор не раньше ее полного пополнения
+            logger.warning("Rate limit cost exceeds burst", extra={"cost": cost, "burst": self.burst})
+            return False, self.burst / self.rate
+        now = time.time()
+        try:
+            db = await self._connection()
+            async with db.execute(_ACQUIRE, {
+                "key": key, "cost": cost, "now": now,
+                "rate": self.rate, "burst": self.burst,
+            }) as cursor:
+                tokens, allowed = await cursor.fetchone()
+            await db.commit()
+            await self._maybe_prune(db, now)
+        except Exception as e:
+            logger.warning("Rate limiter storage failed: %s", e)
+            return True, 0.0
+
+        if allowed:
+            return True, 0.0
+        return False, (cost - tokens) / self.rate
+
+    async def _maybe_prune(self, db: aiosqlite.Connection, now: float) -> None:
+        self._calls += 1
+        if self._calls % self.PRUNE_EVERY:
+            return
+        # Корзина, не тронутая дольше времени полного пополнения, равна новой
+        await db.execute(
+            "DELETE FROM rate_limit_buckets WHERE updated_at < ?",
+            (now - self.burst / self.rate,)
+        )
+        await db.commit()
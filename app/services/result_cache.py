@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def text_cache_key(text: str) -> str:
+    """Ключ кэша: SHA-256 нормализованного текста (регистр и пробелы не важны)"""
+    normalized = _WHITESPACE.sub(" ", text).strip().casefold()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Кэш результатов стадий обогащения в отдельном файле SQLite.
+
+    Файл общий для всех процессов uvicorn и воркеров, поэтому один и тот же
+    текст жалобы обрабатывается внешними API один раз за время жизни записи.
+    Число записей ограничено: при переполнении удаляются записи, которые
+    истекают раньше остальных. Ошибки хранилища не прерывают обработку —
+    запрос считается промахом.
+    """
+
+    # Как часто (в записях) чистить просроченные записи и проверять лимит
+    PRUNE_EVERY = 256
+    # Сколько обращений копить в памяти перед сбросом счетчиков в файл
+    STATS_FLUSH_EVERY = 100
+
+    def __init__(self, path: str, ttl: Dict[str, float], max_entries: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._db: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+        self._writes = 0
+        # Счетчики этого процесса и еще не сброшенные в общий файл
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self._pending_hits: Counter = Counter()
+        self._pending_misses: Counter = Counter()
+
+    async def _connection(self) -> aiosqlite.Connection:
+        if self._db is None:
+            async with self._lock:
+                if self._db is None:
+                    db = await aiosqlite.connect(self.path)
+                    await db.execute("PRAGMA journal_mode=WAL")
+                    await db.execute("PRAGMA busy_timeout=5000")
+                    await db.execute(
+                        "CREATE TABLE IF NOT EXISTS enrichment_cache ("
+                        " key TEXT NOT NULL, stage TEXT NOT NULL, value TEXT NOT NULL,"
+                        " expires_at REAL NOT NULL, PRIMARY KEY (key, stage)"
+                        ") WITHOUT ROWID"
+                    )
+                    await db.execute(
+                        "CREATE INDEX IF NOT EXISTS ix_enrichment_cache_expires_at"
+                        " ON enrichment_cache (expires_at)"
+                    )
+                    await db.execute(
+                        "CREATE TABLE IF NOT EXISTS enrichment_cache_stats ("
+                        " stage TEXT PRIMARY KEY,"
+                        " hits INTEGER NOT NULL DEFAULT 0,"
+                        " misses INTEGER NOT NULL DEFAULT 0)"
+                    )
+                    await db.commit()
+                    self._db = db
+        return self._db
+
+    async def close(self) -> None:
+        if self._db is not None:
+            try:
+                await self._flush_stats()
+            except Exception as e:
+                logger.warning("Result cache stats flush failed: %s", e)
+            await self._db.close()
+            self._db = None
+
+    async def get(self, key: str, stage: str) -> Tuple[bool, Any]:
+        """Возвращает (найдено, значение) для стадии stage"""
+        try:
+            db = await self._connection()
+            async with db.execute(
+                "SELECT value FROM enrichment_cache"
+                " WHERE key = ? AND stage = ? AND expires_at > ?",
+                (key, stage, time.time())
+            ) as cursor:
+                row = await cursor.fetchone()
+        except Exception as e:
+            logger.warning("Result cache read failed: %s", e)
+            row = None
+
+        if row is None:
+            self.misses[stage] += 1
+            self._pending_misses[stage] += 1
+        else:
+            self.hits[stage] += 1
+            self._pending_hits[stage] += 1
+        await self._maybe_flush_stats()
+        return (False, None) if row is None else (True, json.loads(row[0]))
+
+    async def set(self, key: str, stage: str, value: Any) -> None:
+        ttl = self.ttl.get(stage)
+        if not ttl:
+            return
+        try:
+            db = await self._connection()
+            await db.execute(
+                "INSERT OR REPLACE INTO enrichment_cache (key, stage, value, expires_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, stage, json.dumps(value, ensure_ascii=False), time.time() + ttl)
+            )
+            await db.commit()
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                await self.prune()
+        except Exception as e:
+            logger.warning("Result cache write failed: %s", e)
+
+    async def prune(self) -> None:
+        """Удаление просроченных записей и самых ранних при превышении лимита"""
+        db = await self._connection()
+        await db.execute("DELETE FROM enrichment_cache WHERE expires_at <= ?", (time.time(),))
+        async with db.execute("SELECT COUNT(*) FROM enrichment_cache") as cursor:
+            (count,) = await cursor.fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            await db.execute(
+                "DELETE FROM enrichment_cache WHERE (key, stage) IN ("
+                " SELECT key, stage FROM enrichment_cache ORDER BY expires_at LIMIT ?)",
+                (excess,)
+            )
+        await db.commit()
+
+    async def _maybe_flush_stats(self) -> None:
+        pending = sum(self._pending_hits.values()) + sum(self._pending_misses.values())
+        if pending >= self.STATS_FLUSH_EVERY:
+            try:
+                await self._flush_stats()
+            except Exception as e:
+                logger.warning("Result cache stats flush failed: %s", e)
+
+    async def _flush_stats(self) -> None:
+        """Добавление накопленных счетчиков к общим счетчикам всех процессов"""
+        stages = set(self._pending_hits) | set(self._pending_misses)
+        if not stages:
+            return
+        rows = [(s, self._pending_hits[s], self._pending_misses[s]) for s in stages]
+        self._pending_hits.clear()
+        self._pending_misses.clear()
+        db = await self._connection()
+        await db.executemany(
+            "INSERT INTO enrichment_cache_stats (stage, hits, misses) VALUES (?, ?, ?)"
+            " ON CONFLICT(stage) DO UPDATE SET"
+            " hits = hits + excluded.hits, misses = misses + excluded.misses",
+            rows
+        )
+        await db.commit()
+
+    async def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий и промахов: этого процесса и суммарные по всем"""
+        await self._flush_stats()
+        db = await self._connection()
+        async with db.execute(
+            "SELECT stage, hits, misses FROM enrichment_cache_stats"
+        ) as cursor:
+            shared = {stage: {"hits": hits, "misses": misses}
+                      for stage, hits, misses in await cursor.fetchall()}
+        async with db.execute("SELECT COUNT(*) FROM enrichment_cache") as cursor:
+            (entries,) = await cursor.fetchone()
+        stages = set(self.hits) | set(self.misses)
+        return {
+            "path": self.path,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "process": {s: {"hits": self.hits[s], "misses": self.misses[s]} for s in sorted(stages)},
+            "shared": shared,
+        }
@@ -1,95 +1,112 @@
+import asyncio
+import logging
 import httpx
 import os
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 
-class SentimentService:
-    def __init__(self):
+import numpy as np
+
+from ..config import settings
+from ..utils.deadline import remaining
+from .circuit_breaker import get_breaker, retry_after_seconds
+from .http_client import HTTPClientMixin
+from .keyword_matcher import fallback_matcher
+
+logger = logging.getLogger(__name__)
+
+class SentimentService(HTTPClientMixin):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        self._http_client = http_client
         self.api_key = os.getenv("SENTIMENT_API_KEY")
         self.base_url = "https://api.apilayer.com/sentiment/analysis"
+        self.breaker = get_breaker("apilayer")
     
     async def analyze_sentiment(self, text: str) -> str:
         """Анализ тональности текста через APILayer или простые правила"""
+        sentiment, _ = await self.analyze_sentiment_result(text)
+        return sentiment
+    
+    async def analyze_sentiment_result(self, text: str) -> Tuple[str, bool]:
+        """Тональность и признак degraded: True, если ответа APILayer нет
+        и метка получена простыми правилами"""
         if not self.api_key:
-            print(f"DEBUG: [SENTIMENT] No API key, using fallback analysis")
-            return self._simple_sentiment_analysis(text)
+            logger.debug("No sentiment API key, using fallback analysis")
+            return self._simple_sentiment_analysis(text), True
         
+        # Бюджет запроса исчерпан или провайдер недоступен — сразу локальный анализ
+        budget = remaining(settings.HTTP_TIMEOUT)
+        if budget <= 0 or not self.breaker.allow_request():
+            return self._simple_sentiment_analysis(text), True
+        
+        started = time.monotonic()
         try:
-            print(f"DEBUG: [SENTIMENT] Trying APILayer API for: {text[:50]}...")
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.base_url,
-                    headers={"apikey": self.api_key},
-                    json={"text": text},
-                    timeout=10.0
-                )
+            response = await self.http_client.post(
+                self.base_url,
+                headers={"apikey": self.api_key},
+                json={"text": text},
+                timeout=budget
+            )
+            self.breaker.record_status(
+                response.status_code, retry_after_seconds(response.headers.get("retry-after"))
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                # Проверяем, не вернул ли API ошибку
+                if "result" in data and "Unable to evaluate expression" in data["result"]:
+                    # Ответ провайдера для этого текста не изменится
+                    logger.debug("Sentiment API cannot process text, using fallback")
+                    return self._simple_sentiment_analysis(text), False
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    print(f"DEBUG: [SENTIMENT] API response: {data}")
-                    # Проверяем, не вернул ли API ошибку
-                    if "result" in data and "Unable to evaluate expression" in data["result"]:
-                        print(f"DEBUG: [SENTIMENT] API cannot process text, using fallback")
-                        return self._simple_sentiment_analysis(text)
-                    
-                    sentiment = data.get("sentiment", "unknown")
-                    print(f"DEBUG: [SENTIMENT] API result: {sentiment}")
-                    return sentiment.lower()
-                else:
-                    print(f"DEBUG: [SENTIMENT] API error: {response.status_code}, response: {response.text}")
-                    return self._simple_sentiment_analysis(text)
+                sentiment = data.get("sentiment", "unknown")
+                logger.debug("Sentiment API result", extra={"sentiment": sentiment})
+                return sentiment.lower(), False
+            else:
+                logger.warning("Sentiment API error", extra={"status_code": response.status_code})
+                return self._simple_sentiment_analysis(text), True
+        except asyncio.CancelledError:
+            # Стадию оборвал бюджет запроса: ошибка провайдера, только если
+            # ответа не было дольше порога медленного вызова
+            self.breaker.record_cancelled(started)
+            raise
+        except httpx.TimeoutException as e:
+            self.breaker.record_timeout(budget, settings.HTTP_TIMEOUT, started)
+            logger.warning("Sentiment API timed out: %s", e)
+            return self._simple_sentiment_analysis(text), True
         except Exception as e:
-            print(f"DEBUG: [SENTIMENT] Exception during API call: {e}")
-            return self._simple_sentiment_analysis(text)
+            self.breaker.record_failure()
+            logger.warning("Sentiment API call failed: %s", e)
+            return self._simple_sentiment_analysis(text), True
     
     def _simple_sentiment_analysis(self, text: str) -> str:
         """Простой анализ тональности на основе ключевых слов"""
-        print(f"DEBUG: [SENTIMENT] Start analysis for: {text}")
-        text_lower = text.lower()
-        
-        # Негативные слова
-        negative_words = [
-            'плохо', 'ужасно', 'отвратительно', 'не работает', 'ошибка',
-            'проблема', 'неудобно', 'медленно', 'зависает', 'вылетает',
-            'не загружается', 'баг', 'глюк', 'сломано', 'неправильно',
-            'неудовлетворительно', 'разочарован', 'злой', 'раздражен',
-            'грубят', 'хамство', 'некомпетентно', 'обман', 'разочарование',
-            'негатив', 'ненавижу', 'ненависть', 'кошмар', 'катастрофа',
-            'отстой', 'бесполезно', 'бесполезный', 'бесполезная', 'бесполезное',
-            'бесполезные', 'бесполезен', 'бесполезна', 'бесполезно', 'бесполезны',
-            'не', 'нет', 'нельзя', 'невозможно', 'неправильно', 'неверно',
-            'неудобно', 'неприятно', 'негативно', 'плохой', 'плохая', 'плохое',
-            'ужасный', 'ужасная', 'ужасное', 'отвратительный', 'отвратительная',
-            'сломан', 'сломана', 'сломано', 'неисправен', 'неисправна',
-            'недоступен', 'недоступна', 'недоступно', 'недоступны'
-        ]
-        
-        # Позитивные слова
-        positive_words = ['хорошо', 'отлично', 'прекрасно', 'удобно', 'быстро', 
-                         'работает', 'нравится', 'доволен', 'спасибо', 'благодарен',
-                         'рекомендую', 'супер', 'класс', 'замечательно']
-        
-        # Нейтральные слова
-        neutral_words = ['информация', 'вопрос', 'уточнение', 'просьба', 'запрос',
-                        'сообщение', 'уведомление', 'статус', 'проверить']
-        
-        # Подсчитываем слова
-        negative_count = sum(1 for word in negative_words if word in text_lower)
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        neutral_count = sum(1 for word in neutral_words if word in text_lower)
-        
-        print(f"DEBUG: [SENTIMENT] Negative: {negative_count}, Positive: {positive_count}, Neutral: {neutral_count}")
+        counts = fallback_matcher.count(text)
+        negative_count = counts["negative"]
+        positive_count = counts["positive"]
         
         # Определяем тональность
         if negative_count > 0:
             if negative_count > positive_count:
-                result = "negative"
+                return "negative"
             elif negative_count == positive_count:
-                result = "neutral"
+                return "neutral"
             else:
-                result = "positive"
+                return "positive"
         elif positive_count > 0:
-            result = "positive"
-        else:
-            result = "neutral"
-        print(f"DEBUG: [SENTIMENT] Result: {result}")
-        return result 
\ No newline at end of file
+            return "positive"
+        return "neutral"
+    
+    def analyze_sentiment_batch(self, texts: Sequence[str]) -> List[str]:
+        """Пакетный анализ тональности по ключевым словам.
+        
+        Те же метки, что у _simple_sentiment_analysis, но правила применяются
+        к столбцам счетов сразу для всех текстов
+        """
+        counts = fallback_matcher.count_batch(texts)
+        negative, positive = counts["negative"], counts["positive"]
+        labels = np.where(
+            negative > positive, "negative",
+            np.where(positive > negative, "positive", "neutral")
+        )
+        return labels.tolist()
@@ -1,49 +1,65 @@
+import logging
 import os
 import asyncio
 import functools
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import gspread
 from google.oauth2.service_account import Credentials
 
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
 class GoogleSheetsService:
     def __init__(self):
         self.credentials_file = os.getenv("GOOGLE_SHEETS_CREDENTIALS_FILE", "google-credentials.json")
         self.spreadsheet_id = str(os.getenv("GOOGLE_SHEETS_SPREADSHEET_ID", ""))
         self.sheet_name = os.getenv("GOOGLE_SHEET_NAME", "Жалобы")
         
+        # Буфер строк: сбрасывается одним append_rows каждые N строк или T секунд
+        self.batch_size = settings.SHEETS_BATCH_SIZE
+        self.flush_interval = settings.SHEETS_FLUSH_INTERVAL
+        self._pending_rows: List[Tuple[List[Any], asyncio.Future]] = []
+        self._flush_timer: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._headers_verified = False
+        
         # Настройка Google Sheets API
         scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
         
         try:
-            print(f"DEBUG: Checking file {self.credentials_file}, exists: {os.path.exists(self.credentials_file)}")
             if os.path.exists(self.credentials_file):
-                print(f"DEBUG: Loading credentials from {self.credentials_file}")
+                logger.debug("Loading Google credentials", extra={"credentials_file": self.credentials_file})
                 credentials = Credentials.from_service_account_file(
                     self.credentials_file, scopes=scope
                 )
-                print(f"DEBUG: Authorizing with gspread")
                 self.client = gspread.authorize(credentials)
-                print(f"DEBUG: Opening spreadsheet {self.spreadsheet_id}")
                 self.spreadsheet = self.client.open_by_key(self.spreadsheet_id)
-                print(f"DEBUG: Available worksheets: {[ws.title for ws in self.spreadsheet.worksheets()]}")
-                print(f"DEBUG: Getting worksheet '{self.sheet_name}'")
                 self.worksheet = self.spreadsheet.worksheet(self.sheet_name)
-                print(f"DEBUG: Successfully initialized Google Sheets")
+                logger.info("Google Sheets initialized", extra={"spreadsheet_id": self.spreadsheet_id, "sheet": self.sheet_name})
             else:
-                print(f"Google credentials file not found: {self.credentials_file}")
+                logger.warning("Google credentials file not found", extra={"credentials_file": self.credentials_file})
                 self.client = None
                 self.spreadsheet = None
                 self.worksheet = None
         except Exception as e:
-            print(f"Error initializing Google Sheets: {e}")
+            logger.error("Error initializing Google Sheets: %s", e)
             self.client = None
             self.spreadsheet = None
             self.worksheet = None
     
+    @property
+    def is_configured(self) -> bool:
+        return self.worksheet is not None
+    
     async def create_headers_if_needed(self) -> bool:
         if not self.worksheet:
-            print("Google Sheets not configured or worksheet not available")
+            logger.debug("Google Sheets not configured or worksheet not available")
             return False
+        # Заголовки проверяются один раз за жизнь процесса
+        if self._headers_verified:
+            return True
         try:
             loop = asyncio.get_running_loop()
             headers = await loop.run_in_executor(None, self.worksheet.row_values, 1)
@@ -54,41 +70,102 @@ class GoogleSheetsService:
                 ]
                 update_partial = functools.partial(self.worksheet.update, 'A1:H1', [headers_list])  # type: ignore
                 await loop.run_in_executor(None, update_partial)
-                print("Google Sheets headers created")
+                logger.info("Google Sheets headers created")
+            self._headers_verified = True
             return True
         except Exception as e:
-            print(f"Error creating headers: {e}")
+            logger.error("Error creating headers: %s", e)
             return False
     
+    @staticmethod
+    def _complaint_row(complaint_data: Dict[str, Any]) -> List[Any]:
+        return [
+            complaint_data.get('id', ''),
+            complaint_data.get('text', '')[:1000],
+            complaint_data.get('category', ''),
+            complaint_data.get('sentiment', ''),
+            complaint_data.get('status', ''),
+            complaint_data.get('ip_address', ''),
+            complaint_data.get('created_at', ''),
+            'Да' if complaint_data.get('is_spam', False) else 'Нет'
+        ]
+    
     async def add_complaint_to_sheet(self, complaint_data: Dict[str, Any]) -> bool:
-        """Добавление жалобы в Google Sheets"""
+        """Добавление жалобы в Google Sheets через буфер записи.
+        
+        Возвращает результат после того, как строка записана вместе со
+        своей пачкой (или запись пачки не удалась).
+        """
+        if not self.worksheet:
+            logger.debug("Google Sheets not configured or worksheet not available")
+            return False
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending_rows.append((self._complaint_row(complaint_data), future))
+        
+        if len(self._pending_rows) >= self.batch_size:
+            # Идущий сброс дочитает новые строки сам: он пишет, пока буфер не пуст
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self.flush())
+        elif self._flush_timer is None or self._flush_timer.done():
+            self._flush_timer = asyncio.create_task(self._flush_later())
+        
+        return await future
+    
+    async def add_complaints_to_sheet(self, complaints_data: List[Dict[str, Any]]) -> bool:
+        """Добавление пачки жалоб одним вызовом append_rows (без буфера)"""
         if not self.worksheet:
-            print("Google Sheets not configured or worksheet not available")
+            logger.debug("Google Sheets not configured or worksheet not available")
             return False
+        return await self._append_rows([self._complaint_row(c) for c in complaints_data])
+    
+    async def close(self) -> None:
+        """Остановка: накопленные строки записываются, отложенный сброс отменяется"""
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self.flush()
+        if self._flush_timer is not None and not self._flush_timer.done():
+            self._flush_timer.cancel()
+            await asyncio.gather(self._flush_timer, return_exceptions=True)
+    
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+    
+    async def flush(self) -> None:
+        """Запись накопленных строк одним запросом к Sheets API"""
+        async with self._flush_lock:
+            while self._pending_rows:
+                batch = self._pending_rows[:self.batch_size]
+                del self._pending_rows[:self.batch_size]
+                
+                success = await self._append_rows([row for row, _ in batch])
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(success)
+    
+    async def _append_rows(self, rows: List[List[Any]]) -> bool:
+        if not rows:
+            return True
         try:
             await self.create_headers_if_needed()
-            row_data = [
-                complaint_data.get('id', ''),
-                complaint_data.get('text', '')[:1000],
-                complaint_data.get('category', ''),
-                complaint_data.get('sentiment', ''),
-                complaint_data.get('status', ''),
-                complaint_data.get('ip_address', ''),
-                complaint_data.get('created_at', ''),
-                'Да' if complaint_data.get('is_spam', False) else 'Нет'
-            ]
             loop = asyncio.get_running_loop()
-            await loop.run_in_executor(None, self.worksheet.append_row, row_data)
-            print(f"Successfully added complaint {complaint_data.get('id')} to Google Sheets")
+            append_partial = functools.partial(
+                self.worksheet.append_rows, rows, value_input_option='RAW'  # type: ignore
+            )
+            await loop.run_in_executor(None, append_partial)
+            logger.debug("Added complaints to Google Sheets", extra={"rows": len(rows)})
             return True
         except Exception as e:
-            print(f"Error adding complaint {complaint_data.get('id')} to Google Sheets: {e}")
+            logger.error("Error adding complaints to Google Sheets: %s", e, extra={"rows": len(rows)})
+            # Лист могли пересоздать — заголовки проверим заново
+            self._headers_verified = False
             return False
     
     async def get_complaints_summary(self) -> Optional[Dict[str, Any]]:
         """Получение сводки жалоб из Google Sheets"""
         if not self.worksheet:
-            print("Google Sheets not configured or worksheet not available")
+            logger.debug("Google Sheets not configured or worksheet not available")
             return None
         try:
             loop = asyncio.get_running_loop()
@@ -115,8 +192,8 @@ class GoogleSheetsService:
                     summary["categories"][category] = summary["categories"].get(category, 0) + 1
                     summary["sentiments"][sentiment] = summary["sentiments"].get(sentiment, 0) + 1
                     summary["statuses"][status] = summary["statuses"].get(status, 0) + 1
-            print(f"Successfully retrieved summary from Google Sheets: {summary['total_complaints']} complaints")
+            logger.debug("Retrieved summary from Google Sheets", extra={"complaints": summary["total_complaints"]})
             return summary
         except Exception as e:
-            print(f"Error getting summary from Google Sheets: {e}")
+            logger.error("Error getting summary from Google Sheets: %s", e)
             return None 
\ No newline at end of file
@@ -0,0 +1,267 @@
+import asyncio
+import ipaddress
+import logging
+import math
+import re
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from ..config import settings
+from ..models.database import AsyncSessionLocal, Complaint, ComplaintRevision
+from ..utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SPAM_STATUS = "spam"
+# Длина шингла в словах
+SHINGLE_SIZE = 3
+
+_WORDS = re.compile(r"\w+")
+_CONTACTS = re.compile(r"https?://|www\.|\S+@\S+\.\w+|t\.me/|(?:\+?\d[\d\s()-]{9,}\d)")
+
+
+def shingles(text: str) -> Set[int]:
+    """Хэши словесных шинглов нормализованного текста (регистр и пунктуация не важны)"""
+    words = _WORDS.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {hash(tuple(words))} if words else set()
+    return {hash(tuple(words[i:i + SHINGLE_SIZE])) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _is_public_ip(ip: Optional[str]) -> bool:
+    try:
+        return ip is not None and ipaddress.ip_address(ip).is_global
+    except ValueError:
+        return False
+
+
+class SpamPrefilter:
+    """Локальная проверка на спам до обращения к API Ninjas.
+
+    Сигналы, каждый в диапазоне 0..1:
+    - fingerprint — доля шинглов, совпавших с известной спам-жалобой;
+      отпечатки берутся из жалоб со статусом «spam» и из спам-вердиктов;
+    - velocity — частота жалоб с одного IP за скользящее окно;
+    - reputation — число недавних спам-вердиктов по тексту (API или
+      отпечатки) для IP с экспоненциальным затуханием;
+    - contacts — ссылки, почта или телефон в тексте (только повод
+      спросить внешний API, сам по себе не спам).
+    Итоговая оценка — максимум сигналов: выше spam_threshold — спам,
+    ниже ham_threshold — не спам, между ними — решает внешний API,
+    а без его ответа жалоба спамом не считается.
+    IP-сигналы считаются только для публичных адресов.
+    """
+
+    def __init__(
+        self,
+        spam_threshold: float = settings.SPAM_PREFILTER_SPAM_THRESHOLD,
+        ham_threshold: float = settings.SPAM_PREFILTER_HAM_THRESHOLD,
+        max_fingerprints: int = settings.SPAM_PREFILTER_MAX_FINGERPRINTS,
+        velocity_limit: int = settings.SPAM_VELOCITY_LIMIT,
+        velocity_window: float = settings.SPAM_VELOCITY_WINDOW,
+        reputation_half_life: float = settings.SPAM_REPUTATION_HALF_LIFE,
+        reputation_threshold: float = settings.SPAM_REPUTATION_THRESHOLD,
+        refresh_interval: float = settings.SPAM_PREFILTER_REFRESH_INTERVAL,
+    ):
+        self.spam_threshold = spam_threshold
+        self.ham_threshold = ham_threshold
+        self.max_fingerprints = max_fingerprints
+        self.velocity_limit = velocity_limit
+        self.velocity_window = velocity_window
+        self.reputation_half_life = reputation_half_life
+        self.reputation_threshold = reputation_threshold
+        self.refresh_interval = refresh_interval
+
+        # Инвертированный индекс: шингл -> номера спам-документов
+        self._index: Dict[int, Set[int]] = {}
+        self._documents: Dict[int, Set[int]] = {}
+        # Хэш набора шинглов -> номер документа: один текст не запоминается дважды
+        self._fingerprints: Dict[int, int] = {}
+        self._order: Deque[int] = deque()
+        self._next_document = 0
+
+        self._submissions = TTLCache(maxsize=100000, ttl=velocity_window)
+        self._reputation = TTLCache(maxsize=100000, ttl=reputation_half_life * 10)
+
+        # Номер последнего изменения жалоб, загруженного из базы
+        self._last_revision = 0
+        self._last_refresh = time.monotonic()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    # Отпечатки
+
+    def learn(self, text: str) -> None:
+        """Запомнить отпечаток спам-текста (повтор того же текста ничего не меняет)"""
+        document = shingles(text)
+        if not document:
+            return
+        fingerprint = hash(frozenset(document))
+        if fingerprint in self._fingerprints:
+            return
+        document_id = self._next_document
+        self._next_document += 1
+        self._documents[document_id] = document
+        self._fingerprints[fingerprint] = document_id
+        self._order.append(document_id)
+        for shingle in document:
+            self._index.setdefault(shingle, set()).add(document_id)
+        while len(self._order) > self.max_fingerprints:
+            self._forget(self._order.popleft())
+
+    def _forget(self, document_id: int) -> None:
+        document = self._documents.pop(document_id, set())
+        self._fingerprints.pop(hash(frozenset(document)), None)
+        for shingle in document:
+            documents = self._index.get(shingle)
+            if documents is not None:
+                documents.discard(document_id)
+                if not documents:
+                    del self._index[shingle]
+
+    def fingerprint_score(self, text: str) -> float:
+        """Наибольшая доля общих шинглов с известным спамом (от меньшего из текстов)"""
+        document = shingles(text)
+        if not document:
+            return 0.0
+        overlaps: Counter = Counter()
+        for shingle in document:
+            overlaps.update(self._index.get(shingle, ()))
+        best = 0.0
+        for document_id, overlap in overlaps.items():
+            smaller = min(len(document), len(self._documents[document_id]))
+            # Одно случайное совпадение фразы у длинных текстов — не сигнал
+            if overlap >= min(SHINGLE_SIZE, smaller):
+                best = max(best, overlap / smaller)
+        return best
+
+    def schedule_refresh(self) -> None:
+        """Фоновая дозагрузка отпечатков раз в refresh_interval (0 — выключена)"""
+        if self.refresh_interval <= 0:
+            return
+        if time.monotonic() - self._last_refresh < self.refresh_interval:
+            return
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def refresh(self) -> None:
+        """Дочитать из базы жалобы, получившие статус «spam» после прошлой загрузки.
+
+        Отметка — номер изменения жалобы, а не id: старая жалоба, которую
+        пометили спамом в другом процессе, тоже попадает в отпечатки.
+        """
+        self._last_refresh = time.monotonic()
+        try:
+            async with AsyncSessionLocal() as db:
+                while True:
+                    rows = (await db.execute(
+                        select(ComplaintRevision.revision, Complaint.text)
+                        .join(Complaint, Complaint.id == ComplaintRevision.complaint_id)
+                        .where(
+                            ComplaintRevision.revision > self._last_revision,
+                            Complaint.status == SPAM_STATUS,
+                        )
+                        .order_by(ComplaintRevision.revision)
+                        .limit(1000)
+                    )).all()
+                    for revision, text in rows:
+                        self.learn(text)
+                        self._last_revision = revision
+                    if len(rows) < 1000:
+                        break
+        except Exception as e:
+            logger.warning("Spam fingerprint refresh failed: %s", e)
+
+    # Сигналы по IP
+
+    def _record_submission(self, ip: str, now: float) -> int:
+        hit, timestamps = self._submissions.get(ip)
+        if not hit:
+            timestamps = deque()
+        while timestamps and now - timestamps[0] > self.velocity_window:
+            timestamps.popleft()
+        timestamps.append(now)
+        self._submissions.set(ip, timestamps)
+        return len(timestamps)
+
+    def velocity_score(self, submissions: int) -> float:
+        """0 до половины лимита, затем линейно до 1 на самом лимите"""
+        half = self.velocity_limit / 2
+        if submissions <= half:
+            return 0.0
+        return min(1.0, (submissions - half) / half)
+
+    def _decayed_reputation(self, ip: str, now: float) -> float:
+        hit, entry = self._reputation.get(ip)
+        if not hit:
+            return 0.0
+        value, updated = entry
+        return value * math.pow(0.5, (now - updated) / self.reputation_half_life)
+
+    def reputation_score(self, ip: str, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        return min(1.0, self._decayed_reputation(ip, now) / self.reputation_threshold)
+
+    def penalize(self, ip: Optional[str]) -> None:
+        """Спам-вердикт для IP ухудшает его репутацию"""
+        if not _is_public_ip(ip):
+            return
+        now = time.monotonic()
+        self._reputation.set(ip, (self._decayed_reputation(ip, now) + 1.0, now))
+
+    # Решение
+
+    def signals(self, text: str, ip: Optional[str]) -> Dict[str, float]:
+        result = {
+            "fingerprint": self.fingerprint_score(text),
+            "contacts": 0.5 if _CONTACTS.search(text) else 0.0,
+        }
+        if _is_public_ip(ip):
+            now = time.monotonic()
+            result["velocity"] = self.velocity_score(self._record_submission(ip, now))
+            result["reputation"] = self.reputation_score(ip, now)
+        return result
+
+    def evaluate(self, text: str, ip: Optional[str] = None) -> Tuple[Optional[bool], Dict[str, Any]]:
+        """Локальный вердикт: (True/False, результат) или (None, результат) — спорный случай"""
+        self.schedule_refresh()
+        signals = self.signals(text, ip)
+        score = max(signals.values())
+        result = {
+            "is_spam": score >= self.spam_threshold,
+            "score": round(score, 3),
+            "source": "prefilter",
+            "signals": {name: round(value, 3) for name, value in signals.items()},
+        }
+        if score >= self.spam_threshold:
+            return True, result
+        if score < self.ham_threshold:
+            return False, result
+        return None, result
+
+    def observe(self, text: str, ip: Optional[str], result: Dict[str, Any]) -> None:
+        """Учет итогового вердикта: спам по содержанию текста портит репутацию IP.
+
+        Репутацию ухудшают только вердикты внешнего API и совпадения
+        с отпечатками спама. Вердикт по частоте или самой репутации ничего
+        не говорит о тексте: иначе IP, попавший под подозрение, не выходил бы
+        из него, пока продолжает писать. Отпечатки пополняются только
+        вердиктами внешнего API.
+        """
+        if not result.get("is_spam"):
+            return
+        if result.get("source") == "api":
+            self.penalize(ip)
+            self.learn(text)
+        elif result.get("signals", {}).get("fingerprint", 0.0) >= self.spam_threshold:
+            self.penalize(ip)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "fingerprints": len(self._documents),
+            "shingles": len(self._index),
+            "tracked_ips": len(self._submissions),
+            "last_revision": self._last_revision,
+        }
@@ -1,30 +1,92 @@
+import asyncio
+import logging
 import httpx
 import os
-from typing import Dict, Any
+import time
+from typing import Awaitable, Callable, Dict, Any, Optional
 
-class SpamService:
-    def __init__(self):
+from ..config import settings
+from ..utils.deadline import remaining
+from .circuit_breaker import get_breaker, retry_after_seconds
+from .http_client import HTTPClientMixin
+from .spam_prefilter import SpamPrefilter
+
+logger = logging.getLogger(__name__)
+
+# Текст в query string API Ninjas обрезается: длинные URL провайдер отклоняет
+MAX_REMOTE_TEXT_LENGTH = 1000
+
+class SpamService(HTTPClientMixin):
+    def __init__(
+        self,
+        http_client: Optional[httpx.AsyncClient] = None,
+        prefilter: Optional[SpamPrefilter] = None,
+    ):
+        self._http_client = http_client
         self.api_key = os.getenv("SPAM_API_KEY")
         self.base_url = "https://api.api-ninjas.com/v1/spamcheck"
+        self.breaker = get_breaker("api_ninjas")
+        self.prefilter = prefilter or SpamPrefilter()
     
-    async def check_spam(self, text: str) -> Dict[str, Any]:
-        """Проверка на спам через API Ninjas"""
+    async def check_spam(
+        self,
+        text: str,
+        ip: Optional[str] = None,
+        check_remote: Optional[Callable[[str], Awaitable[Optional[Dict[str, Any]]]]] = None,
+    ) -> Dict[str, Any]:
+        """Проверка на спам: локальный префильтр, API Ninjas — только для спорных случаев.
+
+        check_remote подменяет обращение к API Ninjas (например, кэшем по тексту);
+        сигналы префильтра по IP считаются в любом случае.
+        """
+        verdict, result = self.prefilter.evaluate(text, ip)
+        if verdict is None:
+            remote = await (check_remote or self.check_remote)(text)
+            if remote is not None:
+                result = {**remote, "source": "api", "signals": result["signals"]}
+            else:
+                # Внешняя проверка недоступна: спорный случай не считается спамом
+                # (контакты в тексте — лишь повод спросить API)
+                result["is_spam"] = False
+        self.prefilter.observe(text, ip, result)
+        return result
+    
+    async def check_remote(self, text: str) -> Optional[Dict[str, Any]]:
+        """Проверка через API Ninjas; None, если ответа провайдера нет"""
         if not self.api_key:
-            return {"is_spam": False, "score": 0}
+            return None
+        
+        # Бюджет запроса исчерпан или провайдер недоступен — не ждем таймаута
+        budget = remaining(settings.HTTP_TIMEOUT)
+        if budget <= 0 or not self.breaker.allow_request():
+            return None
         
+        started = time.monotonic()
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    self.base_url,
-                    headers={"X-Api-Key": self.api_key},
-                    params={"text": text},
-                    timeout=10.0
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    return {"is_spam": False, "score": 0}
+            response = await self.http_client.get(
+                self.base_url,
+                headers={"X-Api-Key": self.api_key},
+                params={"text": text[:MAX_REMOTE_TEXT_LENGTH]},
+                timeout=budget
+            )
+            self.breaker.record_status(
+                response.status_code, retry_after_seconds(response.headers.get("retry-after"))
+            )
+            
+            if response.status_code == 200:
+                return response.json()
+            else:
+                return None
+        except asyncio.CancelledError:
+            # Стадию оборвал бюджет запроса: ошибка провайдера, только если
+            # ответа не было дольше порога медленного вызова
+            self.breaker.record_cancelled(started)
+            raise
+        except httpx.TimeoutException as e:
+            self.breaker.record_timeout(budget, settings.HTTP_TIMEOUT, started)
+            logger.warning("Spam check timed out: %s", e)
+            return None
         except Exception as e:
-            print(f"Error checking spam: {e}")
-            return {"is_spam": False, "score": 0} 
\ No newline at end of file
+            self.breaker.record_failure()
+            logger.warning("Error checking spam: %s", e)
+            return None
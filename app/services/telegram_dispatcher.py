@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from ..config import settings
+from ..utils import TokenBucket
+from .telegram_service import TelegramService
+
+logger = logging.getLogger(__name__)
+
+# Документированные лимиты Telegram Bot API для одного чата
+PRIVATE_CHAT_MESSAGES_PER_MINUTE = 60
+GROUP_CHAT_MESSAGES_PER_MINUTE = 20
+
+PendingNotification = Tuple[Dict[str, Any], asyncio.Future]
+
+
+class TelegramDispatcher:
+    """Очередь уведомлений о жалобах с темпом по лимитам Telegram.
+
+    Сообщения отправляются через token bucket, ответ 429 приостанавливает
+    отправку на retry_after. После max_retries ответов 429 подряд сообщение
+    завершается неудачей и повторяется outbox позже. Если в очереди
+    накопилось не меньше digest_threshold жалоб, они отправляются одним
+    сводным сообщением.
+    """
+
+    def __init__(
+        self,
+        telegram_service: Optional[TelegramService] = None,
+        messages_per_minute: float = settings.TELEGRAM_MESSAGES_PER_MINUTE,
+        burst: int = settings.TELEGRAM_BURST,
+        digest_threshold: int = settings.TELEGRAM_DIGEST_THRESHOLD,
+        digest_max_items: int = settings.TELEGRAM_DIGEST_MAX_ITEMS,
+        max_retries: int = settings.TELEGRAM_MAX_RETRIES,
+    ):
+        self.telegram_service = telegram_service or TelegramService()
+        if not messages_per_minute:
+            messages_per_minute = (
+                GROUP_CHAT_MESSAGES_PER_MINUTE if self.telegram_service.is_group_chat
+                else PRIVATE_CHAT_MESSAGES_PER_MINUTE
+            )
+        self.bucket = TokenBucket(rate=messages_per_minute / 60.0, capacity=burst)
+        self.digest_threshold = digest_threshold
+        self.digest_max_items = digest_max_items
+        self.max_retries = max_retries
+        self._queue: Deque[PendingNotification] = deque()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def queue_size(self) -> int:
+        return len(self._queue)
+
+    async def submit(self, complaint_data: Dict[str, Any]) -> bool:
+        """Постановка уведомления в очередь; результат — после отправки"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((complaint_data, future))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return await future
+
+    async def close(self) -> None:
+        """Остановка отправки при завершении приложения.
+
+        Ожидающие уведомления отменяются: их сообщения остаются в outbox
+        и будут доставлены после перезапуска.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._queue:
+            _, future = self._queue.popleft()
+            future.cancel()
+
+    async def _run(self) -> None:
+        rate_limited = 0
+        while self._queue:
+            await self.bucket.acquire()
+
+            batch = self._take_batch()
+            if len(batch) == 1:
+                message = self.telegram_service.format_complaint_message(batch[0][0])
+            else:
+                message, fitted = self.telegram_service.format_digest_message(
+                    [data for data, _ in batch]
+                )
+                # Не поместившиеся в лимит длины возвращаются в начало очереди
+                for item in reversed(batch[fitted:]):
+                    self._queue.appendleft(item)
+                batch = batch[:fitted]
+
+            try:
+                success, retry_after = await self.telegram_service.send_message(message)
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+            if retry_after is not None:
+                self.bucket.pause(retry_after)
+                rate_limited += 1
+                if rate_limited <= self.max_retries:
+                    for item in reversed(batch):
+                        self._queue.appendleft(item)
+                    continue
+                logger.warning(
+                    "Telegram rate limit persists, giving up",
+                    extra={"complaints": len(batch), "retries": self.max_retries}
+                )
+            rate_limited = 0
+
+            if success and len(batch) > 1:
+                logger.info("Sent Telegram digest", extra={"complaints": len(batch)})
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(success)
+
+    def _take_batch(self) -> List[PendingNotification]:
+        size = 1
+        if len(self._queue) >= self.digest_threshold:
+            size = min(len(self._queue), self.digest_max_items)
+        return [self._queue.popleft() for _ in range(size)]
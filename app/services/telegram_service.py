@@ -1,9 +1,16 @@
+import logging
+import html
 import httpx
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
-class TelegramService:
-    def __init__(self):
+from .http_client import HTTPClientMixin
+
+logger = logging.getLogger(__name__)
+
+class TelegramService(HTTPClientMixin):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        self._http_client = http_client
         self.bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
         chat_id_str = os.getenv("TELEGRAM_CHAT_ID")
         # Преобразуем chat_id в число
@@ -13,43 +20,55 @@ class TelegramService:
             self.chat_id = None
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
     
-    async def send_notification(self, message: str, parse_mode: str = "HTML") -> bool:
-        """Отправка уведомления в Telegram"""
+    @property
+    def is_configured(self) -> bool:
+        return bool(self.bot_token and self.chat_id)
+    
+    @property
+    def is_group_chat(self) -> bool:
+        """Группы и каналы в Telegram имеют отрицательный chat_id"""
+        return bool(self.chat_id and self.chat_id < 0)
+    
+    async def send_message(self, message: str, parse_mode: str = "HTML") -> Tuple[bool, Optional[float]]:
+        """Отправка сообщения; возвращает (успех, retry_after при ответе 429)"""
         if not self.bot_token or not self.chat_id:
-            print("Telegram bot not configured")
-            return False
+            logger.debug("Telegram bot not configured")
+            return False, None
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/sendMessage",
-                    json={
-                        "chat_id": self.chat_id,
-                        "text": message,
-                        "parse_mode": parse_mode
-                    },
-                    timeout=10.0
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    return result.get("ok", False)
-                else:
-                    print(f"Telegram API error: {response.status_code}")
-                    return False
+            response = await self.http_client.post(
+                f"{self.base_url}/sendMessage",
+                json={
+                    "chat_id": self.chat_id,
+                    "text": message,
+                    "parse_mode": parse_mode
+                },
+                timeout=10.0
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                return result.get("ok", False), None
+            elif response.status_code == 429:
+                retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+                logger.warning("Telegram rate limit hit", extra={"retry_after": retry_after})
+                return False, float(retry_after)
+            else:
+                logger.warning("Telegram API error", extra={"status_code": response.status_code})
+                return False, None
         except Exception as e:
-            print(f"Error sending Telegram notification: {e}")
-            return False
+            logger.error("Error sending Telegram notification: %s", e)
+            return False, None
     
-    async def send_complaint_notification(self, complaint_data: Dict[str, Any]) -> bool:
-        """Отправка уведомления о новой жалобе"""
-        if not self.bot_token or not self.chat_id:
-            print("Telegram bot not configured")
-            return False
-        
-        try:
-            # Формируем красивое сообщение
-            message = f"""
+    async def send_notification(self, message: str, parse_mode: str = "HTML") -> bool:
+        """Отправка уведомления в Telegram"""
+        success, _ = await self.send_message(message, parse_mode)
+        return success
+    
+    @staticmethod
+    def format_complaint_message(complaint_data: Dict[str, Any]) -> str:
+        """Текст уведомления о новой жалобе"""
+        return f"""
 🚨 <b>Новая жалоба #{complaint_data.get('id', 'N/A')}</b>
 
 📝 <b>Текст:</b> {complaint_data.get('text', 'N/A')}
@@ -60,22 +79,59 @@ class TelegramService:
 🕐 <b>Время:</b> {complaint_data.get('created_at', 'N/A')}
 
 {'⚠️ <b>Спам:</b> Да' if complaint_data.get('is_spam', False) else ''}
-            """.strip()
+        """.strip()
+    
+    @staticmethod
+    def format_digest_message(complaints: List[Dict[str, Any]], max_length: int = 4096) -> Tuple[str, int]:
+        """Сводное сообщение о нескольких жалобах.
+        
+        Возвращает текст и число жалоб, которые в него поместились
+        (ограничение Telegram — 4096 символов на сообщение).
+        """
+        header = f"📦 <b>Новые жалобы: {len(complaints)}</b>\n"
+        lines: List[str] = []
+        length = len(header)
+        for complaint in complaints:
+            text = complaint.get('text', '')
+            if len(text) > 100:
+                text = text[:100] + "…"
+            spam = " ⚠️" if complaint.get('is_spam', False) else ""
+            line = (
+                f"\n#{complaint.get('id', 'N/A')} [{complaint.get('category', 'N/A')}, "
+                f"{complaint.get('sentiment', 'N/A')}]{spam} {html.escape(text)}"
+            )
+            if lines and length + len(line) > max_length:
+                break
+            lines.append(line)
+            length += len(line)
+        
+        if len(lines) < len(complaints):
+            header = f"📦 <b>Новые жалобы: {len(lines)}</b>\n"
+        return header + "".join(lines), len(lines)
+    
+    async def send_complaint_notification(self, complaint_data: Dict[str, Any]) -> bool:
+        """Отправка уведомления о новой жалобе"""
+        if not self.bot_token or not self.chat_id:
+            logger.debug("Telegram bot not configured")
+            return False
+        
+        try:
+            message = self.format_complaint_message(complaint_data)
             
             success = await self.send_notification(message)
             if success:
-                print(f"Successfully sent Telegram notification for complaint {complaint_data.get('id')}")
+                logger.debug("Sent Telegram notification", extra={"complaint_id": complaint_data.get("id")})
             else:
-                print(f"Failed to send Telegram notification for complaint {complaint_data.get('id')}")
+                logger.warning("Failed to send Telegram notification", extra={"complaint_id": complaint_data.get("id")})
             return success
         except Exception as e:
-            print(f"Error sending Telegram notification for complaint {complaint_data.get('id')}: {e}")
+            logger.error("Error sending Telegram notification: %s", e, extra={"complaint_id": complaint_data.get("id")})
             return False
     
     async def send_daily_report(self, complaints_count: int, open_complaints: int) -> bool:
         """Отправка ежедневного отчета"""
         if not self.bot_token or not self.chat_id:
-            print("Telegram bot not configured for daily report")
+            logger.debug("Telegram bot not configured for daily report")
             return False
         
         try:
@@ -91,10 +147,10 @@ class TelegramService:
             
             success = await self.send_notification(message)
             if success:
-                print(f"Successfully sent daily report: {complaints_count} total, {open_complaints} open")
+                logger.info("Sent daily report", extra={"total": complaints_count, "open": open_complaints})
             else:
-                print(f"Failed to send daily report")
+                logger.warning("Failed to send daily report")
             return success
         except Exception as e:
-            print(f"Error sending daily report: {e}")
+            logger.error("Error sending daily report: %s", e)
             return False 
\ No newline at end of file
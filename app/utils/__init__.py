@@ -2,9 +2,27 @@
 Утилиты для системы обработки жалоб
 """
 
-from .helpers import get_client_ip, format_datetime
+from .helpers import get_client_ip, format_datetime, complaint_notification_data
+from .json_stream import iter_json_items
+from .token_bucket import TokenBucket
+from .cache import TTLCache
+from .deadline import deadline_scope, remaining
+from .pagination import encode_cursor, decode_cursor
+from .export import EXPORT_COLUMNS, ndjson_chunk, csv_chunk, csv_header
  
 __all__ = [
     'get_client_ip',
-    'format_datetime'
+    'format_datetime',
+    'complaint_notification_data',
+    'iter_json_items',
+    'TokenBucket',
+    'TTLCache',
+    'deadline_scope',
+    'remaining',
+    'encode_cursor',
+    'decode_cursor',
+    'EXPORT_COLUMNS',
+    'ndjson_chunk',
+    'csv_chunk',
+    'csv_header'
 ] 
\ No newline at end of file
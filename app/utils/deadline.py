@@ -0,0 +1,36 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# Абсолютный момент (time.monotonic) окончания бюджета текущего запроса
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """Бюджет времени на вложенные вызовы; вложенный бюджет не продлевает внешний.
+
+    Значение видно во всех задачах, созданных внутри блока (asyncio
+    копирует contextvars при создании задачи). None или 0 — без бюджета.
+    """
+    if not seconds:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining(default: float) -> float:
+    """Сколько секунд можно ждать внешний вызов: не больше default и остатка бюджета"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    return max(0.0, min(default, deadline - time.monotonic()))
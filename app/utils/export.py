@@ -0,0 +1,31 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, Iterable, Sequence
+
+# Колонки выгрузки жалоб в порядке вывода
+EXPORT_COLUMNS = ("id", "text", "status", "timestamp", "sentiment", "category")
+
+
+def _value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def ndjson_chunk(rows: Iterable[Sequence[Any]]) -> str:
+    """Строки выгрузки в NDJSON: один JSON-объект на строку"""
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, map(_value, row))), ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def csv_chunk(rows: Iterable[Sequence[Any]]) -> str:
+    """Строки выгрузки в CSV (экранирование переводов строк и кавычек — по RFC 4180)"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+def csv_header() -> str:
+    return csv_chunk([EXPORT_COLUMNS])
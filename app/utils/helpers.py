@@ -1,5 +1,6 @@
 from fastapi import Request
 from datetime import datetime, timezone
+from typing import Any, Dict
 
 def get_client_ip(request: Request) -> str:
     """Получение IP адреса клиента"""
@@ -11,4 +12,17 @@ def format_datetime(dt: datetime) -> str:
     """Форматирование даты и времени"""
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=timezone.utc)
-    return dt.strftime("%Y-%m-%d %H:%M:%S") 
\ No newline at end of file
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+def complaint_notification_data(complaint: Any, ip_address: str, is_spam: bool) -> Dict[str, Any]:
+    """Данные жалобы для уведомлений в Telegram и Google Sheets"""
+    return {
+        "id": complaint.id,
+        "text": complaint.text,
+        "category": complaint.category,
+        "sentiment": complaint.sentiment,
+        "status": complaint.status,
+        "ip_address": ip_address,
+        "created_at": complaint.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+        "is_spam": is_spam
+    } 
\ No newline at end of file
@@ -0,0 +1,177 @@
+import codecs
+import json
+import re
+from typing import Any, AsyncIterator, Optional, Tuple, Union
+
+ParsedItem = Tuple[int, Union[Any, ValueError]]
+
+# Предел длины одного элемента массива (символов): битый или бесконечный
+# элемент не заставляет буферизовать все тело запроса
+MAX_ITEM_LENGTH = 1 << 20
+
+# Вне строки важны только скобки, запятые и начало строки
+_STRUCTURAL = re.compile(r'[\[\]{},"]')
+# Внутри строки — ее конец и экранирование
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+async def iter_json_items(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedItem]:
+    """Потоковый разбор тела запроса: NDJSON или JSON-массив.
+
+    Формат определяется по первому непробельному символу. Возвращает пары
+    (индекс, значение); для элемента, который не удалось разобрать, вместо
+    значения возвращается ValueError. В NDJSON разбор продолжается со
+    следующей строки, в JSON-массиве — останавливается.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    mode = None
+
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        if mode is None:
+            stripped = buffer.lstrip()
+            if not stripped:
+                continue
+            mode = "array" if stripped[0] == "[" else "ndjson"
+            break
+
+    if mode is None:
+        return
+
+    if mode == "ndjson":
+        parser = _iter_ndjson(buffer, decoder, chunks)
+    else:
+        parser = _iter_array(buffer, decoder, chunks)
+    async for item in parser:
+        yield item
+
+
+async def _iter_ndjson(buffer, decoder, chunks) -> AsyncIterator[ParsedItem]:
+    index = 0
+
+    def parse_lines(text: str):
+        nonlocal index
+        for line in text.split("\n"):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield index, json.loads(line)
+            except ValueError as e:
+                yield index, ValueError(f"Invalid JSON: {e}")
+            index += 1
+
+    while True:
+        head, sep, buffer = buffer.rpartition("\n")
+        if sep:
+            for item in parse_lines(head):
+                yield item
+        else:
+            buffer = head + buffer
+        try:
+            chunk = await chunks.__anext__()
+        except StopAsyncIteration:
+            break
+        buffer += decoder.decode(chunk)
+
+    buffer += decoder.decode(b"", final=True)
+    for item in parse_lines(buffer):
+        yield item
+
+
+class _ElementScanner:
+    """Поиск конца элемента JSON-массива: запятой или «]» на нулевой глубине.
+
+    Состояние сохраняется между вызовами, поэтому дочитанный чанк не
+    сканируется заново.
+    """
+
+    def __init__(self):
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+
+    def find_end(self, buffer: str) -> Optional[int]:
+        """Позиция разделителя после элемента или None, если элемент неполный"""
+        while True:
+            if self.in_string:
+                match = _STRING_SPECIAL.search(buffer, self.pos)
+                if match is None:
+                    self.pos = len(buffer)
+                    return None
+                if match.group() == "\\":
+                    # Экранированный символ пропускается, даже если еще не пришел
+                    self.pos = match.end() + 1
+                else:
+                    self.in_string = False
+                    self.pos = match.end()
+                continue
+
+            match = _STRUCTURAL.search(buffer, self.pos)
+            if match is None:
+                self.pos = len(buffer)
+                return None
+            char = match.group()
+            self.pos = match.end()
+            if char == '"':
+                self.in_string = True
+            elif char in "[{":
+                self.depth += 1
+            elif char in "]}" and self.depth > 0:
+                self.depth -= 1
+            elif self.depth == 0:
+                return match.start()
+
+
+async def _iter_array(buffer, decoder, chunks) -> AsyncIterator[ParsedItem]:
+    # Пропускаем открывающую скобку
+    buffer = buffer.lstrip()[1:]
+    scanner = _ElementScanner()
+    # Начало текущего элемента в буфере: разобранное отрезается только
+    # при дочитывании, а не после каждого элемента
+    start = 0
+    index = 0
+    exhausted = False
+
+    while True:
+        end = scanner.find_end(buffer)
+        if end is None:
+            if exhausted:
+                yield index, ValueError("Unexpected end of JSON array")
+                return
+            if len(buffer) - start > MAX_ITEM_LENGTH:
+                yield index, ValueError(f"Array item is longer than {MAX_ITEM_LENGTH} characters")
+                return
+            # Элемент неполный — дочитываем тело
+            buffer = buffer[start:]
+            scanner.pos -= start
+            start = 0
+            try:
+                buffer += decoder.decode(await chunks.__anext__())
+            except StopAsyncIteration:
+                buffer += decoder.decode(b"", final=True)
+                exhausted = True
+            continue
+
+        item, delimiter = buffer[start:end].strip(), buffer[end]
+        start = end + 1
+        if not item:
+            # Пустой массив; иначе — лишняя или пропущенная запятая
+            if index == 0 and delimiter == "]":
+                return
+            yield index, ValueError("Invalid JSON: expected an array item before " + repr(delimiter))
+            return
+        try:
+            # Граница элемента известна: ошибка в нем сообщается сразу
+            value = json.loads(item)
+        except ValueError as e:
+            yield index, ValueError(f"Invalid JSON: {e}")
+            return
+        yield index, value
+        index += 1
+        if delimiter == "]":
+            return
+        if delimiter != ",":
+            yield index, ValueError("Invalid JSON: expected ',' or ']' between array items")
+            return
@@ -0,0 +1,22 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(timestamp: datetime, record_id: int) -> str:
+    """Непрозрачный курсор: позиция последней выданной записи (timestamp, id)"""
+    raw = json.dumps([timestamp.isoformat(), record_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Обратное преобразование; ValueError для поврежденного курсора"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, record_id = json.loads(raw)
+        if not isinstance(record_id, int):
+            raise TypeError(record_id)
+        return datetime.fromisoformat(timestamp), record_id
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
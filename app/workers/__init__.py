@@ -0,0 +1,3 @@
+"""
+Фоновые воркеры системы обработки жалоб
+"""
@@ -0,0 +1,208 @@
+"""
+Воркер отложенного обогащения жалоб.
+
+Забирает задания из таблицы enrichment_jobs, выполняет проверку на спам,
+анализ тональности, категоризацию и геолокацию и записывает результат в
+строку Complaint. Несколько процессов могут работать с одной базой
+одновременно: задания захватываются атомарно и с арендой.
+
+Запуск: python -m app.workers.enrichment_worker --processes 2
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+
+from ..config import settings
+from ..logging_config import request_id_var, setup_logging, stop_logging
+from ..models.database import AsyncSessionLocal, Complaint, ComplaintDuplicate, EnrichmentJob, init_db, engine
+from ..services import EnrichmentService, DuplicateIndex
+from ..services import job_queue
+from ..services.complaint_cache import bump_version
+from ..services.outbox import DUPLICATE_TOPICS, enqueue_complaint_notifications
+from ..services.http_client import start_http_client, close_http_client
+from ..utils import complaint_notification_data
+
+logger = logging.getLogger(__name__)
+
+
+class EnrichmentWorker:
+    def __init__(
+        self,
+        worker_id: str,
+        batch_size: int = settings.WORKER_BATCH_SIZE,
+        concurrency: int = settings.WORKER_CONCURRENCY,
+        poll_interval: float = settings.WORKER_POLL_INTERVAL,
+    ):
+        self.worker_id = worker_id
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.enrichment_service = EnrichmentService()
+        self.duplicate_index = DuplicateIndex()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def run(self) -> None:
+        """Основной цикл: захват пачки заданий и их параллельная обработка"""
+        logger.info("Enrichment worker started", extra={"worker_id": self.worker_id})
+        while not self._stopping.is_set():
+            try:
+                async with AsyncSessionLocal() as db:
+                    jobs = await job_queue.claim_batch(
+                        db, EnrichmentJob, self.worker_id,
+                        self.batch_size, settings.WORKER_LEASE_SECONDS
+                    )
+            except Exception as e:
+                logger.error("Failed to claim jobs: %s", e, extra={"worker_id": self.worker_id})
+                jobs = []
+
+            if not jobs:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            results = await asyncio.gather(
+                *(self._process(job) for job in jobs), return_exceptions=True
+            )
+            for job, result in zip(jobs, results):
+                if isinstance(result, Exception):
+                    # Задание вернется в очередь по истечении аренды
+                    logger.error(
+                        "Job processing crashed: %s", result,
+                        extra={"worker_id": self.worker_id, "job_id": job.id}
+                    )
+        logger.info("Enrichment worker stopped", extra={"worker_id": self.worker_id})
+
+    async def _process(self, job: EnrichmentJob) -> None:
+        # Записи лога по заданию связываются его id вместо id запроса
+        request_id_var.set(f"job-{job.id}")
+        async with self._semaphore, AsyncSessionLocal() as db:
+            try:
+                complaint = await db.get(Complaint, job.complaint_id)
+                if complaint is None:
+                    await job_queue.finish(db, EnrichmentJob, job.id)
+                    await db.commit()
+                    return
+
+                # Незавершенные жалобы API не кэширует; повтор задания поверх
+                # уже обогащенной жалобы должен сбросить кэши процессов API
+                cached = complaint.sentiment != "pending"
+
+                signature, duplicate = self.duplicate_index.lookup(complaint.text)
+                if duplicate is not None and duplicate.canonical_id != complaint.id:
+                    # Копия недавней жалобы: результаты оригинала, строка в таблице
+                    # без сообщения в Telegram
+                    complaint.sentiment = duplicate.sentiment
+                    complaint.category = duplicate.category
+                    await db.merge(ComplaintDuplicate(
+                        complaint_id=complaint.id,
+                        canonical_id=duplicate.canonical_id,
+                        similarity=duplicate.similarity
+                    ))
+                    enqueue_complaint_notifications(
+                        db,
+                        complaint_notification_data(complaint, job.ip_address, duplicate.is_spam),
+                        DUPLICATE_TOPICS
+                    )
+                    await job_queue.finish(db, EnrichmentJob, job.id)
+                    await db.commit()
+                    if cached:
+                        bump_version(settings.COMPLAINT_CACHE_VERSION_PATH)
+                    return
+
+                enrichment = await self.enrichment_service.enrich(complaint.text, job.ip_address)
+                complaint.sentiment = enrichment.sentiment
+                complaint.category = enrichment.category
+                # Уведомления уходят через outbox, который разбирает API-процесс;
+                # они и удаление задания фиксируются одной транзакцией
+                enqueue_complaint_notifications(db, complaint_notification_data(
+                    complaint, job.ip_address, enrichment.spam.get("is_spam", False)
+                ))
+                await job_queue.finish(db, EnrichmentJob, job.id)
+                await db.commit()
+                if cached:
+                    bump_version(settings.COMPLAINT_CACHE_VERSION_PATH)
+                self.duplicate_index.add(
+                    complaint.id, complaint.text, complaint.sentiment, complaint.category,
+                    enrichment.spam.get("is_spam", False), signature
+                )
+            except Exception as e:
+                await db.rollback()
+                logger.exception("Error enriching complaint: %s", e, extra={"complaint_id": job.complaint_id})
+                try:
+                    await job_queue.mark_failed(
+                        db, EnrichmentJob, job, str(e), settings.WORKER_MAX_ATTEMPTS
+                    )
+                except Exception as mark_error:
+                    # Например, база заблокирована: задание вернется по истечении аренды
+                    logger.error(
+                        "Failed to record job failure: %s", mark_error,
+                        extra={"complaint_id": job.complaint_id}
+                    )
+
+
+async def _run_worker(worker_id: str) -> None:
+    worker = EnrichmentWorker(worker_id)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    await init_db()
+    await worker.enrichment_service.spam_service.prefilter.refresh()
+    await worker.duplicate_index.refresh()
+    await start_http_client()
+    try:
+        await worker.run()
+    finally:
+        await worker.enrichment_service.close()
+        await close_http_client()
+        await engine.dispose()
+
+
+def _worker_process(index: int) -> None:
+    setup_logging()
+    try:
+        asyncio.run(_run_worker(f"{socket.gethostname()}:{os.getpid()}:{index}"))
+    finally:
+        stop_logging()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Воркеры отложенного обогащения жалоб")
+    parser.add_argument("--processes", type=int, default=1, help="Число процессов-воркеров")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        _worker_process(0)
+        return
+
+    processes = [
+        multiprocessing.Process(target=_worker_process, args=(index,))
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    def _shutdown(signum, frame):
+        # Пересылаем сигнал воркерам: каждый дорабатывает текущую пачку и выходит
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGINT, _shutdown)
+    signal.signal(signal.SIGTERM, _shutdown)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Планы выполнения горячих запросов к жалобам на большой базе.
+
+Создает временную базу миграциями, заполняет ее жалобами и печатает
+EXPLAIN QUERY PLAN и время каждого запроса: страниц списка с фильтрами
+(GET /complaints/, в том числе глубоко по курсору), недавних жалоб
+(GET /complaints/recent/) и счетчиков ежедневного отчета
+(POST /telegram/daily-report/). Код выхода 1, если какой-то из запросов
+читает таблицу complaints целиком или сортирует результат.
+
+Запуск: python -m benchmarks.explain_hot_queries [--rows 500000]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, func, select, tuple_
+from sqlalchemy.dialects import sqlite
+
+from app.models.database import Complaint
+from app.models.migrations import apply_migrations
+
+STATUSES = ["open"] * 2 + ["closed"] * 15 + ["in_progress"] * 2 + ["spam"]
+CATEGORIES = ["техническая", "оплата", "другое"]
+SENTIMENTS = ["positive", "negative", "neutral"]
+
+
+def complaints_page(*conditions, cursor=None):
+    query = select(
+        Complaint.id, Complaint.status, Complaint.sentiment,
+        Complaint.category, Complaint.timestamp
+    ).where(*conditions)
+    if cursor is not None:
+        query = query.where(tuple_(Complaint.timestamp, Complaint.id) < tuple_(*cursor))
+    return query.order_by(Complaint.timestamp.desc(), Complaint.id.desc()).limit(101)
+
+
+def hot_queries():
+    """Те же выражения, что строят маршруты"""
+    now = datetime.now(timezone.utc)
+    hour_ago = now - timedelta(hours=1)
+    yesterday = now - timedelta(days=1)
+    # Курсор страницы глубоко в середине таблицы
+    deep = (now - timedelta(days=180), 1)
+    return {
+        "GET /complaints/": complaints_page(),
+        "GET /complaints/?cursor=...": complaints_page(cursor=deep),
+        "GET /complaints/?status=open&cursor=...": complaints_page(
+            Complaint.status == "open", cursor=deep
+        ),
+        "GET /complaints/?category=оплата&cursor=...": complaints_page(
+            Complaint.category == "оплата", cursor=deep
+        ),
+        "GET /complaints/recent/?hours=1": (
+            select(Complaint).where(Complaint.status == "open", Complaint.timestamp >= hour_ago)
+        ),
+        "daily-report: всего за сутки": (
+            select(func.count()).select_from(Complaint).where(Complaint.timestamp >= yesterday)
+        ),
+        "daily-report: открытых за сутки": (
+            select(func.count()).select_from(Complaint).where(
+                Complaint.status == "open", Complaint.timestamp >= yesterday
+            )
+        ),
+    }
+
+
+def needs_full_scan(plan):
+    """Полный просмотр таблицы или сортировка всех подходящих строк"""
+    return any(line == "SCAN complaints" or line.startswith("USE TEMP B-TREE") for line in plan)
+
+
+def to_sql(statement):
+    """SQL и параметры в формате sqlite3 (даты — как их хранит SQLAlchemy)"""
+    compiled = statement.compile(dialect=sqlite.dialect())
+    params = []
+    for name in compiled.positiontup:
+        value = compiled.params[name]
+        if isinstance(value, datetime):
+            value = value.replace(tzinfo=None).isoformat(" ")
+        params.append(value)
+    return str(compiled), params
+
+
+def seed(path, rows):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        apply_migrations(conn)
+    engine.dispose()
+
+    rng = random.Random(0)
+    start = datetime.now() - timedelta(days=365)
+    step = timedelta(days=365) / rows
+    db = sqlite3.connect(path)
+    db.executemany(
+        "INSERT INTO complaints (text, status, timestamp, sentiment, category) VALUES (?, ?, ?, ?, ?)",
+        (
+            (
+                f"Жалоба номер {i}",
+                rng.choice(STATUSES),
+                (start + step * i).isoformat(" "),
+                rng.choice(SENTIMENTS),
+                rng.choice(CATEGORIES),
+            )
+            for i in range(rows)
+        ),
+    )
+    db.commit()
+    db.execute("ANALYZE")
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500000, help="Число жалоб в базе")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = seed(os.path.join(directory, "complaints.db"), args.rows)
+        full_scans = []
+        for name, statement in hot_queries().items():
+            sql, params = to_sql(statement)
+            plan = [row[3] for row in db.execute("EXPLAIN QUERY PLAN " + sql, params)]
+            elapsed = min(timeit.repeat(
+                lambda: db.execute(sql, params).fetchall(), number=10, repeat=3
+            )) / 10
+            print(f"{name}  ({elapsed * 1000:.2f} мс)")
+            for line in plan:
+                print(f"    {line}")
+            if needs_full_scan(plan):
+                full_scans.append(name)
+        db.close()
+
+    if full_scans:
+        print(f"\nполный просмотр или сортировка: {', '.join(full_scans)}")
+        sys.exit(1)
+    print(f"\nвсе запросы используют индексы ({args.rows} жалоб)")
+
+
+if __name__ == "__main__":
+    main()
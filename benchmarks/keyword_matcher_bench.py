@@ -0,0 +1,100 @@
+"""
+Сравнение резервных классификаторов: прежний подсчет (проход по тексту на
+каждое слово) и общий движок KeywordMatcher.
+
+Отдельно измеряется пакетная оценка (analyze_sentiment_batch и
+categorize_batch) против поэлементного вызова резервных функций.
+
+Запуск: python -m benchmarks.keyword_matcher_bench
+"""
+
+import random
+import timeit
+
+from app.services.ai_category_service import AICategoryService
+from app.services.keyword_matcher import LEXICONS, KeywordMatcher
+from app.services.sentiment_service import SentimentService
+
+
+def naive_count(text):
+    text_lower = text.lower()
+    return {
+        group: sum(1 for word in words if word in text_lower)
+        for group, words in LEXICONS.items()
+    }
+
+
+def make_text(words, seed, unique=False):
+    rng = random.Random(seed)
+    vocabulary = (
+        "сайт не работает постоянно выдает ошибку списали деньги дважды нужен "
+        "возврат приложение зависает спасибо за быстрый ответ заказ доставка "
+        "поддержка оператор ожидание неделю"
+    ).split()
+    if unique:
+        return " ".join(f"{rng.choice(vocabulary)}{i}" for i in range(words))
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def bench(name, text, number):
+    matcher = KeywordMatcher(LEXICONS)
+    assert matcher.count(text) == naive_count(text)
+    naive = min(timeit.repeat(lambda: naive_count(text), number=number, repeat=5)) / number
+    warm = min(timeit.repeat(lambda: matcher.count(text), number=number, repeat=5)) / number
+
+    def cold():
+        # Худший случай: ни один фрагмент текста еще не встречался
+        matcher._token_cache.clear()
+        matcher.count(text)
+
+    cold = min(timeit.repeat(cold, number=number, repeat=5)) / number
+    print(f"{name:<32} {len(text):>7} {naive * 1e6:>10.1f} {warm * 1e6:>10.1f} "
+          f"{cold * 1e6:>10.1f} {naive / warm:>8.1f}x")
+
+
+def bench_batch(count):
+    sentiment, category = SentimentService(), AICategoryService()
+    texts = [make_text(random.Random(i).randint(5, 60), i) for i in range(count)]
+
+    def single():
+        return [
+            (sentiment._simple_sentiment_analysis(text), category._simple_categorization(text))
+            for text in texts
+        ]
+
+    def naive():
+        labels = []
+        for text in texts:
+            counts = naive_count(text)
+            negative, positive = counts["negative"], counts["positive"]
+            labels.append((
+                "negative" if negative > positive else "positive" if positive > negative else "neutral",
+                "техническая" if counts["technical"] else "оплата" if counts["payment"] else "другое",
+            ))
+        return labels
+
+    def batch():
+        return list(zip(sentiment.analyze_sentiment_batch(texts), category.categorize_batch(texts)))
+
+    assert batch() == single() == naive()
+    naive_elapsed = min(timeit.repeat(naive, number=1, repeat=3))
+    single_elapsed = min(timeit.repeat(single, number=1, repeat=3))
+    batch_elapsed = min(timeit.repeat(batch, number=1, repeat=3))
+    print(f"\nпакетная оценка {count} жалоб (тональность + категория):")
+    print(f"  прежний код: {count / naive_elapsed:>10.0f} жалоб/с")
+    print(f"  поэлементно: {count / single_elapsed:>10.0f} жалоб/с")
+    print(f"  пакетом:     {count / batch_elapsed:>10.0f} жалоб/с")
+
+
+def main():
+    print(f"{'текст':<32} {'символов':>7} {'прежний':>10} {'движок':>10} "
+          f"{'без кэша':>10} {'ускорение':>9}")
+    bench("короткая жалоба", "Сайт не работает, постоянно выдает ошибку 500", 20000)
+    bench("жалоба 300 слов", make_text(300, 1), 2000)
+    bench("жалоба 3000 слов", make_text(3000, 2), 200)
+    bench("3000 уникальных слов", make_text(3000, 3, unique=True), 50)
+    bench_batch(20000)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,15 +17,14 @@ Base = declarative_base()
 class Complaint(Base):
     __tablename__ = "complaints"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     text: Mapped[str] = mapped_column(Text, nullable=False)
     status: Mapped[str] = mapped_column(String, default="open")
     timestamp: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
     sentiment: Mapped[str] = mapped_column(String, default="unknown")
     category: Mapped[str] = mapped_column(String, default="другое")
 
-# Создание таблиц
-Base.metadata.create_all(bind=engine)
+# Схема создается миграциями (python -m app.models.migrations), а не при импорте
 
 def get_db():
     db = SessionLocal()
@@ -1,14 +1,67 @@
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 
-from app.routes import complaints_router, telegram_router, sheets_router
+from app.config import settings
+from app.logging_config import setup_logging, stop_logging
+from app.middleware import RequestIdMiddleware, RateLimitMiddleware
+from app.models.database import init_db, engine
+from app.services.http_client import start_http_client, close_http_client
+from app.services.rate_limiter import RateLimiter
+from app.routes import complaints_router, telegram_router, sheets_router, diagnostics_router
+from app.routes.complaints import outbox_dispatcher, enrichment_service, duplicate_index, sheets_service
+
+# Состояние лимита общее для всех процессов uvicorn (пустой путь — без лимита)
+rate_limiter = RateLimiter(
+    settings.RATE_LIMIT_PATH,
+    rate=settings.RATE_LIMIT_PER_MINUTE / 60,
+    burst=settings.RATE_LIMIT_BURST,
+) if settings.RATE_LIMIT_PATH else None
+# Жалобы пакетной загрузки оплачиваются поштучно из отдельной корзины
+batch_rate_limiter = RateLimiter(
+    settings.RATE_LIMIT_PATH,
+    rate=settings.RATE_LIMIT_BATCH_ITEMS_PER_MINUTE / 60,
+    burst=settings.RATE_LIMIT_BATCH_ITEMS_BURST,
+) if settings.RATE_LIMIT_PATH else None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Инициализация и освобождение ресурсов приложения"""
+    setup_logging()
+    await init_db()
+    await enrichment_service.spam_service.prefilter.refresh()
+    await duplicate_index.refresh()
+    await start_http_client()
+    outbox_dispatcher.start()
+    yield
+    # Сначала буфер Sheets: ожидающие его сообщения outbox успеют завершиться
+    # и не будут записаны повторно после перезапуска
+    await sheets_service.close()
+    await outbox_dispatcher.stop()
+    await outbox_dispatcher.telegram_dispatcher.close()
+    await enrichment_service.close()
+    if rate_limiter is not None:
+        await rate_limiter.close()
+        await batch_rate_limiter.close()
+    await close_http_client()
+    await engine.dispose()
+    stop_logging()
 
 app = FastAPI(
     title="Complaint Processing System",
     description="API для обработки жалоб клиентов с интеграцией внешних сервисов",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# Лимит приема жалоб на клиента: отказ 429 до обогащения
+app.add_middleware(
+    RateLimitMiddleware,
+    limiter=rate_limiter,
+    api_keys=settings.RATE_LIMIT_API_KEYS,
+    batch_limiter=batch_rate_limiter
 )
 
 # CORS middleware
@@ -18,12 +71,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Retry-After", "ETag"],
 )
 
+# Id запроса в логах и в заголовке ответа
+app.add_middleware(RequestIdMiddleware)
+
 # Подключение маршрутов
 app.include_router(complaints_router)
 app.include_router(telegram_router)
 app.include_router(sheets_router)
+app.include_router(diagnostics_router)
 
 @app.get("/health/")
 async def health_check():
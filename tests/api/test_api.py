@@ -62,8 +62,9 @@ def test_get_complaints():
     try:
         response = requests.get(f"{BASE_URL}/complaints/")
         if response.status_code == 200:
-            complaints = response.json()
-            print(f"✅ Получено жалоб: {len(complaints)}")
+            page = response.json()
+            complaints = page["items"]
+            print(f"✅ Получено жалоб: {len(complaints)}, следующая страница: {page['next_cursor'] is not None}")
             for complaint in complaints[:3]:  # Показываем первые 3
                 print(f"   ID: {complaint['id']}, Категория: {complaint['category']}, Статус: {complaint['status']}")
         else:
@@ -4,11 +4,21 @@
 import pytest
 import os
 import sys
+import tempfile
 from pathlib import Path
 
 # Добавляем корневую директорию в путь
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+# Модульные тесты работают с временной базой, а не с complaints.db
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test_complaints.db"
+# Кэш результатов обогащения тесты включают явно
+os.environ["ENRICHMENT_CACHE_PATH"] = ""
+# Лимит приема жалоб тоже
+os.environ["RATE_LIMIT_PATH"] = ""
+# И кэш чтения жалоб
+os.environ["COMPLAINT_CACHE_VERSION_PATH"] = ""
+
 @pytest.fixture
 def test_data():
     """Тестовые данные для жалоб"""
@@ -103,7 +103,7 @@ class IntegrationTester:
                 response = await client.get(f"{self.base_url}/complaints/")
                 
                 if response.status_code == 200:
-                    complaints = response.json()
+                    complaints = response.json()["items"]
                     print(f"✅ Получено жалоб: {len(complaints)}")
                     self.results["complaints_list"] = True
                     return True
@@ -0,0 +1,105 @@
+"""
+Модульные тесты предохранителей внешних провайдеров
+"""
+
+import asyncio
+import time
+
+import httpx
+
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.services.sentiment_service import SentimentService
+from app.utils import deadline_scope
+
+
+def test_breaker_state_transitions(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=10, half_open_max_calls=1)
+
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow_request()
+
+    now[0] += 10
+    assert breaker.allow_request() and breaker.state == HALF_OPEN
+    # Пока пробный запрос не завершен, остальные уходят в fallback
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    now[0] += 10
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+    # 429 открывает сразу на время из Retry-After, 400 провайдер не «ломает»
+    assert not breaker.record_status(400)
+    assert breaker.state == CLOSED
+    breaker.record_status(429, retry_after=60)
+    assert breaker.state == OPEN and breaker.snapshot()["retry_in"] == 60
+
+
+def test_open_breaker_skips_provider():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            service = SentimentService(http_client=client)
+            service.api_key = "key"
+            service.breaker = CircuitBreaker("apilayer-test", failure_threshold=3, recovery_timeout=60)
+            return [await service.analyze_sentiment("все плохо") for _ in range(10)], service.breaker
+
+    results, breaker = asyncio.run(run())
+    assert results == ["negative"] * 10
+    assert len(calls) == 3
+    assert breaker.state == OPEN and breaker.rejected == 7
+
+
+def test_budget_cuts_are_not_provider_failures():
+    """Медленный, но исправный провайдер не открывает предохранитель"""
+    async def hanging(request):
+        await asyncio.sleep(10)
+
+    def timing_out(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    async def run(handler, budget, slow_call_threshold=2.0):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            service = SentimentService(http_client=client)
+            service.api_key = "key"
+            service.breaker = CircuitBreaker(
+                "apilayer-budget-test", failure_threshold=3, recovery_timeout=60,
+                slow_call_threshold=slow_call_threshold
+            )
+            for _ in range(5):
+                with deadline_scope(budget):
+                    try:
+                        await asyncio.wait_for(service.analyze_sentiment("все плохо"), 0.05)
+                    except asyncio.TimeoutError:
+                        pass
+            return service.breaker
+
+    # Стадию обрывает бюджет, или таймаут клиента укорочен бюджетом
+    assert asyncio.run(run(hanging, 0.05)).state == CLOSED
+    assert asyncio.run(run(timing_out, 0.5)).failures == 0
+    # Без бюджета таймаут — ошибка провайдера
+    assert asyncio.run(run(timing_out, None)).state == OPEN
+    # Обрыв после порога медленного вызова — тоже
+    assert asyncio.run(run(hanging, 0.05, slow_call_threshold=0.01)).state == OPEN
+
+
+def test_slow_calls_cut_by_budget_open_the_breaker():
+    """Зависший провайдер не держит каждый запрос до конца бюджета"""
+    breaker = CircuitBreaker("slow-test", failure_threshold=2, slow_call_threshold=1.0)
+    breaker.record_cancelled(time.monotonic() - 0.1)
+    assert breaker.failures == 0
+
+    breaker.record_cancelled(time.monotonic() - 1.5)
+    breaker.record_timeout(1.5, 10.0, time.monotonic() - 1.5)
+    assert breaker.state == OPEN
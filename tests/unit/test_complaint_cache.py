@@ -0,0 +1,81 @@
+"""
+Модульные тесты кэша чтения жалоб и условных GET по ETag
+"""
+
+import asyncio
+
+from fastapi import Request, Response
+
+from app.models.database import AsyncSessionLocal, Complaint, init_db
+from app.models.schemas import ComplaintResponse, ComplaintUpdate
+from app.routes import complaints as routes
+from app.services.complaint_cache import ComplaintCache, etag_matches
+
+
+def make_request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+def test_version_file_invalidates_other_processes(tmp_path):
+    path = str(tmp_path / "complaints.version")
+    # Два экземпляра с общим файлом — как два процесса uvicorn
+    first, second = ComplaintCache(path), ComplaintCache(path)
+    response = ComplaintResponse(id=1, status="open", sentiment="negative", category="оплата")
+
+    etag = second.set(1, response, second.version())
+    assert second.get(1) == (response, etag)
+
+    first.invalidate(1)
+    assert second.get(1) is None
+
+    # Версия сменилась во время чтения из базы — ответ не сохраняется
+    version = second.version()
+    first.invalidate(1)
+    second.set(1, response, version)
+    assert second.get(1) is None
+
+    # Незавершенное обогащение дописывает воркер без смены версии
+    pending = ComplaintResponse(id=2, status="open", sentiment="pending")
+    second.set(2, pending, second.version())
+    assert second.get(2) is None
+
+
+def test_etag_matching():
+    etag = '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"x", W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abd"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_conditional_get_and_invalidation_on_update(tmp_path, monkeypatch):
+    monkeypatch.setattr(routes, "complaint_cache", ComplaintCache(str(tmp_path / "version")))
+
+    async def run():
+        await init_db()
+        async with AsyncSessionLocal() as db:
+            complaint = Complaint(text="кэш жалобы", sentiment="negative", category="оплата")
+            db.add(complaint)
+            await db.commit()
+            complaint_id = complaint.id
+
+            response = Response()
+            body = await routes.get_complaint(complaint_id, make_request(), response, db)
+            etag = response.headers["etag"]
+            assert body.status == "open"
+
+            # Попадание в кэш с совпавшим ETag: 304 без сессии базы
+            not_modified = await routes.get_complaint(complaint_id, make_request(etag), Response(), None)
+            assert not_modified.status_code == 304
+            assert not_modified.body == b""
+            assert not_modified.headers["etag"] == etag
+
+            await routes.update_complaint(complaint_id, ComplaintUpdate(status="closed"), db)
+            response = Response()
+            body = await routes.get_complaint(complaint_id, make_request(etag), response, db)
+            assert body.status == "closed"
+            assert response.headers["etag"] != etag
+
+    asyncio.run(run())
@@ -0,0 +1,149 @@
+"""
+Модульные тесты индекса почти дословных копий жалоб
+"""
+
+import asyncio
+import json
+import zlib
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, select, update
+
+from app.models.database import AsyncSessionLocal, Complaint, ComplaintDuplicate, OutboxMessage, init_db
+from app.routes import complaints as routes
+from app.services.duplicate_index import DuplicateIndex, normalize_text
+from app.services.enrichment_service import EnrichmentResult
+
+ORIGINAL = "Здравствуйте, у меня не проходит оплата картой уже третий день, деньги списались, а заказ не оформлен"
+REWORDED = "Здравствуйте! У меня не проходит оплата картой уже четвертый день, деньги списались а заказ не оформлен"
+OTHER = "Курьер опоздал на два часа и не извинился, прошу разобраться с доставкой"
+
+
+def make_index(**kwargs):
+    kwargs.setdefault("refresh_interval", 0)
+    return DuplicateIndex(enabled=True, **kwargs)
+
+
+def test_reworded_copy_is_linked_to_original():
+    index = make_index()
+    index.add(1, ORIGINAL, "negative", "оплата", is_spam=False)
+    index.add(2, OTHER, "negative", "доставка")
+
+    _, duplicate = index.lookup(REWORDED)
+    assert duplicate is not None
+    assert duplicate.canonical_id == 1 and duplicate.category == "оплата"
+    assert duplicate.similarity >= index.threshold
+    assert index.lookup("Не могу войти в личный кабинет, пишет неверный пароль")[1] is None
+    # Короткие тексты не склеиваются
+    assert index.lookup("не работает")[1] is None
+
+
+def test_index_is_bounded_and_updatable():
+    index = make_index(capacity=1)
+    index.add(1, ORIGINAL, "negative", "оплата")
+    index.add(2, OTHER, "negative", "доставка")
+
+    assert index.lookup(REWORDED)[1] is None
+    index.update(2, category="курьер", is_spam=True)
+    duplicate = index.lookup(OTHER + "!")[1]
+    assert duplicate.category == "курьер" and duplicate.is_spam
+
+
+def test_rebuild_from_database_skips_duplicates_and_pending():
+    async def run():
+        await init_db()
+        async with AsyncSessionLocal() as db:
+            original = Complaint(text=ORIGINAL + " (rebuild)", sentiment="negative", category="оплата", status="spam")
+            pending = Complaint(text=OTHER + " (rebuild)", sentiment="pending", category="pending")
+            copy = Complaint(text=REWORDED + " (rebuild)", sentiment="negative", category="оплата")
+            db.add_all([original, pending, copy])
+            await db.flush()
+            db.add(ComplaintDuplicate(complaint_id=copy.id, canonical_id=original.id, similarity=0.8))
+            await db.commit()
+
+        index = make_index()
+        await index.refresh()
+        return index, original.id, copy.id
+
+    index, original_id, copy_id = asyncio.run(run())
+    duplicate = index.lookup(REWORDED + " (rebuild)")[1]
+    assert duplicate.canonical_id == original_id and duplicate.is_spam
+    assert copy_id not in index._entries
+    assert index.lookup(OTHER + " (rebuild)")[1] is None
+
+
+def test_signature_matches_exact_arithmetic():
+    """Хэши шинглов считаются без переполнения uint64"""
+    index = make_index(num_perm=8, bands=2)
+    normalized = normalize_text(ORIGINAL)
+    values = {zlib.crc32(normalized[i:i + 5].encode()) for i in range(len(normalized) - 4)}
+    prime = (1 << 61) - 1
+    expected = [
+        min(((int(a) * value + int(b)) % prime) & 0xFFFFFFFF for value in values)
+        for a, b in zip(index._a, index._b)
+    ]
+    assert index.signature(ORIGINAL).tolist() == expected
+
+
+def test_refresh_loads_complaints_enriched_after_newer_ones():
+    async def run():
+        await init_db()
+        index = make_index()
+        async with AsyncSessionLocal() as db:
+            deferred = Complaint(text=ORIGINAL + " (deferred)", sentiment="pending", category="pending")
+            db.add(deferred)
+            await db.flush()
+            db.add(Complaint(text=OTHER + " (deferred)", sentiment="negative", category="доставка"))
+            await db.commit()
+            await index.refresh()
+            before = index.lookup(REWORDED + " (deferred)")[1]
+
+            # Воркер обогатил старую жалобу, когда более новая уже в индексе
+            await db.execute(
+                update(Complaint).where(Complaint.id == deferred.id)
+                .values(sentiment="negative", category="оплата")
+            )
+            await db.commit()
+        await index.refresh()
+        return before, index.lookup(REWORDED + " (deferred)")[1], deferred.id
+
+    before, after, deferred_id = asyncio.run(run())
+    assert before is None
+    assert after.canonical_id == deferred_id and after.category == "оплата"
+
+
+def test_batch_links_copies_within_one_chunk_and_keeps_sheets_rows(monkeypatch):
+    async def enrich(text, client_ip, check_sender=True):
+        return EnrichmentResult(spam={}, sentiment="negative", category="оплата", location={})
+
+    monkeypatch.setattr(routes.enrichment_service, "enrich", enrich)
+    monkeypatch.setattr(routes, "duplicate_index", make_index())
+    app = FastAPI()
+    app.include_router(routes.router)
+
+    texts = [ORIGINAL + " (batch)", REWORDED + " (batch)", OTHER + " (batch)"]
+    body = "\n".join(json.dumps({"text": text}) for text in texts)
+
+    async def notifications():
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(select(OutboxMessage.topic, OutboxMessage.payload))).all()
+            # Тесты outbox рассчитывают на пустую очередь уведомлений
+            await db.execute(delete(OutboxMessage))
+            await db.commit()
+        return sorted((json.loads(payload)["id"], topic) for topic, payload in rows)
+
+    with TestClient(app) as client:
+        client.portal.call(init_db)
+        items = client.post("/complaints/batch/", content=body).json()["items"]
+        topics = client.portal.call(notifications)
+
+    first, copy, other = items
+    assert copy["duplicate_of"] == first["id"]
+    assert first["duplicate_of"] is None and other["duplicate_of"] is None
+    # Копия попадает в Google Sheets, но не в Telegram
+    assert topics == sorted([
+        (first["id"], "sheets"), (first["id"], "telegram"),
+        (copy["id"], "sheets"),
+        (other["id"], "sheets"), (other["id"], "telegram"),
+    ])
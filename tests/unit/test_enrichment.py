@@ -0,0 +1,92 @@
+"""
+Модульные тесты параллельного обогащения жалоб
+"""
+
+import asyncio
+import time
+
+from app.config import settings
+from app.services.enrichment_service import EnrichmentService
+from app.utils import deadline_scope, remaining
+
+
+class SlowSpamService:
+    async def check_spam(self, text, ip=None, check_remote=None):
+        await asyncio.sleep(0.3)
+        return {"is_spam": True, "score": 1}
+
+
+class SlowSentimentService:
+    async def analyze_sentiment_result(self, text):
+        await asyncio.sleep(0.3)
+        return "positive", False
+
+    def _simple_sentiment_analysis(self, text):
+        return "negative"
+
+
+class HangingCategoryService:
+    async def categorize_complaint_result(self, text):
+        await asyncio.sleep(10)
+        return "оплата", False
+
+    def _simple_categorization(self, text):
+        return "техническая"
+
+
+class SlowGeolocationService:
+    async def get_location(self, ip):
+        await asyncio.sleep(0.3)
+        return {"country": "Russia"}
+
+
+def make_service():
+    return EnrichmentService(
+        sentiment_service=SlowSentimentService(),
+        ai_category_service=HangingCategoryService(),
+        spam_service=SlowSpamService(),
+        geolocation_service=SlowGeolocationService(),
+    )
+
+
+def test_stages_run_concurrently_with_fallback(monkeypatch):
+    """Стадии идут параллельно, зависшая стадия получает fallback по дедлайну"""
+    monkeypatch.setattr(settings, "SPAM_STAGE_TIMEOUT", 1.0)
+    monkeypatch.setattr(settings, "SENTIMENT_STAGE_TIMEOUT", 1.0)
+    monkeypatch.setattr(settings, "CATEGORY_STAGE_TIMEOUT", 0.5)
+    monkeypatch.setattr(settings, "GEOLOCATION_STAGE_TIMEOUT", 1.0)
+
+    started = time.perf_counter()
+    result = asyncio.run(make_service().enrich("сайт не работает", "8.8.8.8"))
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.9
+    assert result.spam == {"is_spam": True, "score": 1}
+    assert result.sentiment == "positive"
+    assert result.category == "техническая"
+    assert result.location == {"country": "Russia"}
+    assert result.timed_out == ["category"]
+
+
+def test_request_budget_caps_all_stages(monkeypatch):
+    """Общий бюджет запроса короче дедлайнов стадий — все медленные стадии в fallback"""
+    for name in ("SPAM_STAGE_TIMEOUT", "SENTIMENT_STAGE_TIMEOUT",
+                 "CATEGORY_STAGE_TIMEOUT", "GEOLOCATION_STAGE_TIMEOUT"):
+        monkeypatch.setattr(settings, name, 5.0)
+
+    async def run():
+        with deadline_scope(0.1):
+            started = time.perf_counter()
+            result = await make_service().enrich("сайт не работает", "8.8.8.8")
+            elapsed = time.perf_counter() - started
+            # Вложенный бюджет не продлевает внешний
+            with deadline_scope(10):
+                assert remaining(10) <= 0.1
+        assert remaining(10) == 10
+        return result, elapsed
+
+    result, elapsed = asyncio.run(run())
+    assert elapsed < 0.25
+    assert sorted(result.timed_out) == ["category", "geolocation", "sentiment", "spam"]
+    assert result.sentiment == "negative"
+    assert result.location == {}
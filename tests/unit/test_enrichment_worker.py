@@ -0,0 +1,81 @@
+"""
+Модульные тесты воркера отложенного обогащения
+"""
+
+import asyncio
+
+from sqlalchemy import delete, func, select
+
+from app.models.database import AsyncSessionLocal, Complaint, EnrichmentJob, OutboxMessage, init_db
+from app.services import job_queue
+from app.services.enrichment_service import EnrichmentResult
+from app.workers.enrichment_worker import EnrichmentWorker
+
+
+class FakeEnrichmentService:
+    def __init__(self, error=None):
+        self.error = error
+
+    async def enrich(self, text, client_ip, check_sender=True):
+        if self.error:
+            raise self.error
+        return EnrichmentResult(spam={}, sentiment="negative", category="оплата", location={})
+
+
+def make_worker(enrichment_service):
+    worker = EnrichmentWorker("test-worker")
+    worker.enrichment_service = enrichment_service
+    worker.duplicate_index.enabled = False
+    return worker
+
+
+async def claim_job(text):
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        complaint = Complaint(text=text, sentiment="pending", category="pending")
+        db.add(complaint)
+        await db.flush()
+        db.add(EnrichmentJob(complaint_id=complaint.id, ip_address="unknown"))
+        await db.commit()
+        # Чужие задания других тестов не трогаем: захватываем свое
+        jobs = await job_queue.claim_batch(db, EnrichmentJob, "test-worker", 1000, 60)
+        return complaint.id, next(job for job in jobs if job.complaint_id == complaint.id)
+
+
+def test_finished_job_is_deleted_with_notifications_in_one_commit():
+    async def run():
+        complaint_id, job = await claim_job("оплата не прошла, деньги списаны")
+        await make_worker(FakeEnrichmentService())._process(job)
+        async with AsyncSessionLocal() as db:
+            complaint = await db.get(Complaint, complaint_id)
+            result = (
+                complaint.category,
+                await db.get(EnrichmentJob, job.id),
+                await db.scalar(select(func.count()).select_from(OutboxMessage)),
+            )
+            # Тесты outbox рассчитывают на пустую очередь уведомлений
+            await db.execute(delete(OutboxMessage))
+            await db.commit()
+            return result
+
+    category, job, notifications = asyncio.run(run())
+    assert category == "оплата"
+    assert job is None
+    assert notifications > 0
+
+
+def test_failed_bookkeeping_does_not_crash_the_worker(monkeypatch):
+    async def locked(*args, **kwargs):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(job_queue, "mark_failed", locked)
+
+    async def run():
+        _, job = await claim_job("сайт не открывается")
+        # Ошибка обогащения и ошибка записи ее статуса не выходят из _process
+        await make_worker(FakeEnrichmentService(RuntimeError("provider down")))._process(job)
+        async with AsyncSessionLocal() as db:
+            return (await db.get(EnrichmentJob, job.id)).status
+
+    # Задание остается захваченным и вернется в очередь по истечении аренды
+    assert asyncio.run(run()) == job_queue.PROCESSING
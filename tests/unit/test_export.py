@@ -0,0 +1,59 @@
+"""
+Модульные тесты потоковой выгрузки жалоб
+"""
+
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime
+
+from app.models.database import AsyncSessionLocal, Complaint, init_db
+from app.routes.complaints import export_complaints
+
+CATEGORY = "export-test"
+
+
+def collect(**params):
+    async def run():
+        await init_db()
+        async with AsyncSessionLocal() as db:
+            if not await db.get(Complaint, 9001):
+                db.add_all([
+                    Complaint(id=9001, text='Строка 1\nс "кавычками", и запятой', category=CATEGORY,
+                              status="open", timestamp=datetime(2024, 3, 1, 9, 0)),
+                    Complaint(id=9002, text="вторая", category=CATEGORY,
+                              status="closed", timestamp=datetime(2024, 3, 1, 8, 0)),
+                    Complaint(id=9003, text="третья", category=CATEGORY,
+                              status="open", timestamp=datetime(2024, 3, 2, 8, 0)),
+                ])
+                await db.commit()
+
+        response = await export_complaints(category=CATEGORY, **params)
+        body = "".join([chunk async for chunk in response.body_iterator])
+        return response, body
+
+    return asyncio.run(run())
+
+
+def test_ndjson_export_is_ordered_by_time():
+    response, body = collect(format="ndjson", status=None, since=None, until=None)
+    rows = [json.loads(line) for line in body.splitlines()]
+    assert response.media_type == "application/x-ndjson"
+    assert [row["id"] for row in rows] == [9002, 9001, 9003]
+    assert rows[0]["timestamp"] == "2024-03-01T08:00:00"
+
+
+def test_csv_export_applies_filters_and_escapes_text():
+    # 12:00 по Москве — 09:00 UTC, граница включается
+    response, body = collect(
+        format="csv", status="open",
+        since=datetime.fromisoformat("2024-03-01T12:00:00+03:00"), until=None
+    )
+    rows = list(csv.reader(io.StringIO(body)))
+    assert 'filename="complaints.csv"' in response.headers["content-disposition"]
+    # charset Starlette добавляет к text/* сам — ровно один раз
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert rows[0] == ["id", "text", "status", "timestamp", "sentiment", "category"]
+    assert [row[0] for row in rows[1:]] == ["9001", "9003"]
+    assert rows[1][1] == 'Строка 1\nс "кавычками", и запятой'
@@ -0,0 +1,77 @@
+"""
+Модульные тесты геолокации: кэш и офлайн-таблица
+"""
+
+import asyncio
+
+from app.services.geoip_table import GeoIPTable, build_table
+from app.services.geolocation_service import GeolocationService
+
+
+def test_offline_table_lookup(tmp_path):
+    """Бинарный поиск по таблице диапазонов, включая границы и промахи"""
+    source = tmp_path / "ranges.csv"
+    source.write_text(
+        "network,country,countryCode,regionName,city\n"
+        "77.88.0.0/18,Russia,RU,Moscow,Moscow\n"
+        "8.8.8.0/24,United States,US,California,Mountain View\n"
+        "1.0.0.0-1.0.0.255,Australia,AU,Queensland,Brisbane\n",
+        encoding="utf-8",
+    )
+    table_path = tmp_path / "geoip.bin"
+    assert build_table(str(source), str(table_path)) == 3
+
+    table = GeoIPTable(str(table_path))
+    try:
+        assert table.lookup("77.88.63.255")["city"] == "Moscow"
+        assert table.lookup("8.8.8.8")["countryCode"] == "US"
+        assert table.lookup("1.0.0.0")["country"] == "Australia"
+        assert table.lookup("77.88.64.0") is None
+        assert table.lookup("0.0.0.1") is None
+        assert table.lookup("2001:db8::1") is None
+    finally:
+        table.close()
+
+
+def test_nested_networks_resolve_to_most_specific(tmp_path):
+    """Вложенные CIDR разворачиваются при сборке: побеждает самый узкий"""
+    source = tmp_path / "ranges.csv"
+    source.write_text(
+        "network,country,countryCode,regionName,city\n"
+        "10.0.0.0/8,Russia,RU,Moscow,Moscow\n"
+        "10.1.0.0/16,Russia,RU,Saint Petersburg,Saint Petersburg\n"
+        "10.1.2.0/24,Russia,RU,Leningrad Oblast,Gatchina\n",
+        encoding="utf-8",
+    )
+    table_path = tmp_path / "geoip.bin"
+    build_table(str(source), str(table_path))
+
+    table = GeoIPTable(str(table_path))
+    try:
+        assert table.lookup("10.1.2.3")["city"] == "Gatchina"
+        assert table.lookup("10.1.3.0")["city"] == "Saint Petersburg"
+        assert table.lookup("10.2.0.1")["city"] == "Moscow"
+        assert table.lookup("10.255.255.255")["city"] == "Moscow"
+    finally:
+        table.close()
+
+
+def test_failures_are_cached():
+    """Неудачный запрос кэшируется и не повторяется на каждой жалобе"""
+    service = GeolocationService()
+    calls = []
+
+    async def failing_fetch(ip, timeout):
+        calls.append(ip)
+        return {}
+
+    service._fetch_location = failing_fetch
+
+    async def run():
+        for _ in range(3):
+            assert await service.get_location("8.8.8.8") == {}
+        assert await service.get_location("127.0.0.1") == {}
+        assert await service.get_location("testclient") == {}
+
+    asyncio.run(run())
+    assert calls == ["8.8.8.8"]
@@ -0,0 +1,38 @@
+"""
+Модульные тесты общего HTTP клиента
+"""
+
+import asyncio
+
+import httpx
+
+from app.services.http_client import HostLimitedTransport
+
+
+def test_host_limited_transport_caps_concurrency_per_host():
+    """Одновременно к одному хосту уходит не больше max_per_host запросов"""
+    in_flight = {"api.example.com": 0, "other.example.com": 0}
+    peak = {"api.example.com": 0, "other.example.com": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        in_flight[host] += 1
+        peak[host] = max(peak[host], in_flight[host])
+        await asyncio.sleep(0.01)
+        in_flight[host] -= 1
+        return httpx.Response(200, json={"ok": True})
+
+    async def run():
+        transport = HostLimitedTransport(httpx.MockTransport(handler), max_per_host=2)
+        async with httpx.AsyncClient(transport=transport) as client:
+            responses = await asyncio.gather(
+                *[client.get("https://api.example.com/x") for _ in range(10)],
+                *[client.get("https://other.example.com/y") for _ in range(3)],
+            )
+        return responses
+
+    responses = asyncio.run(run())
+
+    assert all(r.json() == {"ok": True} for r in responses)
+    assert peak["api.example.com"] == 2
+    assert peak["other.example.com"] == 2
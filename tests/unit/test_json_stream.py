@@ -0,0 +1,84 @@
+"""
+Модульные тесты потокового разбора NDJSON / JSON-массива
+"""
+
+import asyncio
+import json
+
+from app.utils import iter_json_items
+
+
+def parse(data: bytes, chunk_size: int = 7):
+    async def chunks():
+        for i in range(0, len(data), chunk_size):
+            yield data[i:i + chunk_size]
+
+    async def collect():
+        return [item async for item in iter_json_items(chunks())]
+
+    return asyncio.run(collect())
+
+
+def test_ndjson_with_invalid_line():
+    """Битая строка NDJSON не мешает разбору остальных"""
+    body = '{"text": "жалоба 1"}\n{oops\n\n{"text": "жалоба 2"}'.encode()
+
+    items = parse(body)
+
+    assert [index for index, _ in items] == [0, 1, 2]
+    assert items[0][1] == {"text": "жалоба 1"}
+    assert isinstance(items[1][1], ValueError)
+    assert items[2][1] == {"text": "жалоба 2"}
+
+
+def test_json_array_split_across_chunks():
+    """Элементы массива собираются из произвольно нарезанных чанков"""
+    payload = [{"text": f"жалоба {i}"} for i in range(50)]
+    body = json.dumps(payload, ensure_ascii=False).encode()
+
+    items = parse(body, chunk_size=5)
+
+    assert [value for _, value in items] == payload
+
+
+def test_truncated_json_array():
+    """Обрезанный массив дает ошибку на последнем элементе"""
+    items = parse(b'[{"text": "a"}, {"te')
+
+    assert items[0] == (0, {"text": "a"})
+    assert isinstance(items[1][1], ValueError)
+
+
+def test_array_requires_single_commas():
+    """Пропущенная или повторная запятая — ошибка, а не молчаливый пропуск"""
+    for body in (b'[{}{}]', b'[,,{}]', b'[{}, , {}]', b'[{}, ]', b'[1 2]'):
+        items = parse(body)
+        assert isinstance(items[-1][1], ValueError), body
+
+    assert parse(b'[]') == []
+    assert parse(b'[ 1 , "a,]\\"" , [2, {"b": "}"}] ]', chunk_size=3) == [
+        (0, 1), (1, 'a,]"'), (2, [2, {"b": "}"}])
+    ]
+
+
+def test_invalid_array_item_fails_without_reading_the_rest():
+    """Ошибка в элементе сообщается сразу, остаток тела не читается"""
+    read = []
+
+    async def chunks():
+        yield b'[{"text": "a"}, {"text": oops}, '
+        for i in range(1000):
+            read.append(i)
+            yield b'{"text": "b"}, '
+
+    async def collect():
+        return [item async for item in iter_json_items(chunks())]
+
+    items = asyncio.run(collect())
+    assert items[0] == (0, {"text": "a"})
+    assert isinstance(items[1][1], ValueError)
+    assert read == []
+
+
+def test_empty_body():
+    assert parse(b"  \n") == []
@@ -0,0 +1,70 @@
+"""
+Модульные тесты движка ключевых слов резервных классификаторов
+"""
+
+import random
+
+from app.services.keyword_matcher import LEXICONS, KeywordMatcher
+
+
+def naive_count(text):
+    """Прежний подсчет: отдельный проход по тексту на каждое слово списка"""
+    text_lower = text.lower()
+    return {
+        group: sum(1 for word in words if word in text_lower)
+        for group, words in LEXICONS.items()
+    }
+
+
+def random_texts(count):
+    rng = random.Random(42)
+    vocabulary = [word for words in LEXICONS.values() for word in words]
+    vocabulary += ["Сайт", "НЕ", "денег", "оне", "багаж", "заказ", "500", "кот"]
+    separators = [" ", "  ", "\n", "\t", ", ", "!", "-", ""]
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(0, 30)):
+            parts.append(rng.choice(vocabulary))
+            parts.append(rng.choice(separators))
+        yield "".join(parts)
+
+
+def test_counts_match_naive_substring_search():
+    matcher = KeywordMatcher(LEXICONS)
+    for text in random_texts(500):
+        assert matcher.count(text) == naive_count(text), text
+
+
+def test_counts_survive_token_cache_overflow():
+    matcher = KeywordMatcher(LEXICONS)
+    matcher.TOKEN_CACHE_SIZE = 5
+    for text in random_texts(100):
+        assert matcher.count(text) == naive_count(text), text
+
+
+def test_phrases_and_duplicates():
+    matcher = KeywordMatcher(LEXICONS)
+    counts = matcher.count("Сайт НЕ РАБОТАЕТ, всё бесполезно")
+    # 'не работает', 'не' и дважды указанное 'бесполезно'
+    assert counts["negative"] == 4
+    assert counts["positive"] == 1
+    assert counts["technical"] == 2
+
+
+def test_batch_labels_match_per_item_functions():
+    """Пакетные метки совпадают с поэлементными резервными классификаторами"""
+    from app.services.ai_category_service import AICategoryService
+    from app.services.sentiment_service import SentimentService
+
+    texts = list(random_texts(500)) + ["", "Спасибо, все отлично", "Списали деньги"]
+    # Символ-разделитель пакетного разбора внутри текста
+    texts += ["сайт \ufdd0 не работает", "\ufdd0"]
+    sentiment, category = SentimentService(), AICategoryService()
+
+    assert sentiment.analyze_sentiment_batch(texts) == [
+        sentiment._simple_sentiment_analysis(text) for text in texts
+    ]
+    assert category.categorize_batch(texts) == [
+        category._simple_categorization(text) for text in texts
+    ]
+    assert sentiment.analyze_sentiment_batch([]) == []
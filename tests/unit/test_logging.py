@@ -0,0 +1,79 @@
+"""
+Модульные тесты структурированного логирования
+"""
+
+import asyncio
+import json
+import logging
+
+from app.logging_config import (
+    ContextQueueHandler, DebugSamplingFilter, JsonFormatter,
+    RequestContextFilter, parse_levels, request_id_var
+)
+from app.middleware import RequestIdMiddleware
+
+
+class ListQueue:
+    def __init__(self):
+        self.items = []
+
+    def put_nowait(self, item):
+        self.items.append(item)
+
+
+def test_records_carry_request_id_and_extra_fields():
+    log_queue = ListQueue()
+    handler = ContextQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter())
+    logger = logging.getLogger("tests.logging.structured")
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    try:
+        token = request_id_var.set("req-1")
+        try:
+            logger.info("Stage %s done", "spam", extra={"complaint_id": 7})
+        finally:
+            request_id_var.reset(token)
+    finally:
+        logger.removeHandler(handler)
+
+    entry = json.loads(JsonFormatter().format(log_queue.items[0]))
+    assert entry["message"] == "Stage spam done"
+    assert entry["request_id"] == "req-1"
+    assert entry["complaint_id"] == 7
+    assert entry["level"] == "INFO"
+
+
+def test_debug_sampling_and_levels():
+    def record(level):
+        return logging.makeLogRecord({"levelno": level})
+
+    assert not DebugSamplingFilter(0.0).filter(record(logging.DEBUG))
+    assert DebugSamplingFilter(0.0).filter(record(logging.WARNING))
+    assert DebugSamplingFilter(1.0).filter(record(logging.DEBUG))
+    assert parse_levels("app.services=debug, httpx=WARNING,bad") == {
+        "app.services": "DEBUG", "httpx": "WARNING"
+    }
+
+
+def test_middleware_sets_request_id():
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["request_id"] = request_id_var.get()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def run(headers):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "headers": headers}
+        await RequestIdMiddleware(app)(scope, None, send)
+        return dict(sent[0]["headers"])[b"x-request-id"].decode()
+
+    assert asyncio.run(run([(b"x-request-id", b"abc-123")])) == "abc-123" == seen["request_id"]
+    generated = asyncio.run(run([(b"x-request-id", b"bad id\n")]))
+    assert generated == seen["request_id"] and len(generated) == 32
+    assert request_id_var.get() == "-"
@@ -0,0 +1,83 @@
+"""
+Модульные тесты миграций схемы и индексов горячих запросов
+"""
+
+import sqlite3
+
+from sqlalchemy import create_engine
+
+from app.models.database import Base
+from app.models.migrations import MIGRATIONS, applied_versions, apply_migrations
+from benchmarks.explain_hot_queries import hot_queries, needs_full_scan, to_sql
+
+
+def migrate_file(path):
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        with engine.begin() as conn:
+            return apply_migrations(conn), applied_versions(conn)
+    finally:
+        engine.dispose()
+
+
+def schema(path):
+    db = sqlite3.connect(path)
+    try:
+        tables = {
+            name: {row[1] for row in db.execute(f"PRAGMA table_info({name})")}
+            for (name,) in db.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name != 'schema_migrations'"
+            )
+        }
+        indexes = {
+            name for (name,) in db.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+            )
+        }
+        return tables, indexes
+    finally:
+        db.close()
+
+
+def test_migrations_match_models_and_are_idempotent(tmp_path):
+    path = tmp_path / "complaints.db"
+    applied, versions = migrate_file(path)
+    assert applied == versions == [m.version for m in MIGRATIONS]
+    assert migrate_file(path) == ([], versions)
+
+    tables, indexes = schema(path)
+    assert tables == {
+        table.name: {column.name for column in table.columns}
+        for table in Base.metadata.sorted_tables
+    }
+    assert indexes == {
+        index.name for table in Base.metadata.sorted_tables for index in table.indexes
+    }
+
+
+def test_database_from_create_all_is_adopted(tmp_path):
+    """База, созданная прежним create_all, получает индексы без пересоздания таблиц"""
+    path = tmp_path / "legacy.db"
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE complaints (id INTEGER NOT NULL, text TEXT NOT NULL, status VARCHAR,"
+        " timestamp DATETIME, sentiment VARCHAR, category VARCHAR, PRIMARY KEY (id))"
+    )
+    db.execute("CREATE INDEX ix_complaints_id ON complaints (id)")
+    db.execute("INSERT INTO complaints (text, status) VALUES ('старая жалоба', 'open')")
+    db.commit()
+    db.close()
+
+    migrate_file(path)
+    _, indexes = schema(path)
+    assert "ix_complaints_id" not in indexes
+    assert "ix_complaints_status_timestamp" in indexes
+    db = sqlite3.connect(path)
+    assert db.execute("SELECT text FROM complaints").fetchall() == [("старая жалоба",)]
+
+    # Ни один горячий запрос не читает таблицу целиком и не сортирует ее
+    for statement in hot_queries().values():
+        sql, params = to_sql(statement)
+        plan = [row[3] for row in db.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        assert not needs_full_scan(plan), plan
+    db.close()
@@ -0,0 +1,103 @@
+"""
+Модульные тесты outbox уведомлений
+"""
+
+import asyncio
+
+from sqlalchemy import func, select, update
+
+from app.models.database import AsyncSessionLocal, OutboxMessage, SheetRow, init_db
+from app.services.outbox import OutboxDispatcher, enqueue_complaint_notifications
+
+
+class FlakyTelegramService:
+    is_configured = True
+
+
+class FlakyTelegramDispatcher:
+    def __init__(self):
+        self.calls = 0
+        self.sent = []
+
+    async def submit(self, complaint_data):
+        self.calls += 1
+        if self.calls == 1:
+            return False
+        self.sent.append(complaint_data["id"])
+        return True
+
+
+class DisabledSheetsService:
+    is_configured = False
+
+
+class RecordingSheetsService:
+    is_configured = True
+
+    async def add_complaint_to_sheet(self, complaint_data):
+        return True
+
+
+class DisabledTelegramService:
+    is_configured = False
+
+
+async def count_messages():
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(OutboxMessage))
+
+
+def test_outbox_retries_failed_delivery():
+    """Неудачная доставка остается в outbox и повторяется, успешная — удаляется"""
+    telegram = FlakyTelegramDispatcher()
+    dispatcher = OutboxDispatcher(
+        telegram_service=FlakyTelegramService(),
+        sheets_service=DisabledSheetsService(),
+        telegram_dispatcher=telegram
+    )
+
+    async def run():
+        await init_db()
+        async with AsyncSessionLocal() as db:
+            enqueue_complaint_notifications(db, {"id": 42, "text": "сайт не работает"})
+            await db.commit()
+
+        assert await count_messages() == 2
+        assert await dispatcher.dispatch_batch() == 2
+        # Сообщение Sheets снято (интеграция не настроена), Telegram ждет повтора
+        assert await count_messages() == 1
+
+        async with AsyncSessionLocal() as db:
+            message = (await db.execute(select(OutboxMessage))).scalar_one()
+            assert message.status == "pending"
+            assert message.attempts == 1
+            await db.execute(update(OutboxMessage).values(available_at=message.created_at))
+            await db.commit()
+
+        assert await dispatcher.dispatch_batch() == 1
+        assert await count_messages() == 0
+
+    asyncio.run(run())
+    assert telegram.sent == [42]
+
+
+def test_sheets_delivery_is_recorded_for_export():
+    """Строка, записанная outbox, отмечается, и /sheets/export/ ее не повторит"""
+    dispatcher = OutboxDispatcher(
+        telegram_service=DisabledTelegramService(),
+        sheets_service=RecordingSheetsService(),
+        telegram_dispatcher=FlakyTelegramDispatcher()
+    )
+
+    async def run():
+        await init_db()
+        async with AsyncSessionLocal() as db:
+            enqueue_complaint_notifications(db, {"id": 4242, "text": "не пришел заказ"})
+            await db.commit()
+
+        assert await dispatcher.dispatch_batch() == 2
+        assert await count_messages() == 0
+        async with AsyncSessionLocal() as db:
+            return await db.get(SheetRow, 4242)
+
+    assert asyncio.run(run()) is not None
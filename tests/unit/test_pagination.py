@@ -0,0 +1,60 @@
+"""
+Модульные тесты постраничной выдачи жалоб по курсору
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.database import AsyncSessionLocal, Complaint, init_db
+from app.routes.complaints import get_complaints
+from app.utils import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    timestamp = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+    for cursor in ("", "не курсор", encode_cursor(timestamp, 42)[:-3]):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+def test_pages_follow_timestamp_and_id_without_gaps():
+    category = "pagination-test"
+    # Одинаковые timestamp у соседних жалоб: порядок задает id
+    timestamps = [datetime(2024, 1, 1, 10, minute) for minute in (0, 0, 0, 5, 5, 9, 9)]
+
+    async def run():
+        await init_db()
+        async with AsyncSessionLocal() as db:
+            db.add_all(
+                Complaint(text=f"жалоба {i}", category=category, timestamp=timestamp)
+                for i, timestamp in enumerate(timestamps)
+            )
+            await db.commit()
+
+            pages, cursor = [], None
+            while True:
+                page = await get_complaints(
+                    status=None, category=category, limit=3, cursor=cursor, db=db
+                )
+                pages.append([item.id for item in page.items])
+                cursor = page.next_cursor
+                if cursor is None:
+                    break
+            expected = (await db.execute(
+                Complaint.__table__.select()
+                .where(Complaint.category == category)
+                .order_by(Complaint.timestamp.desc(), Complaint.id.desc())
+            )).all()
+
+            with pytest.raises(HTTPException) as error:
+                await get_complaints(status=None, category=category, limit=3, cursor="xyz", db=db)
+            return pages, [row.id for row in expected], error.value.status_code
+
+    pages, expected, status_code = asyncio.run(run())
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [i for page in pages for i in page] == expected
+    assert status_code == 400
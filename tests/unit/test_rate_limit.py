@@ -0,0 +1,143 @@
+"""
+Модульные тесты лимита приема жалоб
+"""
+
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.middleware.rate_limit import RateLimitMiddleware, client_key
+from app.models.database import init_db
+from app.routes import complaints as routes
+from app.services.enrichment_service import EnrichmentResult
+from app.services.rate_limiter import RateLimiter
+
+
+def test_bucket_is_shared_between_limiters(tmp_path, monkeypatch):
+    """Два экземпляра на одном файле — как два процесса uvicorn"""
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    path = str(tmp_path / "limits.db")
+
+    async def run():
+        first = RateLimiter(path, rate=1.0, burst=2)
+        second = RateLimiter(path, rate=1.0, burst=2)
+        try:
+            results = [
+                await first.acquire("ip:1.2.3.4"),
+                await second.acquire("ip:1.2.3.4"),
+                await first.acquire("ip:1.2.3.4"),
+                await second.acquire("ip:5.6.7.8"),
+            ]
+            now[0] += 0.5
+            results.append(await second.acquire("ip:1.2.3.4"))
+            now[0] += 0.5
+            results.append(await first.acquire("ip:1.2.3.4"))
+            return results
+        finally:
+            await first.close()
+            await second.close()
+
+    results = asyncio.run(run())
+    assert [allowed for allowed, _ in results] == [True, True, False, True, False, True]
+    assert results[2][1] == 1.0
+    assert results[4][1] == 0.5
+
+
+def test_middleware_rejects_before_calling_app(tmp_path):
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def run():
+        limiter = RateLimiter(str(tmp_path / "limits.db"), rate=0.1, burst=1)
+        middleware = RateLimitMiddleware(app, limiter=limiter, api_keys=["secret"])
+        responses = []
+
+        async def request(method, path, headers=()):
+            sent = []
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {
+                "type": "http", "method": method, "path": path,
+                "headers": list(headers), "client": ("1.2.3.4", 5000),
+            }
+            await middleware(scope, None, send)
+            responses.append(sent[0])
+
+        try:
+            await request("POST", "/complaints/")
+            await request("POST", "/complaints/batch/")
+            await request("GET", "/complaints/")
+            await request("POST", "/complaints/", [(b"x-api-key", b"secret")])
+            # Неизвестный ключ не дает новой корзины
+            await request("POST", "/complaints/", [(b"x-api-key", b"random")])
+        finally:
+            await limiter.close()
+        return responses
+
+    responses = asyncio.run(run())
+    assert [r["status"] for r in responses] == [200, 429, 200, 200, 429]
+    assert (b"retry-after", b"10") in responses[1]["headers"]
+    assert calls == ["/complaints/", "/complaints/", "/complaints/"]
+
+
+def test_client_key_uses_only_known_api_keys():
+    scope = {"headers": [(b"x-api-key", b"secret")], "client": ("1.2.3.4", 5000)}
+    key = client_key(scope, {b"secret"})
+    assert key.startswith("key:") and "secret" not in key
+    assert client_key(scope) == "ip:1.2.3.4"
+    assert client_key({"headers": [], "client": ("1.2.3.4", 5000)}) == "ip:1.2.3.4"
+
+
+def test_batch_pays_per_complaint(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_CHUNK_SIZE", 2)
+
+    async def enrich(text, client_ip, check_sender=True):
+        return EnrichmentResult(spam={}, sentiment="neutral", category="другое", location={})
+
+    monkeypatch.setattr(routes.enrichment_service, "enrich", enrich)
+    path = str(tmp_path / "limits.db")
+    limiter = RateLimiter(path, rate=1.0, burst=10)
+    batch_limiter = RateLimiter(path, rate=0.01, burst=3)
+    app = FastAPI()
+    app.include_router(routes.router)
+    app.add_middleware(RateLimitMiddleware, limiter=limiter, batch_limiter=batch_limiter)
+
+    body = "\n".join(json.dumps({"text": f"жалоба {i}"}) for i in range(5))
+    with TestClient(app) as client:
+        client.portal.call(init_db)
+        response = client.post("/complaints/batch/", content=body)
+        client.portal.call(limiter.close)
+        client.portal.call(batch_limiter.close)
+
+    assert response.status_code == 200
+    data = response.json()
+    # Первый чанк укладывается в емкость 3, второй уже нет — и все следующие тоже
+    assert data["created"] == 2
+    assert [item["error"] for item in data["items"][2:]] == ["Too many requests"] * 3
+    assert int(response.headers["retry-after"]) > 0
+
+
+def test_cost_above_burst_leaves_bucket_intact(tmp_path):
+    async def run():
+        limiter = RateLimiter(str(tmp_path / "limits.db"), rate=1.0, burst=5)
+        try:
+            denied = await limiter.acquire("ip:1.2.3.4", cost=50)
+            allowed = await limiter.acquire("ip:1.2.3.4", cost=5)
+            return denied, allowed
+        finally:
+            await limiter.close()
+
+    denied, allowed = asyncio.run(run())
+    assert denied == (False, 5.0)
+    assert allowed == (True, 0.0)
@@ -0,0 +1,161 @@
+"""
+Модульные тесты кэша результатов обогащения
+"""
+
+import asyncio
+
+import httpx
+
+from app.config import settings
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.enrichment_service import EnrichmentService
+from app.services.result_cache import ResultCache, text_cache_key
+from app.services.sentiment_service import SentimentService
+
+
+class CountingSpamService:
+    def __init__(self):
+        self.calls = 0
+        self.remote_calls = 0
+
+    async def check_remote(self, text):
+        self.remote_calls += 1
+        return {"is_spam": False, "score": 0.1}
+
+    async def check_spam(self, text, ip=None, check_remote=None):
+        # Как SpamService: префильтр на каждый запрос, API Ninjas — через check_remote
+        self.calls += 1
+        return await (check_remote or self.check_remote)(text)
+
+
+class CountingSentimentService:
+    def __init__(self):
+        self.calls = 0
+
+    async def analyze_sentiment_result(self, text):
+        self.calls += 1
+        return "negative", False
+
+    def _simple_sentiment_analysis(self, text):
+        return "neutral"
+
+
+class HangingCategoryService:
+    def __init__(self):
+        self.calls = 0
+
+    async def categorize_complaint_result(self, text):
+        self.calls += 1
+        await asyncio.sleep(10)
+        return "оплата", False
+
+    def _simple_categorization(self, text):
+        return "техническая"
+
+
+class NoGeolocationService:
+    async def get_location(self, ip):
+        return {}
+
+
+def test_text_cache_key_normalizes_text():
+    assert text_cache_key("  Сайт   НЕ работает\n") == text_cache_key("сайт не работает")
+    assert text_cache_key("сайт не работает") != text_cache_key("сайт работает")
+
+
+def test_repeated_text_is_served_from_shared_cache(tmp_path, monkeypatch):
+    """Повторный текст не уходит во внешние сервисы; fallback не кэшируется"""
+    monkeypatch.setattr(settings, "CATEGORY_STAGE_TIMEOUT", 0.1)
+    path = str(tmp_path / "cache.db")
+    ttl = {"spam": 60, "sentiment": 60, "category": 60}
+    spam, sentiment, category = (
+        CountingSpamService(), CountingSentimentService(), HangingCategoryService()
+    )
+
+    def make_service(cache):
+        return EnrichmentService(
+            sentiment_service=sentiment,
+            ai_category_service=category,
+            spam_service=spam,
+            geolocation_service=NoGeolocationService(),
+            result_cache=cache,
+        )
+
+    async def run():
+        # Два экземпляра на одном файле — как два процесса uvicorn
+        first = make_service(ResultCache(path, ttl, max_entries=100))
+        second = make_service(ResultCache(path, ttl, max_entries=100))
+        try:
+            result = await first.enrich("Сайт не работает", "unknown")
+            assert result.category == "техническая"
+            cached = await second.enrich("сайт  не работает", "unknown")
+            assert cached.sentiment == "negative"
+            # Префильтр со своими сигналами по IP работает заново,
+            # ответ API Ninjas берется из кэша
+            assert cached.spam == {"is_spam": False, "score": 0.1}
+            # При закрытии процесс сбрасывает свои счетчики в общий файл
+            await first.close()
+            return await second.result_cache.stats()
+        finally:
+            await first.close()
+            await second.close()
+
+    stats = asyncio.run(run())
+    assert spam.calls == 2
+    assert spam.remote_calls == 1
+    assert sentiment.calls == 1
+    # Категория упала в fallback и запрашивается повторно
+    assert category.calls == 2
+    assert stats["process"]["sentiment"] == {"hits": 1, "misses": 0}
+    assert stats["shared"]["sentiment"] == {"hits": 1, "misses": 1}
+    assert stats["entries"] == 2
+
+
+def test_provider_failure_is_not_cached(tmp_path, monkeypatch):
+    """Сбой провайдера внутри сервиса дает метку простых правил, но не запись в кэше"""
+    monkeypatch.setattr(settings, "CATEGORY_STAGE_TIMEOUT", 0.1)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("provider is down")
+        return httpx.Response(200, json={"sentiment": "Positive"})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            sentiment = SentimentService(http_client=client)
+            sentiment.api_key = "key"
+            sentiment.breaker = CircuitBreaker("apilayer-cache-test", failure_threshold=5, recovery_timeout=60)
+            service = EnrichmentService(
+                sentiment_service=sentiment,
+                ai_category_service=HangingCategoryService(),
+                spam_service=CountingSpamService(),
+                geolocation_service=NoGeolocationService(),
+                result_cache=ResultCache(str(tmp_path / "cache.db"), {"sentiment": 60}, max_entries=100),
+            )
+            try:
+                return [
+                    (await service.enrich("Сайт не работает", "unknown")).sentiment
+                    for _ in range(3)
+                ]
+            finally:
+                await service.close()
+
+    # Повтор после сбоя снова идет к провайдеру, его ответ уже кэшируется
+    assert asyncio.run(run()) == ["negative", "positive", "positive"]
+    assert len(calls) == 2
+
+
+def test_prune_enforces_max_entries(tmp_path):
+    async def run():
+        cache = ResultCache(str(tmp_path / "cache.db"), {"spam": 60}, max_entries=3)
+        try:
+            for i in range(5):
+                await cache.set(f"key{i}", "spam", i)
+            await cache.prune()
+            return [(await cache.get(f"key{i}", "spam"))[0] for i in range(5)]
+        finally:
+            await cache.close()
+
+    assert asyncio.run(run()) == [False, False, True, True, True]
@@ -0,0 +1,61 @@
+"""
+Модульные тесты буфера записи в Google Sheets
+"""
+
+import asyncio
+
+from app.services.sheets_service import GoogleSheetsService
+
+
+class FakeWorksheet:
+    def __init__(self):
+        self.header_reads = 0
+        self.appends = []
+
+    def row_values(self, row):
+        self.header_reads += 1
+        return ["ID", "Текст", "Категория", "Тональность", "Статус", "IP адрес", "Дата создания", "Спам"]
+
+    def append_rows(self, rows, value_input_option="RAW"):
+        self.appends.append(rows)
+
+
+def make_service(batch_size, flush_interval):
+    service = GoogleSheetsService()
+    service.worksheet = FakeWorksheet()
+    service.batch_size = batch_size
+    service.flush_interval = flush_interval
+    return service
+
+
+def test_rows_are_flushed_in_batches():
+    """Строки копятся и уходят одним append_rows, заголовки читаются один раз"""
+    service = make_service(batch_size=3, flush_interval=0.05)
+
+    async def run():
+        first = await asyncio.gather(*(
+            service.add_complaint_to_sheet({"id": i, "text": f"жалоба {i}"}) for i in range(5)
+        ))
+        second = await service.add_complaint_to_sheet({"id": 5, "text": "жалоба 5"})
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert all(first) and second
+    assert [len(rows) for rows in service.worksheet.appends] == [3, 2, 1]
+    assert [row[0] for rows in service.worksheet.appends for row in rows] == [0, 1, 2, 3, 4, 5]
+    assert service.worksheet.header_reads == 1
+
+
+def test_close_flushes_pending_rows():
+    service = make_service(batch_size=10, flush_interval=60)
+
+    async def run():
+        pending = asyncio.create_task(service.add_complaint_to_sheet({"id": 1, "text": "жалоба"}))
+        await asyncio.sleep(0)
+        await service.close()
+        return await pending
+
+    assert asyncio.run(run()) is True
+    assert [row[0] for rows in service.worksheet.appends for row in rows] == [1]
+    assert service._flush_timer.cancelled()
@@ -0,0 +1,66 @@
+"""
+Модульные тесты инкрементального экспорта /sheets/export/
+"""
+
+import asyncio
+import json
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.config import settings
+from app.models.database import Complaint, OutboxMessage, SheetRow
+from app.models.migrations import migrate
+from app.routes import sheets as routes
+
+
+class FakeSheetsService:
+    is_configured = True
+
+    def __init__(self):
+        self.rows = []
+
+    async def add_complaints_to_sheet(self, complaints_data):
+        # Уступаем цикл, чтобы параллельный экспорт успел вмешаться
+        await asyncio.sleep(0.01)
+        self.rows.extend(data["id"] for data in complaints_data)
+        return True
+
+
+def test_export_skips_outbox_rows_and_parallel_exports_do_not_overlap(tmp_path, monkeypatch):
+    service = FakeSheetsService()
+    monkeypatch.setattr(routes, "sheets_service", service)
+    monkeypatch.setattr(settings, "SHEETS_EXPORT_CHUNK_SIZE", 2)
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'export.db'}")
+        try:
+            await migrate(engine)
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                db.add_all(Complaint(id=i, text=f"жалоба {i}") for i in range(1, 11))
+                # Вторую жалобу outbox уже записал, третья ждет его доставки
+                db.add(SheetRow(complaint_id=2))
+                db.add(OutboxMessage(topic="sheets", payload=json.dumps({"id": 3})))
+                await db.commit()
+
+            async def export(full=False):
+                async with AsyncSession(engine, expire_on_commit=False) as db:
+                    return await routes.export_complaints_to_sheets(full=full, db=db)
+
+            first, second = await asyncio.gather(export(), export())
+            again = await export()
+            full = await export(full=True)
+            return first, second, again, full
+        finally:
+            await engine.dispose()
+
+    first, second, again, full = asyncio.run(run())
+
+    # Каждая жалоба выгружена ровно одним из двух экспортов
+    assert sorted(service.rows) == [1, 4, 5, 6, 7, 8, 9, 10]
+    assert first["data"]["exported_count"] + second["data"]["exported_count"] == 8
+    assert first["data"]["skipped_count"] + second["data"]["skipped_count"] == 2
+    assert first["data"]["total_complaints"] == 10
+    assert again["data"]["exported_count"] == 0
+    assert again["data"]["last_exported_id"] == 10
+    # Полный экспорт дописывает только отсутствующие в листе строки
+    assert full["data"]["exported_count"] == 0
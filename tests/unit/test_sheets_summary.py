@@ -0,0 +1,82 @@
+"""
+Модульные тесты сводки /sheets/summary/ по агрегатам базы
+"""
+
+import asyncio
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models.database import Complaint
+from app.models.migrations import migrate
+from app.routes import sheets as routes
+from app.services.sheets_service import GoogleSheetsService
+from app.utils import complaint_notification_data
+
+HEADERS = ["ID", "Текст", "Категория", "Тональность", "Статус", "IP адрес", "Дата создания", "Спам"]
+
+COMPLAINTS = [
+    Complaint(id=1, text="сайт не работает", category="техническая", sentiment="negative", status="open"),
+    Complaint(id=2, text="не проходит оплата", category="оплата", sentiment="negative", status="open"),
+    Complaint(id=3, text="спасибо, все хорошо", category="другое", sentiment="positive", status="closed"),
+    Complaint(id=4, text="снова не работает", category="техническая", sentiment="negative", status="closed"),
+    Complaint(id=5, text="вопрос", category="другое", sentiment="neutral", status="in_progress"),
+]
+
+
+class FakeWorksheet:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get_all_values(self):
+        return [HEADERS] + self.rows
+
+
+def sheet_rows(complaints):
+    """Строки листа — как их пишет экспорт жалоб"""
+    return [
+        GoogleSheetsService._complaint_row(complaint_notification_data(complaint, "N/A", False))
+        for complaint in complaints
+    ]
+
+
+def test_summary_matches_sheet_summary_and_reports_mismatch(tmp_path, monkeypatch):
+    service = GoogleSheetsService()
+    monkeypatch.setattr(routes, "sheets_service", service)
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'summary.db'}")
+        try:
+            await migrate(engine)
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                for complaint in COMPLAINTS:
+                    complaint.timestamp = datetime(2024, 5, 1, 12, 0)
+                db.add_all(COMPLAINTS)
+                await db.commit()
+
+                service.worksheet = FakeWorksheet(sheet_rows(COMPLAINTS))
+                in_sync = await routes.get_sheets_summary(reconcile=True, db=db)
+                # В лист не попала последняя жалоба
+                service.worksheet = FakeWorksheet(sheet_rows(COMPLAINTS[:-1]))
+                behind = await routes.get_sheets_summary(reconcile=True, db=db)
+                plain = await routes.get_sheets_summary(reconcile=False, db=db)
+                return in_sync, behind, plain
+        finally:
+            await engine.dispose()
+
+    in_sync, behind, plain = asyncio.run(run())
+
+    assert in_sync["data"] == {
+        "total_complaints": 5,
+        "categories": {"техническая": 2, "оплата": 1, "другое": 2},
+        "sentiments": {"negative": 3, "positive": 1, "neutral": 1},
+        "statuses": {"open": 2, "closed": 2, "in_progress": 1},
+    }
+    # Та же форма и те же счетчики, что у прежней сводки по листу
+    assert in_sync["reconciliation"]["in_sync"] is True
+    assert in_sync["reconciliation"]["sheet"] == in_sync["data"]
+
+    assert behind["reconciliation"]["in_sync"] is False
+    assert behind["reconciliation"]["sheet"]["total_complaints"] == 4
+    assert behind["data"] == in_sync["data"]
+    assert "reconciliation" not in plain
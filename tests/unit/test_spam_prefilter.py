@@ -0,0 +1,153 @@
+"""
+Модульные тесты локального спам-префильтра
+"""
+
+import asyncio
+
+from sqlalchemy import update
+
+from app.models.database import AsyncSessionLocal, Complaint, init_db
+from app.services.spam_prefilter import SPAM_STATUS, SpamPrefilter
+from app.services.spam_service import SpamService
+
+SPAM = "Купите дешевые таблетки со скидкой прямо сейчас, доставка по всей России бесплатно"
+PUBLIC_IP = "8.8.8.8"
+
+
+class RecordingSpamService(SpamService):
+    """API Ninjas заменен записью вызовов"""
+
+    def __init__(self, prefilter, remote):
+        super().__init__(prefilter=prefilter)
+        self.remote = remote
+        self.remote_calls = []
+
+    async def check_remote(self, text):
+        self.remote_calls.append(text)
+        return self.remote
+
+
+def make_prefilter(**kwargs):
+    kwargs.setdefault("refresh_interval", 0)
+    return SpamPrefilter(**kwargs)
+
+
+def test_learned_fingerprint_matches_reworded_copy():
+    prefilter = make_prefilter()
+    prefilter.learn(SPAM)
+
+    assert prefilter.fingerprint_score("КУПИТЕ дешевые таблетки со скидкой прямо сейчас!!!") == 1.0
+    assert prefilter.fingerprint_score("Сайт не работает со вчерашнего дня, прошу разобраться") == 0.0
+    verdict, result = prefilter.evaluate(SPAM + " Звоните", None)
+    assert verdict is True and result["source"] == "prefilter"
+
+
+def test_fingerprints_are_bounded():
+    prefilter = make_prefilter(max_fingerprints=2)
+    for i in range(3):
+        prefilter.learn(f"рассылка номер {i} о скидках на таблетки")
+
+    assert prefilter.stats()["fingerprints"] == 2
+    assert prefilter.fingerprint_score("рассылка номер 0 о скидках") < 1.0
+
+
+def test_repeated_text_is_learned_once():
+    prefilter = make_prefilter()
+    prefilter.learn(SPAM)
+    prefilter.learn(SPAM.upper() + "!")
+
+    assert prefilter.stats()["fingerprints"] == 1
+
+
+def test_refresh_learns_complaints_marked_spam_later():
+    """Старую жалобу пометили спамом в другом процессе после загрузки более новых"""
+    old_spam = "Лучшие займы без отказа и проверок, одобрение за пять минут онлайн"
+
+    async def run():
+        await init_db()
+        prefilter = make_prefilter()
+        async with AsyncSessionLocal() as db:
+            old = Complaint(text=old_spam, sentiment="neutral", category="другое")
+            db.add(old)
+            await db.flush()
+            db.add(Complaint(text=SPAM + " (refresh)", sentiment="neutral", category="другое", status=SPAM_STATUS))
+            await db.commit()
+            await prefilter.refresh()
+            before = prefilter.fingerprint_score(old_spam)
+
+            await db.execute(update(Complaint).where(Complaint.id == old.id).values(status=SPAM_STATUS))
+            await db.commit()
+        await prefilter.refresh()
+        return before, prefilter.fingerprint_score(old_spam)
+
+    assert asyncio.run(run()) == (0.0, 1.0)
+
+
+def test_only_ambiguous_texts_reach_remote_api():
+    async def run():
+        service = RecordingSpamService(make_prefilter(), {"is_spam": True})
+        ham = await service.check_spam("Не могу оплатить заказ картой", PUBLIC_IP)
+        link = await service.check_spam("Подробности на https://example.com/promo", PUBLIC_IP)
+        # Вердикт API пополняет отпечатки: копия больше не уходит во внешний сервис
+        copy = await service.check_spam("Подробности на https://example.com/promo", "1.1.1.1")
+        return service, ham, link, copy
+
+    service, ham, link, copy = asyncio.run(run())
+    assert ham["is_spam"] is False and ham["source"] == "prefilter"
+    assert link["is_spam"] is True and link["source"] == "api"
+    assert copy["is_spam"] is True and copy["source"] == "prefilter"
+    assert len(service.remote_calls) == 1
+
+
+def test_ip_velocity_and_reputation():
+    async def run():
+        service = RecordingSpamService(
+            make_prefilter(velocity_limit=4, reputation_threshold=2), None
+        )
+        results = [
+            await service.check_spam(f"Жалоба номер {i} на качество обслуживания", PUBLIC_IP)
+            for i in range(4)
+        ]
+        # Частые жалобы с частного адреса (прокси, офис) не считаются
+        private = [
+            await service.check_spam(f"Жалоба номер {i} на качество обслуживания", "10.0.0.1")
+            for i in range(4)
+        ]
+        return service, results, private
+
+    service, results, private = asyncio.run(run())
+    assert [r["is_spam"] for r in results] == [False, False, False, True]
+    assert not any(r["is_spam"] for r in private)
+    # Спам по частоте не портит репутацию и не попадает в отпечатки текста
+    assert service.prefilter.reputation_score(PUBLIC_IP) == 0.0
+    assert service.prefilter.stats()["fingerprints"] == 0
+
+
+def test_contacts_without_remote_answer_are_not_spam():
+    async def run():
+        # API Ninjas недоступен (нет ключа, сбой, открыт предохранитель)
+        service = RecordingSpamService(make_prefilter(), None)
+        results = [
+            await service.check_spam(f"Заказ {i} не пришел, пишите на user{i}@example.com", PUBLIC_IP)
+            for i in range(5)
+        ]
+        results.append(await service.check_spam("Сайт не работает", PUBLIC_IP))
+        return service, results
+
+    service, results = asyncio.run(run())
+    assert not any(r["is_spam"] for r in results)
+    assert service.prefilter.reputation_score(PUBLIC_IP) == 0.0
+
+
+def test_reputation_follows_text_verdicts():
+    async def run():
+        prefilter = make_prefilter(reputation_threshold=2)
+        prefilter.learn(SPAM)
+        service = RecordingSpamService(prefilter, None)
+        for _ in range(2):
+            await service.check_spam(SPAM, PUBLIC_IP)
+        return service, await service.check_spam("Сайт не работает", PUBLIC_IP)
+
+    service, result = asyncio.run(run())
+    # Совпадения с отпечатками спама портят репутацию адреса
+    assert result["is_spam"] is True and result["signals"]["reputation"] == 1.0
@@ -0,0 +1,98 @@
+"""
+Модульные тесты диспетчера Telegram уведомлений
+"""
+
+import asyncio
+
+from app.services.telegram_dispatcher import TelegramDispatcher
+from app.services.telegram_service import TelegramService
+
+
+class FakeTelegramService(TelegramService):
+    def __init__(self, rate_limited_once=False, rate_limited_always=False, delay=0):
+        super().__init__()
+        self.bot_token = "token"
+        self.chat_id = -100
+        self.rate_limited_once = rate_limited_once
+        self.rate_limited_always = rate_limited_always
+        self.delay = delay
+        self.attempts = 0
+        self.messages = []
+
+    async def send_message(self, message, parse_mode="HTML"):
+        self.attempts += 1
+        await asyncio.sleep(self.delay)
+        if self.rate_limited_once or self.rate_limited_always:
+            self.rate_limited_once = False
+            return False, 0.01
+        self.messages.append(message)
+        return True, None
+
+
+def test_burst_is_coalesced_into_digests():
+    """Всплеск жалоб уходит несколькими сводками вместо сообщения на каждую"""
+    service = FakeTelegramService()
+    dispatcher = TelegramDispatcher(
+        service, messages_per_minute=6000, burst=1, digest_threshold=5, digest_max_items=40
+    )
+
+    async def run():
+        return await asyncio.gather(*(
+            dispatcher.submit({"id": i, "text": f"жалоба {i}", "category": "другое"})
+            for i in range(100)
+        ))
+
+    results = asyncio.run(run())
+
+    assert all(results)
+    assert len(service.messages) == 3
+    assert service.messages[0].startswith("📦 <b>Новые жалобы: 40</b>")
+    assert service.messages[2].startswith("📦 <b>Новые жалобы: 20</b>")
+
+
+def test_retry_after_is_honored():
+    """После 429 сообщение отправляется повторно, а не теряется"""
+    service = FakeTelegramService(rate_limited_once=True)
+    dispatcher = TelegramDispatcher(service, messages_per_minute=6000, burst=1)
+
+    assert asyncio.run(dispatcher.submit({"id": 1, "text": "сайт не работает"}))
+    assert len(service.messages) == 1
+
+
+def test_persistent_rate_limit_gives_up_after_max_retries():
+    """Бесконечные 429 не держат уведомление: outbox повторит его позже"""
+    service = FakeTelegramService(rate_limited_always=True)
+    dispatcher = TelegramDispatcher(service, messages_per_minute=6000, burst=1, max_retries=2)
+
+    assert asyncio.run(dispatcher.submit({"id": 1, "text": "сайт не работает"})) is False
+    assert service.attempts == 3
+    assert service.messages == []
+
+
+def test_close_cancels_pending_notifications():
+    service = FakeTelegramService(delay=10)
+    dispatcher = TelegramDispatcher(service, messages_per_minute=6000, burst=1)
+
+    async def run():
+        submits = [
+            asyncio.create_task(dispatcher.submit({"id": i, "text": "жалоба"})) for i in range(2)
+        ]
+        await asyncio.sleep(0.01)
+        await dispatcher.close()
+        results = await asyncio.gather(*submits, return_exceptions=True)
+        return results, dispatcher._task
+
+    results, task = asyncio.run(run())
+
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert task is None
+    assert dispatcher.queue_size == 0
+
+
+def test_digest_respects_message_length_limit():
+    complaints = [{"id": i, "text": "x" * 200} for i in range(100)]
+
+    message, fitted = TelegramService.format_digest_message(complaints)
+
+    assert len(message) <= 4096
+    assert 0 < fitted < 100